@@ -0,0 +1,150 @@
+"""
+Reaproveitamento de links de afiliado por identidade do produto
+
+Chaves: ASIN, id da imagem e link normalizado (product_identity.identity_keys).
+Cada entrada guarda o ASIN do produto postado: variações diferentes costumam
+dividir a mesma imagem, então uma chave img:/url: com ASINs diferentes nos
+dois lados nunca vale. Quando um dos lados não tem ASIN (registros antigos do
+log, só com link amzn.to e imagem), a chave vale, mas a sugestão vai marcada
+como não verificada. O resultado é sempre só uma sugestão; o operador
+confirma antes de usar.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import Config
+from product_identity import identity_keys
+from products_log import LogSegments
+
+logger = logging.getLogger(__name__)
+
+# Linhas do log por transação na importação (não segura o banco durante todo o histórico)
+BATCH_SIZE = 500
+
+
+def product_keys(product_info: Dict) -> List[str]:
+    images = product_info.get('images') or []
+    return identity_keys(product_info.get('product_url'), images[0] if images else None,
+                         product_info.get('original_url'))
+
+
+def _asin_of(keys: List[str]) -> Optional[str]:
+    return next((key[5:] for key in keys if key.startswith('asin:')), None)
+
+
+class AffiliateLinkCache:
+    """Chave de identidade -> último link de afiliado usado, com ASIN e título (SQLite + memória)"""
+
+    def __init__(self, path: str = None, segments: LogSegments = None):
+        self.path = path or Config.STATE_DB_PATH
+        self.segments = segments or LogSegments()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=Config.SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(
+            'CREATE TABLE IF NOT EXISTS affiliate_links (key TEXT PRIMARY KEY, link TEXT NOT NULL, used_at REAL,'
+            ' asin TEXT, title TEXT);'
+            'CREATE TABLE IF NOT EXISTS log_checkpoints (name TEXT PRIMARY KEY, seq INTEGER, offset INTEGER);'
+        )
+        self._conn.commit()
+        self._links = {key: (link, used_at, asin, title) for key, link, used_at, asin, title in
+                       self._conn.execute('SELECT key, link, used_at, asin, title FROM affiliate_links')}
+        self.hits = 0
+        self.misses = 0
+
+    def _store(self, keys: List[str], link: str, used_at: float, title: str = ''):
+        asin = _asin_of(keys)
+        for key in keys:
+            # Registros antigos do log não sobrescrevem um link mais recente
+            if key in self._links and self._links[key][1] > used_at:
+                continue
+            self._links[key] = (link, used_at, asin, title)
+            self._conn.execute('INSERT OR REPLACE INTO affiliate_links (key, link, used_at, asin, title) '
+                               'VALUES (?, ?, ?, ?, ?)', (key, link, used_at, asin, title))
+
+    def remember(self, product_info: Dict, link: str):
+        """Guarda o link usado numa postagem para todas as chaves do produto"""
+        keys = product_keys(product_info)
+        if not link or not keys:
+            return
+        with self._lock, self._conn:
+            self._store(keys, link, time.time(), product_info.get('title', ''))
+
+    def lookup(self, product_info: Dict) -> Optional[Dict]:
+        """Link já usado para o mesmo produto: {'link', 'key', 'used_at', 'title', 'verified'}
+
+        Entradas com outro ASIN são ignoradas: imagem/link iguais não bastam
+        para ser o mesmo produto. Sem ASIN num dos lados, a entrada só é usada
+        se nenhuma chave confirmar o ASIN, com `verified` False.
+        """
+        keys = product_keys(product_info)
+        asin = _asin_of(keys)
+        unverified = None
+        for key in keys:
+            found = self._links.get(key)
+            if not found:
+                continue
+            # Mesmo ASIN; sem ASIN nos dois lados, só o link confirma (imagem não)
+            if found[2] == asin and (asin or key.startswith('url:')):
+                self.hits += 1
+                return {'link': found[0], 'key': key, 'used_at': found[1], 'title': found[3] or '',
+                        'verified': True}
+            if unverified is None and not (found[2] and asin):
+                unverified = {'link': found[0], 'key': key, 'used_at': found[1], 'title': found[3] or '',
+                              'verified': False}
+        if unverified:
+            self.hits += 1
+            return unverified
+        self.misses += 1
+        return None
+
+    def refresh(self) -> int:
+        """Importa os links das postagens novas do log (todo o histórico na primeira vez)"""
+        count = 0
+        with self._lock:
+            row = self._conn.execute("SELECT seq, offset FROM log_checkpoints WHERE name = 'affiliate_links'").fetchone()
+        checkpoint = tuple(row) if row else (0, 0)
+        if self.segments.checkpoint_ahead(*checkpoint):
+            checkpoint = (0, 0)
+        # Leitura do log fora do lock e da transação; cada lote é gravado de uma vez, com o checkpoint
+        rows = []
+        for seq, offset, line in self.segments.iter_lines(*checkpoint):
+            checkpoint = (seq, offset)
+            try:
+                record = json.loads(line)
+                used_at = datetime.fromisoformat(record['timestamp']).timestamp()
+            except (KeyError, TypeError, ValueError):
+                continue
+            link = record.get('affiliate_link')
+            keys = identity_keys(record.get('product_url'), record.get('image'), link)
+            if link and keys:
+                rows.append((keys, link, used_at, record.get('title', '')))
+            if len(rows) >= BATCH_SIZE:
+                self._import(rows, checkpoint)
+                count, rows = count + len(rows), []
+        self._import(rows, checkpoint)
+        count += len(rows)
+        if count:
+            logger.info(f"Links de afiliado: {count} postagens importadas do log")
+        return count
+
+    def _import(self, rows: List[tuple], checkpoint):
+        """Um lote de links do log + checkpoint na mesma transação"""
+        with self._lock, self._conn:
+            for keys, link, used_at, title in rows:
+                self._store(keys, link, used_at, title)
+            self._conn.execute("INSERT OR REPLACE INTO log_checkpoints (name, seq, offset) "
+                               "VALUES ('affiliate_links', ?, ?)", checkpoint)
+
+    def stats(self) -> Dict:
+        return {'keys': len(self._links), 'hits': self.hits, 'misses': self.misses}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
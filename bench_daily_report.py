@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark do relatório em streaming sobre um log sintético (um ano, um arquivo por dia)
+
+Uso:
+    python3 bench_daily_report.py --days 365 --per-day 200
+
+Para períodos crescentes mostra tempo, registros/s e pico de memória
+(tracemalloc) do pipeline de geradores e, para comparação, de carregar os
+registros numa lista antes de somar.
+"""
+
+import argparse
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from daily_report import DailyReport, build_report
+from product_identity import CTA_LABELS
+from products_log import ProductLog
+
+LINKS = ['https://amzn.to/{}', 'https://www.amazon.com/dp/B{:09d}', 'https://www.walmart.com/ip/{}',
+         'https://www.target.com/p/-/A-{}', 'https://shop.example.com/p/{}']
+
+
+def write_synthetic_log(path: str, archive_dir: str, days: int, per_day: int, seed: int) -> date:
+    """Grava `days` dias de postagens (rotação diária -> um .gz por dia); retorna o último dia"""
+    rng = random.Random(seed)
+    log = ProductLog(path, archive_dir, max_bytes=1 << 30)
+    end = date.today()
+    ctas = [''] + list(CTA_LABELS.values())
+    n = 0
+    for offset in range(days - 1, -1, -1):
+        day = end - timedelta(days=offset)
+        records = []
+        for _ in range(per_day):
+            n += 1
+            current = round(rng.uniform(5, 300), 2)
+            discount = rng.choice([0, 10, 20, 30, 40, 50, 60, 70, 80])
+            records.append({
+                'timestamp': f"{day.isoformat()}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:00",
+                'date': day.isoformat(), 'title': f"Produto sintético {n} com título de tamanho realista",
+                'price_current': current, 'price_original': round(current / (1 - discount / 100), 2),
+                'discount_percent': discount, 'affiliate_link': rng.choice(LINKS).format(n),
+                'image': f"https://m.media-amazon.com/images/I/{n:010d}.jpg", 'cta': rng.choice(ctas),
+                'custom_channel_text': '',
+            })
+        log._write_batch(records)
+    return end
+
+
+def load_all(log: ProductLog, start: str, end: str):
+    """Alternativa ingênua: todos os registros do período numa lista"""
+    report = DailyReport(start, end)
+    return report.consume(list(log.iter_records(since_date=start, until_date=end))).summary()
+
+
+def measure(function):
+    started = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark do relatório diário em streaming')
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--per-day', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench_report_')
+    try:
+        started = time.perf_counter()
+        path, archive_dir = f"{workdir}/products_log.jsonl", f"{workdir}/archive"
+        end = write_synthetic_log(path, archive_dir, args.days, args.per_day, args.seed)
+        print(f"🗂️ Log sintético: {args.days} dias x {args.per_day} postagens "
+              f"({args.days * args.per_day} registros) em {time.perf_counter() - started:.1f}s")
+        log = ProductLog(path, archive_dir)
+
+        periods = sorted({period for period in (1, 30, 90, 180, args.days) if period <= args.days})
+        print(f"\n{'dias':>5} {'registros':>10} {'tempo':>8} {'reg/s':>9} {'pico stream':>12} {'pico lista':>11}")
+        for period in periods:
+            start = (end - timedelta(days=period - 1)).isoformat()
+            summary, elapsed, peak = measure(lambda: build_report(end.isoformat(), period, segments=log))
+            _, _, list_peak = measure(lambda: load_all(log, start, end.isoformat()))
+            rate = summary['posts'] / elapsed if elapsed else 0
+            print(f"{period:>5} {summary['posts']:>10} {elapsed * 1000:>6.0f}ms {rate:>9.0f} "
+                  f"{peak / 1024:>9.0f} KB {list_peak / 1024:>8.0f} KB")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Benchmark de publicação no Shopify contra o servidor local (sem tocar na loja real)
+
+Uso:
+    python3 bench_shopify_publish.py --products 100 --concurrency 8 --latency-ms 80
+    python3 bench_shopify_publish.py --products 50 --leak-rate 2 --error-rate 0.02
+    python3 bench_shopify_publish.py --products 100 --reprice
+
+Usa o mesmo caminho do bot: um único loop, semáforo de SHOPIFY_MAX_CONCURRENCY
+e ShopifyManager.publish_product (como o _bulk_publish); --reprice mede também
+o update_prices (como o reprice.py). Mostra produtos/minuto, chamadas de API
+por produto, latência (p50/p95/p99) e o maior atraso do loop.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+import urllib.request
+
+import shopify
+from aiohttp import web
+
+from bot_with_edit import ShopifyManager
+from shopify_catalog import CatalogMirror
+from shopify_stub_server import ShopifyStub, create_app
+
+
+def start_stub_server(stub: ShopifyStub, port: int) -> threading.Thread:
+    """Sobe o servidor simulado em uma thread com loop próprio"""
+    ready = threading.Event()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(create_app(stub))
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, '127.0.0.1', port).start())
+        ready.set()
+        loop.run_forever()
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    ready.wait()
+    return thread
+
+
+def sample_product(n: int) -> dict:
+    """Produto sintético no formato do ProductExtractor"""
+    return {
+        'title': f"Produto de teste {n}",
+        'description': 'Descrição de teste',
+        'images': [f"https://m.media-amazon.com/images/I/{n:08d}A._AC_SL1500_.jpg"],
+        'price': {'current': 19.99, 'original': 39.99, 'discount_percent': 50},
+        'categories': ['Electronics', '50off'],
+        'product_url': f"https://www.amazon.com/dp/B{n:09d}",
+    }
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def fetch_stats(port: int) -> dict:
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/_stats") as response:
+        return json.loads(response.read())
+
+
+async def run_batch(manager: ShopifyManager, products: int, concurrency: int, reprice: bool):
+    """Publica o lote num só loop (como o _bulk_publish) e, se pedido, reajusta os preços"""
+    semaphore = asyncio.Semaphore(concurrency)
+    max_lag = 0.0
+
+    async def heartbeat():
+        # Chamada bloqueante no loop aparece aqui como atraso
+        nonlocal max_lag
+        while True:
+            before = time.perf_counter()
+            await asyncio.sleep(0.01)
+            max_lag = max(max_lag, time.perf_counter() - before - 0.01)
+
+    async def publish(n: int):
+        start = time.perf_counter()
+        async with semaphore:
+            status, _ = await manager.publish_product(sample_product(n), f"https://amzn.to/bench{n}")
+        return time.perf_counter() - start, status
+
+    monitor = asyncio.create_task(heartbeat())
+    start = time.perf_counter()
+    results = await asyncio.gather(*(publish(n) for n in range(products)))
+    elapsed = time.perf_counter() - start
+    reprice_result = None
+    if reprice:
+        updates = [{'product_id': record['id'], 'variant_id': record['variant_id'],
+                    'price': 17.99, 'compare_at_price': 39.99}
+                   for record in list(manager.catalog.products.values()) if record.get('variant_id')]
+        reprice_start = time.perf_counter()
+        outcome = await manager.update_prices(updates, concurrency=concurrency)
+        reprice_result = (len(updates), len(outcome['updated']), time.perf_counter() - reprice_start)
+    monitor.cancel()
+    return elapsed, results, reprice_result, max_lag
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de publicação no Shopify (servidor local)')
+    parser.add_argument('--products', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=20)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--bucket-size', type=int, default=40)
+    parser.add_argument('--leak-rate', type=float, default=0, help='0 = sem limite de chamadas')
+    parser.add_argument('--reprice', action='store_true', help='Depois do lote, reajustar os preços (update_prices)')
+    parser.add_argument('--verbose', action='store_true', help='Mostrar logs do ShopifyManager')
+    args = parser.parse_args()
+
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.ERROR)
+
+    stub = ShopifyStub(args.latency_ms, args.jitter_ms, args.error_rate,
+                       args.bucket_size, args.leak_rate, seed=42)
+    start_stub_server(stub, args.port)
+
+    manager = ShopifyManager()
+    shopify.ShopifyResource.set_site(f"http://127.0.0.1:{args.port}/admin/api/2023-10/")
+    shopify.ShopifyResource.set_headers({"X-Shopify-Access-Token": "bench"})
+    manager.catalog = CatalogMirror(os.path.join(tempfile.mkdtemp(), 'catalog.json'))
+    # Sem acesso às imagens reais: a pré-validação fica fora da medição
+    manager.image_preflight.enabled = False
+
+    elapsed, results, reprice_result, max_lag = asyncio.run(
+        run_batch(manager, args.products, args.concurrency, args.reprice))
+
+    latencies = [latency for latency, _ in results]
+    succeeded = sum(1 for _, status in results if status in ('created', 'updated'))
+    stats = fetch_stats(args.port)
+
+    print(f"📦 Produtos: {args.products} (concorrência {args.concurrency}) | ✅ {succeeded} | ❌ {args.products - succeeded}")
+    print(f"⏱️ Tempo total: {elapsed:.2f}s | {succeeded / elapsed * 60:.1f} produtos/min")
+    print(f"📡 Chamadas de API: {stats['total_calls']} | {stats['total_calls'] / args.products:.1f} por produto")
+    print(f"📈 Latência por produto: p50 {percentile(latencies, 50) * 1000:.0f}ms | "
+          f"p95 {percentile(latencies, 95) * 1000:.0f}ms | p99 {percentile(latencies, 99) * 1000:.0f}ms | "
+          f"média {statistics.mean(latencies) * 1000:.0f}ms")
+    if reprice_result:
+        total, updated, reprice_elapsed = reprice_result
+        print(f"💲 Reajuste: {updated}/{total} variantes em {reprice_elapsed:.2f}s")
+    print(f"🐢 Maior atraso do loop: {max_lag * 1000:.0f}ms")
+    print("🔎 Chamadas por endpoint:")
+    for name, count in sorted(stats['calls'].items(), key=lambda item: -item[1]):
+        print(f"   {count:6d}  {name}")
+    print(f"📊 Status HTTP: {stats['status_codes']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+"""
+Teste de carga do processamento de updates (sequencial x concorrente por usuário)
+
+Uso:
+    python3 bench_update_concurrency.py --operators 5 --updates 20
+    python3 bench_update_concurrency.py --operators 10 --slow-ms 3000 --slow-ratio 0.3
+    python3 bench_update_concurrency.py --burst 40 --concurrency 8
+    python3 bench_update_concurrency.py --block-on-loop
+
+Simula vários operadores enviando links (lentos: extração) e cliques em
+botões (rápidos) e processa os updates como a Application faz: uma task por
+update, na ordem de chegada. Compara vazão, latência e violações de ordem.
+
+A extração simulada bloqueia de verdade (time.sleep, como requests e o parse
+do BeautifulSoup) e roda em asyncio.to_thread, como no bot. Com
+`--block-on-loop` ela roda direto no loop: a concorrência deixa de ajudar e o
+atraso máximo do loop mostra o bot travado.
+
+O cenário de rajada põe um operador extra na frente com uma extração lenta
+seguida de `--burst` cliques e mede a latência dos demais operadores.
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor, SimpleUpdateProcessor
+
+from update_processor import UserOrderedUpdateProcessor
+
+
+class SlotHoldingProcessor(BaseUpdateProcessor):
+    """Ordem por usuário esperando o lock já dentro da vaga do semáforo (versão anterior)"""
+
+    def __init__(self, max_concurrent_updates: int):
+        super().__init__(max_concurrent_updates)
+        self._locks = {}
+
+    async def do_process_update(self, update, coroutine):
+        lock = self._locks.setdefault(update.effective_user.id, asyncio.Lock())
+        async with lock:
+            await coroutine
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
+
+
+def make_updates(operators: int, per_operator: int, slow_ratio: float, seed: int, burst: int = 0):
+    """Updates intercalados entre operadores: (update, operador, seq, é_lento)
+
+    Com `burst`, o operador extra de número `operators` chega antes de todos com
+    uma extração lenta seguida de `burst` cliques.
+    """
+    rng = random.Random(seed)
+    streams = []
+    for operator in range(operators):
+        streams.append([(operator, seq, rng.random() < slow_ratio) for seq in range(per_operator)])
+    if burst:
+        streams.insert(0, [(operators, seq, seq == 0) for seq in range(burst + 1)])
+
+    updates, update_id = [], 0
+    while any(streams):
+        if burst and streams[0]:
+            # Rajada inteira antes dos outros operadores
+            stream = streams[0]
+            while stream:
+                operator, seq, slow = stream.pop(0)
+                update_id += 1
+                updates.append((_callback_update(update_id, operator, slow), operator, seq, slow))
+            continue
+        for stream in streams:
+            if stream:
+                operator, seq, slow = stream.pop(0)
+                update_id += 1
+                updates.append((_callback_update(update_id, operator, slow), operator, seq, slow))
+    return updates
+
+
+def _callback_update(update_id: int, operator: int, slow: bool) -> Update:
+    return Update.de_json({
+        'update_id': update_id,
+        'callback_query': {
+            'id': str(update_id),
+            'from': {'id': 1000 + operator, 'is_bot': False, 'first_name': f"op{operator}"},
+            'chat_instance': str(operator),
+            'data': 'publish_as_is' if slow else 'edit_title',
+        },
+    }, None)
+
+
+async def run_mode(processor, updates, slow_ms: float, fast_ms: float, jitter: float, seed: int,
+                   block_on_loop: bool = False):
+    """Processa todos os updates e retorna
+    (tempo total, latências por operador, violações de ordem, sobreposições, maior atraso do loop)
+    """
+    rng = random.Random(seed)
+    last_seq = {}
+    running = {}
+    violations = overlaps = 0
+    latencies = {}
+
+    async def handler(operator, seq, slow, enqueued_at):
+        nonlocal violations, overlaps
+        running[operator] = running.get(operator, 0) + 1
+        if running[operator] > 1:
+            overlaps += 1
+
+        duration = (slow_ms if slow else fast_ms) * (1 + rng.uniform(-jitter, jitter)) / 1000
+        if not slow:
+            await asyncio.sleep(duration)  # clique: só espera a API do Telegram
+        elif block_on_loop:
+            time.sleep(duration)
+        else:
+            await asyncio.to_thread(time.sleep, duration)
+
+        # Um update que termina antes de um anterior do mesmo operador está fora de ordem
+        if seq < last_seq.get(operator, -1):
+            violations += 1
+        last_seq[operator] = max(seq, last_seq.get(operator, -1))
+        running[operator] -= 1
+        latencies.setdefault(operator, []).append(time.perf_counter() - enqueued_at)
+
+    max_lag = 0.0
+
+    async def heartbeat():
+        # Atraso do loop: quanto um tick de 10ms demora além do previsto
+        nonlocal max_lag
+        while True:
+            before = time.perf_counter()
+            await asyncio.sleep(0.01)
+            max_lag = max(max_lag, time.perf_counter() - before - 0.01)
+
+    started = time.perf_counter()
+    monitor = asyncio.create_task(heartbeat())
+    async with processor:
+        tasks = []
+        for update, operator, seq, slow in updates:
+            coroutine = handler(operator, seq, slow, time.perf_counter())
+            tasks.append(asyncio.create_task(processor.process_update(update, coroutine)))
+        await asyncio.gather(*tasks)
+    monitor.cancel()
+    return time.perf_counter() - started, latencies, violations, overlaps, max_lag
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Teste de carga do processamento de updates')
+    parser.add_argument('--operators', type=int, default=5)
+    parser.add_argument('--updates', type=int, default=20, help='Updates por operador')
+    parser.add_argument('--slow-ms', type=float, default=1500, help='Duração de um update lento (extração)')
+    parser.add_argument('--fast-ms', type=float, default=60, help='Duração de um clique em botão')
+    parser.add_argument('--slow-ratio', type=float, default=0.2)
+    parser.add_argument('--jitter', type=float, default=0.3)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--burst', type=int, default=40, help='Cliques do operador da rajada (0 desativa)')
+    parser.add_argument('--block-on-loop', action='store_true',
+                        help='Extração bloqueante direto no loop (sem asyncio.to_thread)')
+    args = parser.parse_args()
+
+    updates = make_updates(args.operators, args.updates, args.slow_ratio, args.seed)
+    modes = [
+        ('sequencial (padrão)', SimpleUpdateProcessor(1)),
+        ('concorrente sem locks', SimpleUpdateProcessor(args.concurrency)),
+        ('concorrente por usuário', UserOrderedUpdateProcessor(args.concurrency)),
+    ]
+
+    print(f"👥 {args.operators} operadores x {args.updates} updates "
+          f"({sum(1 for u in updates if u[3])} lentos de {args.slow_ms:.0f}ms, demais {args.fast_ms:.0f}ms)")
+    print(f"🧵 Extração bloqueante {'direto no loop' if args.block_on_loop else 'em asyncio.to_thread'}")
+    baseline = None
+    for name, processor in modes:
+        elapsed, by_operator, violations, overlaps, lag = asyncio.run(
+            run_mode(processor, updates, args.slow_ms, args.fast_ms, args.jitter, args.seed, args.block_on_loop))
+        latencies = [value for values in by_operator.values() for value in values]
+        baseline = baseline or elapsed
+        print(f"\n▶️ {name}")
+        print(f"   ⏱️ {elapsed:.2f}s | {len(updates) / elapsed:.1f} updates/s | {baseline / elapsed:.1f}x")
+        print(f"   📈 Latência: p50 {statistics.median(latencies) * 1000:.0f}ms | "
+              f"p95 {percentile(latencies, 95) * 1000:.0f}ms")
+        print(f"   🔀 Fora de ordem: {violations} | Sobrepostos no mesmo operador: {overlaps}")
+        print(f"   🐢 Maior atraso do loop: {lag * 1000:.0f}ms")
+
+    if not args.burst:
+        return
+    updates = make_updates(args.operators, args.updates, args.slow_ratio, args.seed, args.burst)
+    print(f"\n💥 Rajada: 1 operador com 1 extração + {args.burst} cliques na frente de "
+          f"{args.operators} operadores ({args.concurrency} vagas)")
+    for name, processor in [('lock dentro da vaga (anterior)', SlotHoldingProcessor(args.concurrency)),
+                            ('concorrente por usuário', UserOrderedUpdateProcessor(args.concurrency))]:
+        elapsed, by_operator, violations, _, lag = asyncio.run(
+            run_mode(processor, updates, args.slow_ms, args.fast_ms, args.jitter, args.seed, args.block_on_loop))
+        others = [value for operator, values in by_operator.items() if operator != args.operators
+                  for value in values]
+        print(f"\n▶️ {name}")
+        print(f"   ⏱️ {elapsed:.2f}s | demais operadores: p50 {statistics.median(others) * 1000:.0f}ms | "
+              f"p95 {percentile(others, 95) * 1000:.0f}ms | fora de ordem: {violations} | "
+              f"atraso do loop: {lag * 1000:.0f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -5,13 +5,44 @@ Bot com funcionalidade de edição
 
 import logging
 import asyncio
+import threading
+import time
+from datetime import date, datetime, timedelta
 from typing import Optional, Dict, List
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes, CallbackQueryHandler, ConversationHandler
 from urllib.parse import urlparse
 from extractors import SiteSpecificExtractor
 from config import Config, Messages
+from product_identity import CTA_LABELS, extract_asin, retailer_of
+from shopify_catalog import CatalogMirror
+from image_preflight import ImagePreflight
+from http_client import close_session
+from telegram_file_cache import FileIdCache
+from outbound_scheduler import OutboundScheduler
+from webhook_server import run_webhook
+from callback_router import CallbackRouter
+from state_store import StateBackend, StateStore
+from update_processor import UserOrderedUpdateProcessor
+from bulk_ingest import dedupe_products, extract_many, extract_urls, read_url_file
+from post_queue import PostQueue
+from channel_publisher import ChannelPublisher
+from products_log import ProductLog, build_log_record
+from product_stats import StatsAggregator
+from log_snapshot import SnapshotWriter
+from deal_analytics import DealAnalytics
+from product_index import ProductIndex
+from price_history import PriceHistory
+from near_duplicates import NearDuplicateIndex
+from affiliate_links import AffiliateLinkCache
+from daily_report import build_report, format_report
+from request_trace import RequestTracer, stage as trace_stage
+from preview_renderer import (CHANNEL_PREVIEW_KEYBOARD, PRODUCT_PREVIEW_KEYBOARD, MessageEditor,
+                              render_channel_preview, render_product_preview)
+from types import SimpleNamespace
+from zoneinfo import ZoneInfo
 import shopify
+from pyactiveresource.connection import ClientError
 
 # Estados da conversa
 WAITING_TITLE, WAITING_PRICE_CURRENT, WAITING_PRICE_ORIGINAL, WAITING_DESCRIPTION, WAITING_IMAGES = range(5)
@@ -36,7 +67,8 @@ class ProductExtractor:
             import time
             
             # Expandir links curtos (amzn.to, etc)
-            final_url = await self._expand_short_url(url)
+            with trace_stage('expand'):
+                final_url = await self._expand_short_url(url)
             
             # Headers mais realistas para evitar bloqueio
             headers = {
@@ -65,20 +97,28 @@ class ProductExtractor:
             # Pequeno delay aleatório antes da requisição (simula comportamento humano)
             await asyncio.sleep(random.uniform(0.5, 1.5))
             
-            # Fazer requisição com timeout adequado
-            response = session.get(
-                final_url, 
-                timeout=Config.REQUEST_TIMEOUT, 
-                allow_redirects=True,
-                verify=True  # Verificar SSL
-            )
-            response.raise_for_status()
+            # Fazer requisição com timeout adequado (em thread: não bloqueia o loop)
+            with trace_stage('fetch'):
+                response = await asyncio.to_thread(
+                    session.get,
+                    final_url, 
+                    timeout=Config.REQUEST_TIMEOUT, 
+                    allow_redirects=True,
+                    verify=True  # Verificar SSL
+                )
+                response.raise_for_status()
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Parse e extração também rodam fora do loop (vários links em paralelo)
+            def parse():
+                with trace_stage('parse'):
+                    soup = BeautifulSoup(response.content, 'html.parser')
+                # Usar extrator específico do site
+                with trace_stage('extract'):
+                    return self.site_extractor.extract(final_url, soup)
             
-            # Usar extrator específico do site
-            product_info = self.site_extractor.extract(final_url, soup)
+            product_info = await asyncio.to_thread(parse)
             product_info['original_url'] = url  # Manter URL original (pode ser link curto)
+            product_info['product_url'] = final_url  # URL expandida (usada para identificar o produto)
             
             return product_info
             
@@ -97,7 +137,7 @@ class ProductExtractor:
             if 'amzn.to' in url.lower():
                 import requests
                 # Fazer requisição HEAD para pegar a URL final sem baixar o conteúdo
-                response = requests.head(url, allow_redirects=True, timeout=10)
+                response = await asyncio.to_thread(requests.head, url, allow_redirects=True, timeout=10)
                 url = response.url
             
             # IMPORTANTE: Limpar parâmetros de afiliado para evitar detecção de bot
@@ -141,6 +181,33 @@ class ShopifyManager:
         if Config.SHOPIFY_SHOP_URL and Config.SHOPIFY_ACCESS_TOKEN:
             shopify.ShopifyResource.set_site(f"https://{Config.SHOPIFY_SHOP_URL}/admin/api/2023-10/")
             shopify.ShopifyResource.set_headers({"X-Shopify-Access-Token": Config.SHOPIFY_ACCESS_TOKEN})
+        self.catalog = CatalogMirror()
+        self.image_preflight = ImagePreflight()
+        # Collections criadas nesta execução: publicações em paralelo não criam o mesmo nome duas vezes
+        self._collections_lock = threading.Lock()
+        self._created_collections = {}
+    
+    async def publish_product(self, product_info: Dict, affiliate_link: str):
+        """Cria o produto ou, se já está na loja, só atualiza o preço
+        
+        Retorna (status, resultado): 'created', 'updated', 'price_failed' ou 'failed'.
+        """
+        price_info = product_info.get('price', {})
+        existing = self.catalog.lookup(
+            affiliate_link=affiliate_link,
+            url=product_info.get('product_url'),
+            title=product_info.get('title')
+        )
+        if existing:
+            # Já está na loja: só atualizar o preço (sem preço novo, não posta com o antigo)
+            current_price = price_info.get('current', 0)
+            if not await self.update_product_price(existing, current_price,
+                                                   price_info.get('original', current_price)):
+                return 'price_failed', None
+            return 'updated', {'id': existing['id'], 'handle': existing.get('handle'),
+                               'title': existing.get('title'), 'url': existing.get('url')}
+        result = await self.create_product(product_info, affiliate_link)
+        return ('created', result) if result else ('failed', None)
     
     async def create_product(self, product_data: Dict, affiliate_link: str) -> Optional[Dict]:
         """Cria produto no Shopify"""
@@ -158,8 +225,14 @@ class ShopifyManager:
                 'images': []
             }
             
-            # Adicionar imagens
-            images_list = product_data.get('images', [])
+            # Tag com ASIN permite identificar o produto na sincronização do catálogo
+            asin = extract_asin(product_data.get('product_url', '')) or extract_asin(affiliate_link)
+            if asin:
+                shopify_product['tags'] = f"asin:{asin}"
+            
+            # Adicionar imagens (pré-validadas: sem links quebrados, em alta resolução)
+            with trace_stage('shopify.image_preflight'):
+                images_list = await self.image_preflight.run(product_data.get('images', []))
             logger.info(f"Imagens sendo enviadas para o Shopify: {images_list}")
             
             for img_url in images_list:
@@ -178,90 +251,33 @@ class ShopifyManager:
                 'inventory_policy': 'continue'
             }]
             
-            # Criar produto
+            # Criar produto (chamadas do Shopify são síncronas: em thread, sem travar o loop)
             product = shopify.Product(shopify_product)
-            if product.save():
+            with trace_stage('shopify.product_save'):
+                saved = await asyncio.to_thread(product.save)
+            if saved:
                 # Adicionar metafield com link de afiliado
-                logger.info(f"🔗 SALVANDO AFFILIATE LINK: {affiliate_link}")
-                logger.info(f"🔗 Namespace: {Config.AFFILIATE_LINK_METAFIELD_NAMESPACE}")
-                logger.info(f"🔗 Key: {Config.AFFILIATE_LINK_METAFIELD_KEY}")
-                try:
-                    # Usar a MESMA lógica que funcionou no teste
-                    logger.info(f"🔍 Buscando metafield usando método que funcionou...")
-                    logger.info(f"🔗 Link a ser salvo: {affiliate_link}")
-                    logger.info(f"🎯 Produto ID: {product.id}")
-                    
-                    # Buscar TODOS os metafields (igual ao teste que funcionou)
-                    all_metafields = shopify.Metafield.find()
-                    logger.info(f"📋 Total de metafields encontrados: {len(all_metafields)}")
-                    
-                    # Procurar o metafield específico do produto
-                    affiliate_metafield = None
-                    for mf in all_metafields:
-                        # Verificar se é do produto atual E tem namespace/key corretos
-                        if (mf.owner_resource == 'product' and 
-                            str(mf.owner_id) == str(product.id) and
-                            mf.namespace == 'custom' and 
-                            mf.key == 'affiliate_link'):
-                            affiliate_metafield = mf
-                            logger.info(f"✅ ENCONTRADO metafield do produto: {mf.namespace}.{mf.key} (ID: {mf.id})")
-                            break
-                    
-                    if affiliate_metafield:
-                        # Preencher o metafield (igual ao teste que funcionou)
-                        logger.info(f"✏️ Preenchendo metafield com: {affiliate_link}")
-                        affiliate_metafield.value = affiliate_link
-                        
-                        if affiliate_metafield.save():
-                            logger.info(f"✅ Metafield preenchido com sucesso!")
-                            logger.info(f"✅ Produto ID: {product.id}")
-                            logger.info(f"✅ Metafield ID: {affiliate_metafield.id}")
-                            logger.info(f"✅ Valor salvo: {affiliate_link}")
-                        else:
-                            logger.error(f"❌ Erro ao preencher metafield: {affiliate_metafield.errors}")
-                    else:
-                        # Se não encontrou, criar um novo com as configurações corretas
-                        logger.warning(f"⚠️ Metafield não encontrado para produto {product.id}")
-                        logger.info(f"🆕 Criando metafield com configurações corretas...")
-                        
-                        # Usar as configurações que funcionaram no teste
-                        new_metafield = shopify.Metafield({
-                            'namespace': 'custom',
-                            'key': 'affiliate_link',
-                            'value': affiliate_link,
-                            'type': 'url',  # Tipo correto que aparece na interface
-                            'owner_id': product.id,
-                            'owner_resource': 'product'
-                        })
-                        
-                        if new_metafield.save():
-                            logger.info(f"✅ Metafield criado com sucesso!")
-                            logger.info(f"✅ ID: {new_metafield.id}")
-                            logger.info(f"✅ Namespace: custom")
-                            logger.info(f"✅ Key: affiliate_link")
-                            logger.info(f"✅ Type: url")
-                            logger.info(f"✅ Valor: {affiliate_link}")
-                            logger.info(f"✅ Agora deve aparecer na interface do Shopify!")
-                        else:
-                            logger.error(f"❌ Erro ao criar metafield: {new_metafield.errors}")
-                            try:
-                                logger.error(f"❌ Detalhes: {new_metafield.errors.full_messages()}")
-                            except:
-                                logger.error(f"❌ Sem detalhes do erro")
-                            
-                except Exception as e:
-                    logger.error(f"❌ Erro ao processar metafield: {e}")
+                logger.info(f"🔗 SALVANDO AFFILIATE LINK: {affiliate_link} (produto {product.id})")
+                await asyncio.to_thread(self.save_affiliate_metafield, product.id, affiliate_link)
                 
                 # Adicionar produto às Collections
                 logger.info(f"Adicionando produto às Collections: {categories}")
-                self.add_product_to_collections(product.id, categories)
+                with trace_stage('shopify.collections'):
+                    await asyncio.to_thread(self.add_product_to_collections, product.id, categories)
                 
-                return {
+                result = {
                     'id': product.id,
                     'handle': product.handle,
                     'title': product.title,
                     'url': f"https://{Config.SHOPIFY_SHOP_URL}/products/{product.handle}"
                 }
+                
+                # Registrar no espelho local (evita duplicar sem consultar o Shopify)
+                variants = getattr(product, 'variants', None) or []
+                variant = variants[0].to_dict() if variants else None
+                await asyncio.to_thread(self.catalog.record_created, result, product_data, affiliate_link, variant)
+                
+                return result
             else:
                 logger.error(f"Erro ao criar produto: {product.errors}")
                 return None
@@ -270,6 +286,130 @@ class ShopifyManager:
             logger.error(f"Erro no Shopify: {e}")
             return None
     
+    def save_affiliate_metafield(self, product_id, affiliate_link: str) -> bool:
+        """Grava o link de afiliado no metafield custom.affiliate_link do produto (síncrono)
+
+        Consulta só os metafields do produto (/products/<id>/metafields.json),
+        não os da loja inteira.
+        """
+        try:
+            with trace_stage('shopify.metafield_find'):
+                metafields = shopify.Metafield.find(resource='products', resource_id=product_id,
+                                                    namespace='custom', key='affiliate_link')
+            metafield = next((mf for mf in metafields
+                              if mf.namespace == 'custom' and mf.key == 'affiliate_link'), None)
+            if metafield:
+                metafield.value = affiliate_link
+            else:
+                # Tipo url: o mesmo que aparece na interface do Shopify
+                metafield = shopify.Metafield({
+                    'namespace': 'custom',
+                    'key': 'affiliate_link',
+                    'value': affiliate_link,
+                    'type': 'url',
+                    'owner_id': product_id,
+                    'owner_resource': 'product'
+                })
+            with trace_stage('shopify.metafield_save'):
+                saved = metafield.save()
+            if saved:
+                logger.info(f"✅ Metafield do produto {product_id} com link de afiliado: {affiliate_link}")
+                return True
+            logger.error(f"❌ Erro ao salvar metafield do produto {product_id}: {metafield.errors.full_messages()}")
+            return False
+        except Exception as e:
+            logger.error(f"❌ Erro ao processar metafield: {e}")
+            return False
+    
+    async def sync_catalog(self) -> int:
+        """Sincroniza o espelho local do catálogo (em thread separada)"""
+        if not (Config.SHOPIFY_SHOP_URL and Config.SHOPIFY_ACCESS_TOKEN):
+            return 0
+        try:
+            return await asyncio.to_thread(self.catalog.sync)
+        except Exception as e:
+            logger.error(f"Erro ao sincronizar catálogo: {e}")
+            return 0
+    
+    def _with_retry(self, func, *args, max_attempts: int = 3):
+        """Executa chamada ao Shopify respeitando o Retry-After em caso de 429"""
+        for attempt in range(1, max_attempts + 1):
+            try:
+                return func(*args)
+            except ClientError as e:
+                response = getattr(e, 'response', None)
+                if getattr(response, 'code', None) != 429 or attempt == max_attempts:
+                    raise
+                retry_after = float((response.headers or {}).get('Retry-After', 2))
+                logger.warning(f"Limite da API do Shopify atingido, aguardando {retry_after}s")
+                time.sleep(retry_after)
+    
+    def update_variant_price(self, variant_id, current_price: float, original_price: float) -> bool:
+        """Atualiza apenas price/compare_at_price da variante (uma única chamada PUT)"""
+        compare_at = original_price if original_price > current_price else None
+        # product_id=None força o endpoint /variants/{id}.json
+        variant = shopify.Variant({
+            'id': variant_id,
+            'price': f"{current_price:.2f}",
+            'compare_at_price': f"{compare_at:.2f}" if compare_at else None
+        }, prefix_options={'product_id': None})
+        if self._with_retry(variant.save):
+            return True
+        logger.error(f"Erro ao atualizar preço da variante {variant_id}: {variant.errors.full_messages()}")
+        return False
+    
+    async def update_product_price(self, existing: Dict, current_price: float, original_price: float) -> bool:
+        """Atualiza o preço de um produto já publicado (sem recriar o produto)"""
+        try:
+            variant_id = existing.get('variant_id')
+            if not variant_id:
+                # Espelho antigo sem variante: buscar uma vez na loja
+                product = await asyncio.to_thread(shopify.Product.find, existing['id'])
+                variant_id = product.variants[0].id
+            
+            with trace_stage('shopify.update_price'):
+                updated = await asyncio.to_thread(self.update_variant_price, variant_id, current_price, original_price)
+            if updated:
+                compare_at = original_price if original_price > current_price else None
+                self.catalog.update_price(existing['id'], current_price, compare_at)
+                await asyncio.to_thread(self.catalog.save)
+                logger.info(f"Preço do produto {existing['id']} atualizado para ${current_price:.2f}")
+            return updated
+        except Exception as e:
+            logger.error(f"Erro ao atualizar preço do produto {existing.get('id')}: {e}")
+            return False
+    
+    async def update_prices(self, updates: List[Dict], concurrency: int = None) -> Dict:
+        """Atualiza preços em lote (um PUT por variante, concorrência limitada)
+        
+        Cada item: {'product_id', 'variant_id', 'price', 'compare_at_price'}
+        """
+        semaphore = asyncio.Semaphore(concurrency or Config.SHOPIFY_MAX_CONCURRENCY)
+        results = {'updated': [], 'failed': []}
+        
+        async def update_one(item):
+            async with semaphore:
+                try:
+                    ok = await asyncio.to_thread(
+                        self.update_variant_price, item['variant_id'],
+                        float(item['price']), float(item.get('compare_at_price') or 0)
+                    )
+                except Exception as e:
+                    logger.error(f"Erro ao atualizar variante {item.get('variant_id')}: {e}")
+                    ok = False
+            if ok:
+                compare_at = float(item.get('compare_at_price') or 0)
+                self.catalog.update_price(item['product_id'], float(item['price']),
+                                          compare_at if compare_at > float(item['price']) else None)
+                results['updated'].append(item['product_id'])
+            else:
+                results['failed'].append(item['product_id'])
+        
+        await asyncio.gather(*(update_one(item) for item in updates))
+        await asyncio.to_thread(self.catalog.save)
+        logger.info(f"Preços atualizados: {len(results['updated'])} ok, {len(results['failed'])} falhas")
+        return results
+    
     def get_collections(self):
         """Busca todas as collections existentes no Shopify"""
         try:
@@ -300,24 +440,32 @@ class ShopifyManager:
             logger.error(f"Erro ao criar collection '{collection_name}': {e}")
             return None
     
+    def _get_or_create_collection(self, collection_name, existing_collections):
+        """Id da collection pelo nome, criando uma única vez mesmo com várias threads"""
+        collection_name_lower = collection_name.lower()
+        if collection_name_lower in existing_collections:
+            collection_id = existing_collections[collection_name_lower]
+            logger.info(f"Collection '{collection_name}' já existe (ID: {collection_id})")
+            return collection_id
+        with self._collections_lock:
+            # Outra publicação pode ter criado depois da nossa busca em get_collections
+            if collection_name_lower not in self._created_collections:
+                collection_id = self.create_collection(collection_name)
+                if not collection_id:
+                    return None
+                self._created_collections[collection_name_lower] = collection_id
+            return self._created_collections[collection_name_lower]
+    
     def add_product_to_collections(self, product_id, collection_names):
         """Adiciona produto às collections especificadas"""
         try:
             existing_collections = self.get_collections()
             
             for collection_name in collection_names:
-                collection_name_lower = collection_name.lower()
-                
-                # Verificar se collection existe
-                if collection_name_lower in existing_collections:
-                    collection_id = existing_collections[collection_name_lower]
-                    logger.info(f"Collection '{collection_name}' já existe (ID: {collection_id})")
-                else:
-                    # Criar nova collection
-                    collection_id = self.create_collection(collection_name)
-                    if not collection_id:
-                        logger.error(f"Falha ao criar collection '{collection_name}'")
-                        continue
+                collection_id = self._get_or_create_collection(collection_name, existing_collections)
+                if not collection_id:
+                    logger.error(f"Falha ao criar collection '{collection_name}'")
+                    continue
                 
                 # Adicionar produto à collection
                 try:
@@ -339,8 +487,201 @@ class TelegramBotWithEdit:
     def __init__(self):
         self.product_extractor = ProductExtractor()
         self.shopify_manager = ShopifyManager()
-        self.pending_products = {}
-        self.editing_products = {}
+        self.file_id_cache = FileIdCache()
+        self.outbound_scheduler = OutboundScheduler()
+        self.channel_publisher = ChannelPublisher(self.file_id_cache)
+        self.message_editor = MessageEditor()
+        self.outbound_scheduler.observers.append(self.message_editor.observe)
+        self.state_backend = StateBackend()
+        self.pending_products = StateStore('pending_products', self.state_backend)
+        self.editing_products = StateStore('editing_products', self.state_backend)
+        self.bulk_batches = StateStore('bulk_batches', self.state_backend)
+        self.post_queue = PostQueue()
+        self.products_log = ProductLog()
+        self.product_stats = StatsAggregator(segments=self.products_log)
+        self.log_snapshot = SnapshotWriter(segments=self.products_log)
+        self.product_index = ProductIndex(segments=self.products_log)
+        self.price_history = PriceHistory(segments=self.products_log)
+        self.near_duplicates = NearDuplicateIndex(segments=self.products_log)
+        self.affiliate_links = AffiliateLinkCache(segments=self.products_log)
+        # Derivados do log atualizados com as linhas novas logo após cada gravação
+        self.products_log.listeners.extend([self.product_stats.refresh, self.log_snapshot.sync,
+                                            self.product_index.refresh, self.price_history.refresh,
+                                            self.near_duplicates.refresh, self.affiliate_links.refresh])
+        self.deal_analytics = DealAnalytics()
+        self.tracer = RequestTracer()
+        self.application = None
+        self.callback_router = self._build_callback_router()
+    
+    def _build_callback_router(self) -> CallbackRouter:
+        """Tabela de rotas dos botões (callback_data -> handler)"""
+        def simple(method):
+            return lambda query, user_id, context, payload: method(query, user_id)
+        
+        def with_context(method):
+            return lambda query, user_id, context, payload: method(query, user_id, context)
+        
+        router = CallbackRouter()
+        router.add("publish_to_shopify", self._cb_publish_to_shopify)
+        router.add("publish_to_channel_only", simple(self._handle_channel_only_flow))
+        router.add("edit_title", simple(self._start_edit_title))
+        router.add("manage_categories", simple(self._show_category_management))
+        router.add("add_main_category", simple(self._show_main_categories))
+        router.add("add_discount_category", simple(self._show_discount_categories))
+        router.add("back_to_preview", simple(self._back_to_preview))
+        router.add("back_to_channel_preview", self._cb_back_to_channel_preview)
+        router.add("edit_prices", simple(self._start_edit_prices))
+        router.add("edit_description", simple(self._start_edit_description))
+        router.add("edit_images", simple(self._start_edit_images))
+        router.add("add_cta", simple(self._show_cta_menu))
+        router.add("cta_custom", simple(self._start_edit_custom_cta))
+        router.add("cta_remove", simple(self._remove_cta))
+        router.add("publish_as_is", with_context(self._publish_product))
+        router.add("force_create_product", self._cb_force_create_product)
+        router.add("update_existing_price", with_context(self._update_existing_price))
+        router.add("confirm_post_channel", with_context(self._confirm_post_channel))
+        router.add("edit_channel_text", simple(self._edit_channel_text))
+        router.add("edit_channel_preview", simple(self._edit_channel_preview))
+        router.add("cancel_channel_post", simple(self._cancel_channel_post))
+        router.add("channel_edit_title", simple(self._start_channel_edit_title))
+        router.add("channel_edit_image", simple(self._start_channel_edit_image))
+        router.add("channel_edit_price", simple(self._start_channel_edit_price))
+        router.add("channel_post_direct", with_context(self._post_channel_direct))
+        router.add("cancel", self._cb_cancel)
+        router.add("bulk_publish_shopify", lambda query, user_id, context, payload:
+                   self._bulk_publish(query, user_id, context, to_shopify=True))
+        router.add("bulk_publish_channel", lambda query, user_id, context, payload:
+                   self._bulk_publish(query, user_id, context, to_shopify=False))
+        router.add("bulk_discard", simple(self._bulk_discard))
+        router.add("bulk_schedule_shopify", lambda query, user_id, context, payload:
+                   self._bulk_publish(query, user_id, context, to_shopify=True, schedule=True))
+        router.add("bulk_schedule_channel", lambda query, user_id, context, payload:
+                   self._bulk_publish(query, user_id, context, to_shopify=False, schedule=True))
+        router.add("schedule_post_channel", simple(self._schedule_post_channel))
+        router.add("channel_schedule_direct", simple(self._schedule_channel_direct))
+        router.add("use_saved_affiliate_link", with_context(self._use_saved_affiliate_link))
+        router.add("bulk_use_saved_links", simple(self._bulk_use_saved_links))
+        
+        router.add_prefix("main_cat_", lambda query, user_id, context, payload:
+                          self._add_category(query, user_id, payload.replace("_", " ")))
+        router.add_prefix("disc_cat_", lambda query, user_id, context, payload:
+                          self._add_category(query, user_id, payload))
+        router.add_prefix("remove_cat_", lambda query, user_id, context, payload:
+                          self._remove_category(query, user_id, payload.replace("_", " ")))
+        router.add_prefix("cta_", lambda query, user_id, context, payload:
+                          self._add_cta(query, user_id, CTA_LABELS.get(payload, payload.replace("_", " "))))
+        router.add_prefix("bulk_open_", lambda query, user_id, context, payload:
+                          self._bulk_open_item(query, user_id, payload))
+        router.add_prefix("queue_cancel_", lambda query, user_id, context, payload:
+                          self._cancel_scheduled_post(query, payload))
+        return router
+    
+    async def _cb_publish_to_shopify(self, query, user_id: int, context, payload=None):
+        """Fluxo completo: mostrar preview com todas as opções de edição"""
+        if user_id in self.pending_products:
+            product_info = self.pending_products[user_id]
+            # Criar um objeto fake para update (a função não usa, mas precisa da assinatura)
+            from types import SimpleNamespace
+            fake_update = SimpleNamespace()
+            await self._show_product_preview_with_edit(fake_update, product_info, query.message)
+    
+    async def _cb_back_to_channel_preview(self, query, user_id: int, context, payload=None):
+        """Voltar especificamente para o preview simplificado de canal"""
+        product_info = self.pending_products.get(user_id, {})
+        if product_info:
+            await self._show_channel_only_preview(query, user_id, product_info)
+        else:
+            await query.edit_message_text("❌ Produto não encontrado.")
+    
+    async def _cb_force_create_product(self, query, user_id: int, context, payload=None):
+        """Publica mesmo com produto equivalente já no catálogo"""
+        if user_id in self.pending_products:
+            self.pending_products[user_id]['force_create'] = True
+        await self._publish_product(query, user_id, context)
+    
+    async def _cb_cancel(self, query, user_id: int, context, payload=None):
+        await query.edit_message_text("❌ Operação cancelada.")
+        if user_id in self.pending_products:
+            self.tracer.finish(self.pending_products[user_id].get('trace_id'), 'cancelled')
+            del self.pending_products[user_id]
+    
+    async def post_init(self, application: Application):
+        """Inicia tarefas em segundo plano após a aplicação subir"""
+        application.create_task(self._catalog_sync_loop())
+        application.create_task(self._state_flush_loop())
+        if Config.ADMIN_CHAT_ID:
+            application.create_task(self._daily_report_loop())
+        self.application = application
+        application.create_task(self.post_queue.run(self._post_scheduled))
+        application.create_task(self.products_log.run())
+        # Primeira execução: importa todo o histórico do log, um leitor por vez (mesmo banco SQLite)
+        application.create_task(asyncio.to_thread(self.products_log.run_listeners))
+    
+    async def post_shutdown(self, application: Application):
+        """Libera recursos ao desligar"""
+        self._flush_state()
+        await self.products_log.close()
+        self.product_index.close()
+        self.price_history.close()
+        self.near_duplicates.save()
+        self.affiliate_links.close()
+        self.tracer.close()
+        self.state_backend.close()
+        self.post_queue.close()
+        await close_session()
+    
+    def _flush_state(self):
+        for store in (self.pending_products, self.editing_products, self.bulk_batches):
+            store.release_all()
+            store.purge_expired()
+            store.flush()
+    
+    def release_state(self, key):
+        """Fim de um update do operador: grava só os rascunhos que ele alterou"""
+        if key and key[0] == 'user':
+            for store in (self.pending_products, self.editing_products, self.bulk_batches):
+                store.release(key[1])
+    
+    async def _post_scheduled(self, product_info: Dict, shopify_result: Dict, affiliate_link: str):
+        """Posta um item da fila agendada (mesma formatação da postagem imediata)"""
+        context = SimpleNamespace(bot=self.application.bot)
+        return await self._post_to_telegram_channel(product_info, shopify_result, affiliate_link, context)
+    
+    async def _state_flush_loop(self):
+        """Grava periodicamente os rascunhos alterados"""
+        while True:
+            await asyncio.sleep(Config.STATE_FLUSH_INTERVAL)
+            for store in (self.pending_products, self.editing_products, self.bulk_batches):
+                store.purge_expired()
+                # Codifica no loop; o commit no SQLite roda em thread
+                await store.flush_async()
+            self.tracer.expire()
+    
+    async def _daily_report_loop(self):
+        """Envia o relatório do dia para ADMIN_CHAT_ID no horário DAILY_REPORT_TIME (fuso POST_TIMEZONE)"""
+        hour, minute = (int(part) for part in Config.DAILY_REPORT_TIME.split(':'))
+        tz = ZoneInfo(Config.POST_TIMEZONE)
+        while True:
+            now = datetime.now(tz)
+            target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if target <= now:
+                target += timedelta(days=1)
+            # Pelo timestamp: a subtração no mesmo fuso ignora a troca de horário de verão
+            await asyncio.sleep(max(0.0, target.timestamp() - time.time()))
+            try:
+                await self.products_log.flush()
+                summary = await asyncio.to_thread(build_report, target.date().isoformat())
+                await self.application.bot.send_message(chat_id=Config.ADMIN_CHAT_ID, text=format_report(summary),
+                                                        disable_web_page_preview=True)
+                logger.info(f"Relatório diário enviado: {summary['posts']} postagens")
+            except Exception as e:
+                logger.error(f"Erro ao enviar relatório diário: {e}")
+    
+    async def _catalog_sync_loop(self):
+        """Mantém o espelho do catálogo atualizado periodicamente"""
+        while True:
+            await self.shopify_manager.sync_catalog()
+            await asyncio.sleep(Config.CATALOG_SYNC_INTERVAL)
     
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Comando /start"""
@@ -359,6 +700,104 @@ Envie um link para começar! 🚀
         """
         await update.message.reply_text(welcome_msg)
     
+    async def metrics(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Comando /metrics - latência da fila de envio e dos botões"""
+        outbound = self.outbound_scheduler.metrics()
+        lines = ["📊 MÉTRICAS", "", "📤 Fila de envio (latência na fila):"]
+        for name, queue in outbound['queues'].items():
+            lines.append(f"• {name}: p50 {queue['p50_ms']:.0f}ms | p95 {queue['p95_ms']:.0f}ms | "
+                         f"enviados {queue['sent']} | pendentes {queue['pending']}")
+        lines.append(f"⏳ RetryAfter recebidos: {outbound['retry_after_hits']}")
+        
+        editor = self.message_editor.stats()
+        lines.append(f"✏️ Edições de preview: {editor['edits']} enviadas | {editor['skipped']} evitadas (sem mudança)")
+        
+        pending, editing = self.pending_products.stats(), self.editing_products.stats()
+        lines.append(f"📝 Rascunhos: {pending['total']} ({pending['in_memory']} em memória) | "
+                     f"edições em andamento: {editing['total']}")
+        
+        products_log = self.products_log.stats()
+        lines.append(f"🗂️ Log de produtos: {products_log['written']} gravados em {products_log['flushes']} lotes | "
+                     f"pendentes {products_log['pending']} | arquivos {products_log['archives']}")
+        traces = self.tracer.stats()
+        lines.append(f"🧭 Traces: {traces['open']} fluxos abertos | {traces['written']} gravados")
+        
+        callbacks = self.callback_router.metrics()
+        if callbacks:
+            lines.extend(["", "🔘 Botões (tempo de processamento):"])
+            for name, stats in list(callbacks.items())[:15]:
+                lines.append(f"• {name}: p50 {stats['p50_ms']:.0f}ms | p95 {stats['p95_ms']:.0f}ms | "
+                             f"chamadas {stats['calls']} | erros {stats['errors']}")
+        await update.message.reply_text("\n".join(lines))
+    
+    async def search_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Comando /search <palavras ou link> - produtos já postados no canal"""
+        query = " ".join(context.args or [])
+        if not query:
+            await update.message.reply_text("🔎 Use: /search <palavras do título ou link>")
+            return
+        
+        results = await asyncio.to_thread(self.product_index.search, query)
+        if not results:
+            await update.message.reply_text(f"🔎 Nada postado encontrado para: {query}")
+            return
+        
+        lines = [f"🔎 {len(results)} postagens encontradas para: {query}", ""]
+        for item in results:
+            discount = f" | {item['discount_percent']:.0f}% OFF" if item['discount_percent'] else ""
+            lines.append(f"• {item['date']} | ${item['price_current'] or 0:.2f}{discount}\n"
+                         f"  {item['title'][:80]}\n  {item['affiliate_link']}")
+        await update.message.reply_text("\n".join(lines), disable_web_page_preview=True)
+    
+    async def report_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Comando /report [YYYY-MM-DD] [dias] - relatório do dia (padrão: hoje)"""
+        day, days = None, 1
+        for arg in context.args or []:
+            if arg.isdigit():
+                days = int(arg)
+            else:
+                day = arg
+        try:
+            if day:
+                date.fromisoformat(day)
+        except ValueError:
+            await update.message.reply_text("📊 Use: /report [YYYY-MM-DD] [dias]")
+            return
+        
+        # Postagens ainda no buffer entram no relatório
+        await self.products_log.flush()
+        summary = await asyncio.to_thread(build_report, day, days)
+        await update.message.reply_text(format_report(summary), disable_web_page_preview=True)
+    
+    async def stats_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Comando /stats [dias] - análises das postagens (padrão: últimos 30 dias)"""
+        days = int(context.args[0]) if context.args and context.args[0].isdigit() else 30
+        
+        def compute():
+            self.log_snapshot.sync()
+            self.deal_analytics.refresh()
+            return self.deal_analytics.summary(days)
+        
+        summary = await asyncio.to_thread(compute)
+        if not summary['posts']:
+            await update.message.reply_text("📈 Nenhuma postagem registrada no período.")
+            return
+        
+        lines = [f"📈 ESTATÍSTICAS (últimos {days} dias)", "",
+                 f"📦 Postagens: {summary['posts']}",
+                 f"💥 Desconto mediano: {summary['median_discount']:.0f}%",
+                 f"🔥 Com 50%+ OFF: {summary['share_50_plus'] * 100:.0f}%",
+                 "🏪 Lojas: " + ", ".join(f"{name} {count}" for name, count in summary['retailers'].items()),
+                 "", "📅 Desconto mediano por dia:"]
+        for day, median in list(summary['median_discount_by_day'].items())[-10:]:
+            lines.append(f"• {day}: {median:.0f}%")
+        lines.extend(["", "🏷️ Preço por CTA (mediana e faixa p25–p75):"])
+        for code, prices in summary['price_by_cta'].items():
+            label = CTA_LABELS.get(code, {'none': 'Sem CTA', 'other': 'Outras'}.get(code, code))
+            lines.append(f"• {label}: {prices['count']} | ${prices['p50']:.2f} "
+                         f"(${prices['p25']:.2f}–${prices['p75']:.2f})")
+        await update.message.reply_text("\n".join(lines))
+    
     async def handle_url(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Processa URLs enviadas pelo usuário"""
         url = update.message.text.strip()
@@ -370,6 +809,15 @@ Envie um link para começar! 🚀
             await self.handle_edit_input(update, context)
             return
         
+        # Vários links na mesma mensagem: importação em lote
+        urls = extract_urls(url, Config.BULK_MAX_URLS)
+        if len(urls) > 1:
+            await self._start_bulk_ingest(update, urls)
+            return
+        # Texto junto com um único link: só o link vai para a extração
+        if len(urls) == 1:
+            url = urls[0]
+        
         if not self._is_valid_url(url):
             await update.message.reply_text("❌ Por favor, envie uma URL válida.")
             return
@@ -377,7 +825,7 @@ Envie um link para começar! 🚀
         processing_msg = await update.message.reply_text("🔍 Extraindo informações do produto...")
         
         try:
-            product_info = await self.product_extractor.extract_product_info(url)
+            product_info = await self._extract_product(url, user_id)
             
             if 'error' in product_info:
                 await processing_msg.edit_text(f"❌ Erro ao extrair produto: {product_info['error']}")
@@ -397,6 +845,252 @@ Envie um link para começar! 🚀
             logger.error(f"Erro ao processar URL: {e}")
             await processing_msg.edit_text("❌ Erro ao processar o link. Tente novamente.")
     
+    async def handle_bulk_file(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Recebe arquivo .txt/.csv com links para importação em lote"""
+        document = update.message.document
+        if document.file_size and document.file_size > Config.BULK_MAX_FILE_BYTES:
+            await update.message.reply_text(f"❌ Arquivo muito grande (máx. {Config.BULK_MAX_FILE_BYTES // 1024} KB).")
+            return
+        
+        try:
+            telegram_file = await document.get_file()
+            data = await telegram_file.download_as_bytearray()
+        except Exception as e:
+            logger.error(f"Erro ao baixar arquivo de links: {e}")
+            await update.message.reply_text("❌ Não consegui baixar o arquivo. Tente novamente.")
+            return
+        
+        urls = read_url_file(bytes(data), document.file_name or '', Config.BULK_MAX_URLS)
+        if not urls:
+            await update.message.reply_text("❌ Nenhum link encontrado no arquivo.")
+            return
+        
+        await self._start_bulk_ingest(update, urls)
+    
+    async def _extract_product(self, url: str, user_id: int = None) -> Dict:
+        """Extrai o produto e consulta o histórico de preços (marca menor preço da janela)"""
+        # Início do fluxo: o trace segue o produto (trace_id) até a postagem
+        trace = self.tracer.start(user_id, url)
+        product_info = await self.product_extractor.extract_product_info(url)
+        if 'error' in product_info:
+            if trace:
+                self.tracer.finish(trace.request_id, 'error')
+            return product_info
+        if trace:
+            product_info['trace_id'] = trace.request_id
+        
+        try:
+            history = await asyncio.to_thread(self.price_history.summarize, product_info)
+        except Exception as e:
+            logger.warning(f"Erro ao consultar histórico de preços: {e}")
+            history = None
+        if history:
+            product_info['price_history'] = history
+            if history['is_lowest'] and Config.PRICE_HISTORY_AUTO_CTA and not product_info.get('cta'):
+                product_info['cta'] = CTA_LABELS['lowest_30_days']
+        
+        # Títulos parecidos postados recentemente (em thread: divide o lock com o refresh)
+        product_info['near_duplicates'] = await asyncio.to_thread(self.near_duplicates.similar,
+                                                                  product_info.get('title', ''))
+        
+        # Mesmo produto já postado: sugere o link de afiliado usado (o operador confirma)
+        if Config.AFFILIATE_LINK_REUSE and not product_info.get('affiliate_link'):
+            suggestion = self.affiliate_links.lookup(product_info)
+            if suggestion:
+                product_info['affiliate_link_suggestion'] = suggestion
+        return product_info
+    
+    async def _start_bulk_ingest(self, update: Update, urls: List[str]):
+        """Extrai vários links em paralelo com mensagem de progresso e abre a revisão do lote"""
+        user_id = update.effective_user.id
+        total = len(urls)
+        progress_msg = await update.message.reply_text(f"📥 Importação em lote: 0/{total} links...")
+        
+        async def on_progress(done, ok, failed):
+            await progress_msg.edit_text(f"📥 Importação em lote: {done}/{total}\n"
+                                         f"✅ {ok} extraídos | ❌ {failed} com erro")
+        
+        results = await extract_many(lambda url: self._extract_product(url, user_id), urls,
+                                     Config.BULK_CONCURRENCY, on_progress)
+        
+        items, failed = [], []
+        for result in results:
+            if 'product' in result:
+                product_info = result['product']
+                if 'categories' not in product_info:
+                    product_info['categories'] = [product_info.get('category', 'Electronics')]
+                items.append(product_info)
+            else:
+                failed.append({'url': result['url'], 'error': result['error']})
+        
+        # Mesmo produto por links diferentes (encurtador, parâmetros): só o primeiro fica no lote
+        items, repeated = dedupe_products(items)
+        for product_info in repeated:
+            self.tracer.finish(product_info.get('trace_id'), 'duplicate')
+        duplicates = [{'url': product_info.get('original_url', '')} for product_info in repeated]
+        
+        self.bulk_batches[user_id] = {'items': items, 'failed': failed, 'duplicates': duplicates}
+        logger.info(f"Lote do usuário {user_id}: {len(items)} extraídos, {len(failed)} com erro, "
+                    f"{len(duplicates)} repetidos")
+        
+        text, reply_markup = self._render_bulk_review(user_id)
+        await progress_msg.edit_text(text, reply_markup=reply_markup)
+    
+    def _render_bulk_review(self, user_id: int):
+        """Texto e botões da revisão do lote"""
+        batch = self.bulk_batches.get(user_id) or {'items': [], 'failed': []}
+        items, failed = batch['items'], batch['failed']
+        
+        lines = [f"📦 LOTE EXTRAÍDO: {len(items)} produtos", ""]
+        for index, product_info in enumerate(items, 1):
+            title = product_info.get('title', 'Sem título')
+            price = product_info.get('price', {}).get('current', 0)
+            marker = " 🔗" if product_info.get('affiliate_link') else ""
+            lines.append(f"{index}. {title[:45]}{'...' if len(title) > 45 else ''} - ${price:.2f}{marker}")
+        suggested = [item for item in items
+                     if item.get('affiliate_link_suggestion') and not item.get('affiliate_link')]
+        if any(item.get('affiliate_link') for item in items):
+            lines.extend(["", "🔗 = usa o link de afiliado de uma postagem anterior"])
+        if suggested:
+            lines.extend(["", f"♻️ {len(suggested)} produtos já postados antes têm link de afiliado salvo:"])
+            for item in suggested[:10]:
+                marker = "" if item['affiliate_link_suggestion'].get('verified', True) else " ⚠️"
+                lines.append(f"• {item.get('title', '')[:40]} → {item['affiliate_link_suggestion']['link']}{marker}")
+            if any(not item['affiliate_link_suggestion'].get('verified', True) for item in suggested):
+                lines.append("⚠️ = postagem antiga sem ASIN: abra o item para confirmar")
+        if failed:
+            lines.extend(["", f"❌ {len(failed)} links com erro:"])
+            for item in failed[:10]:
+                lines.append(f"• {item['url'][:60]}")
+        duplicates = batch.get('duplicates', [])
+        if duplicates:
+            lines.extend(["", f"🔁 {len(duplicates)} links repetidos ignorados (mesmo produto de outro link):"])
+            for item in duplicates[:10]:
+                lines.append(f"• {item['url'][:60]}")
+        lines.extend(["", "✏️ Toque no número para revisar um produto individualmente."])
+        # Limite de tamanho de mensagem do Telegram
+        text = "\n".join(lines)[:4000]
+        
+        keyboard = []
+        numbers = [InlineKeyboardButton(f"✏️ {index}", callback_data=f"bulk_open_{index - 1}")
+                   for index in range(1, len(items) + 1)]
+        for start in range(0, len(numbers), 5):
+            keyboard.append(numbers[start:start + 5])
+        verified = [item for item in suggested if item['affiliate_link_suggestion'].get('verified', True)]
+        if verified:
+            keyboard.append([InlineKeyboardButton(f"♻️ Usar links salvos ({len(verified)})",
+                                                  callback_data="bulk_use_saved_links")])
+        if items:
+            keyboard.append([InlineKeyboardButton("🚀 Publicar todos (Shopify + Canal)", callback_data="bulk_publish_shopify")])
+            keyboard.append([InlineKeyboardButton("📢 Publicar todos só no Canal", callback_data="bulk_publish_channel")])
+            keyboard.append([InlineKeyboardButton("🕒 Agendar todos (Shopify agora + fila do Canal)", callback_data="bulk_schedule_shopify")])
+            keyboard.append([InlineKeyboardButton("🕒 Agendar todos só no Canal", callback_data="bulk_schedule_channel")])
+        keyboard.append([InlineKeyboardButton("❌ Descartar lote", callback_data="bulk_discard")])
+        return text, InlineKeyboardMarkup(keyboard)
+    
+    async def _bulk_open_item(self, query, user_id: int, index: str):
+        """Tira um produto do lote e abre o fluxo individual (edição completa)"""
+        batch = self.bulk_batches.get(user_id)
+        if not batch or not index.isdigit() or int(index) >= len(batch['items']):
+            await query.edit_message_text("❌ Lote não encontrado.")
+            return
+        
+        product_info = batch['items'].pop(int(index))
+        self.pending_products[user_id] = product_info
+        
+        text, reply_markup = self._render_bulk_review(user_id)
+        await query.edit_message_text(text, reply_markup=reply_markup)
+        
+        msg = await query.message.reply_text("📦 Carregando produto do lote...")
+        await self._show_initial_menu(None, product_info, msg)
+    
+    async def _bulk_use_saved_links(self, query, user_id: int):
+        """Confirma, para o lote, os links sugeridos de postagens anteriores com o mesmo ASIN"""
+        batch = self.bulk_batches.get(user_id)
+        if not batch:
+            await query.edit_message_text("❌ Lote não encontrado.")
+            return
+        for item in batch['items']:
+            suggestion = item.get('affiliate_link_suggestion')
+            if suggestion and suggestion.get('verified', True) and not item.get('affiliate_link'):
+                item['affiliate_link'] = suggestion['link']
+        text, reply_markup = self._render_bulk_review(user_id)
+        await query.edit_message_text(text, reply_markup=reply_markup)
+    
+    async def _bulk_discard(self, query, user_id: int):
+        if user_id in self.bulk_batches:
+            del self.bulk_batches[user_id]
+        await query.edit_message_text("❌ Lote descartado.")
+    
+    async def _bulk_publish(self, query, user_id: int, context, to_shopify: bool, schedule: bool = False):
+        """Publica o lote inteiro: Shopify em paralelo, canal na ordem do lote (ou na fila agendada)"""
+        batch = self.bulk_batches.get(user_id)
+        if not batch or not batch['items']:
+            await query.edit_message_text("❌ Lote não encontrado.")
+            return
+        # Remover antes de publicar: um segundo clique não publica em dobro
+        del self.bulk_batches[user_id]
+        items = batch['items']
+        total = len(items)
+        summary = {'posted': 0, 'created': 0, 'updated': 0, 'failed': 0, 'price_failed': 0, 'scheduled': []}
+        
+        await query.edit_message_text(f"🚀 Publicando lote: 0/{total}...")
+        
+        shopify_results = [{'url': 'N/A', 'title': item.get('title', 'Produto')} for item in items]
+        if to_shopify:
+            semaphore = asyncio.Semaphore(Config.SHOPIFY_MAX_CONCURRENCY)
+            
+            async def publish_shopify(index: int, product_info: Dict):
+                self.tracer.resume(product_info.get('trace_id'))
+                affiliate_link = product_info.get('affiliate_link') or product_info.get('original_url', '')
+                async with semaphore:
+                    status, result = await self.shopify_manager.publish_product(product_info, affiliate_link)
+                # Falha na criação é contada uma vez só, no envio ao canal
+                if status != 'failed':
+                    summary[status] += 1
+                if result:
+                    shopify_results[index] = result
+                return bool(result)
+            
+            published = await asyncio.gather(*(publish_shopify(index, item) for index, item in enumerate(items)))
+        else:
+            published = [True] * total
+        
+        last_update = time.monotonic()
+        for index, (product_info, ok) in enumerate(zip(items, published), 1):
+            # Link confirmado na revisão do lote; senão, o link enviado pelo operador
+            affiliate_link = product_info.get('affiliate_link') or product_info.get('original_url', '')
+            if ok and schedule:
+                entry = self.post_queue.enqueue(product_info, shopify_results[index - 1], affiliate_link, user_id)
+                self.tracer.finish(product_info.get('trace_id'), 'scheduled')
+                summary['scheduled'].append(entry['scheduled_at'])
+            elif ok and await self._post_to_telegram_channel(product_info, shopify_results[index - 1], affiliate_link, context):
+                summary['posted'] += 1
+            else:
+                summary['failed'] += 1
+            if time.monotonic() - last_update >= 2 and index < total:
+                last_update = time.monotonic()
+                try:
+                    await query.edit_message_text(f"🚀 Publicando lote: {index}/{total}...")
+                except Exception as e:
+                    logger.warning(f"Erro ao atualizar progresso do lote: {e}")
+        
+        if schedule:
+            scheduled = summary['scheduled']
+            lines = ["🕒 LOTE AGENDADO!", "", f"📢 Na fila do canal: {len(scheduled)}/{total}"]
+            if scheduled:
+                lines.append(f"⏰ De {self.post_queue.format_time(min(scheduled))} até {self.post_queue.format_time(max(scheduled))}")
+        else:
+            lines = ["🎉 LOTE PUBLICADO!", "", f"📢 Postados no canal: {summary['posted']}/{total}"]
+        if to_shopify:
+            lines.append(f"🛍️ Criados no Shopify: {summary['created']}")
+            lines.append(f"💲 Já na loja (preço atualizado): {summary['updated']}")
+            if summary['price_failed']:
+                lines.append(f"⚠️ Já na loja, erro ao atualizar preço: {summary['price_failed']}")
+        if summary['failed']:
+            lines.append(f"❌ Falharam: {summary['failed']}")
+        await query.edit_message_text("\n".join(lines))
+    
     async def _show_initial_menu(self, update: Update, product_info: Dict, msg_to_edit):
         """Mostra menu inicial com opções: Shopify ou Canal"""
         title = product_info.get('title', 'Sem título')
@@ -405,13 +1099,40 @@ Envie um link para começar! 🚀
         original_price = price_info.get('original', current_price)
         images_count = len(product_info.get('images', []))
         
+        history_text = ""
+        history = product_info.get('price_history') or {}
+        if history.get('is_lowest'):
+            days = int(Config.PRICE_HISTORY_WINDOW_DAYS)
+            applied = product_info.get('cta') == CTA_LABELS['lowest_30_days']
+            before = (f"${history['max']:.2f}" if history['min'] == history['max']
+                      else f"${history['min']:.2f}–${history['max']:.2f}")
+            history_text = (f"📉 Menor preço em {days} dias (antes: {before})\n"
+                            + ("🏷️ CTA aplicada automaticamente\n" if applied
+                               else "💡 Sugestão: CTA \"Lowest price in 30 days 📉\"\n"))
+        
+        duplicates_text = ""
+        duplicates = product_info.get('near_duplicates') or []
+        if duplicates:
+            duplicates_text = f"⚠️ Parecido com postagens dos últimos {Config.NEAR_DUP_WINDOW_DAYS:g} dias:\n"
+            for item in duplicates:
+                duplicates_text += f"• {item['date']} ({item['similarity'] * 100:.0f}%): {item['title'][:60]}\n"
+        
+        reused_text = ""
+        suggestion = product_info.get('affiliate_link_suggestion')
+        if suggestion and not product_info.get('affiliate_link'):
+            source = suggestion['key'].split(':', 1)[0].upper()
+            reused_text = (f"🔗 Link de afiliado já usado ({source}): {suggestion['link']}\n"
+                           f"   (confirme na hora de postar)\n")
+            if not suggestion.get('verified', True):
+                reused_text += "   ⚠️ Postagem antiga sem ASIN: confira se é o mesmo produto\n"
+        
         menu_text = f"""
 📦 PRODUTO EXTRAÍDO
 
 📝 Título: {title}
 💰 Preço: ${current_price:.2f}
 📸 Imagens: {images_count} encontradas
-
+{history_text}{duplicates_text}{reused_text}
 🎯 Onde deseja publicar este produto?
         """
         
@@ -422,170 +1143,35 @@ Envie um link para começar! 🚀
         ]
         reply_markup = InlineKeyboardMarkup(keyboard)
         
-        await msg_to_edit.edit_text(menu_text, reply_markup=reply_markup)
+        with trace_stage('preview'):
+            await msg_to_edit.edit_text(menu_text, reply_markup=reply_markup)
     
     async def _show_product_preview_with_edit(self, update: Update, product_info: Dict, msg_to_edit):
         """Mostra preview do produto com opções de edição"""
-        logger.info(f"Mostrando preview para produto: {product_info}")
-        
-        title = product_info.get('title', 'Sem título')
-        price_info = product_info.get('price', {})
-        current_price = price_info.get('current', 0)
-        original_price = price_info.get('original', current_price)
-        discount = price_info.get('discount_percent', 0)
-        description = product_info.get('description', 'Sem descrição')
-        images_count = len(product_info.get('images', []))
-        
-        logger.info(f"Dados extraídos - Título: {title}, Imagens: {images_count}, Preço: {current_price}")
-        
-        # Mostrar URLs das imagens
-        images = product_info.get('images', [])
-        logger.info(f"PREVIEW - Imagens sendo mostradas: {images}")
-        
-        images_text = ""
-        if images:
-            images_text = "\nURLs das imagens:\n"
-            for i, img in enumerate(images[:3], 1):
-                images_text += f"{i}. {img}\n"
-            if len(images) > 3:
-                images_text += f"... e mais {len(images) - 3} imagens\n"
-        
-        categories = product_info.get('categories', ['Electronics'])
-        categories_text = " | ".join(categories)
-        cta = product_info.get('cta', '')
-        
-        affiliate_link = product_info.get('original_url', 'Não informado')
-        
-        preview_text = f"""
-📦 PRODUTO EXTRAÍDO
-📝 Título: {title}
-
-🏷️ Categorias: {categories_text}
-
-💰 Preços:• Atual: R$ {current_price:.2f}
-{f"• Original: R$ {original_price:.2f}" if original_price > current_price else ""}
-{f"• Desconto: {discount}% OFF" if discount > 0 else ""}
-{f"🏷️ CTA: {cta}" if cta else ""}
-
-📸 Imagens: {images_count} encontradas{images_text}
-
-📄 Descrição: {description[:100]}{"..." if len(description) > 100 else ""}
-
-🔗 Link Afiliado: {affiliate_link}
-
-O que deseja fazer?        """
-        
-        keyboard = [
-            [InlineKeyboardButton("✏️ Editar Título", callback_data="edit_title")],
-            [InlineKeyboardButton("🏷️ Gerenciar Categorias", callback_data="manage_categories")],
-            [InlineKeyboardButton("💰 Editar Preços", callback_data="edit_prices")],
-            [InlineKeyboardButton("📄 Editar Descrição", callback_data="edit_description")],
-            [InlineKeyboardButton("📸 Editar Imagens", callback_data="edit_images")],
-            [InlineKeyboardButton("🏷️ Adicionar CTA", callback_data="add_cta")],
-            [InlineKeyboardButton("✅ Publicar Assim", callback_data="publish_as_is")],
-            [InlineKeyboardButton("❌ Cancelar", callback_data="cancel")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await msg_to_edit.edit_text(preview_text, reply_markup=reply_markup)
+        logger.info(f"Mostrando preview para produto: {product_info.get('title')}")
+        with trace_stage('preview'):
+            await self.message_editor.edit(msg_to_edit, render_product_preview(product_info),
+                                           reply_markup=PRODUCT_PREVIEW_KEYBOARD)
     
     async def handle_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Processa callbacks dos botões"""
         query = update.callback_query
         
         # CRÍTICO: Responder ao callback IMEDIATAMENTE
+        # (chat da mensagem: um RetryAfter nesta resposta só pausa este chat)
         try:
-            await query.answer()
+            await context.bot.answer_callback_query(
+                query.id, rate_limit_args={'chat_id': query.message.chat_id} if query.message else None)
         except Exception as e:
             logger.error(f"Erro ao responder callback: {e}")
             return
         
         user_id = update.effective_user.id
+        # Etapas deste clique entram no trace do produto pendente
+        self.tracer.resume((self.pending_products.get(user_id) or {}).get('trace_id'))
         
         try:
-            if query.data == "publish_to_shopify":
-                # Fluxo completo: mostrar preview com todas as opções de edição
-                if user_id in self.pending_products:
-                    product_info = self.pending_products[user_id]
-                    # Criar um objeto fake para update (a função não usa, mas precisa da assinatura)
-                    from types import SimpleNamespace
-                    fake_update = SimpleNamespace()
-                    await self._show_product_preview_with_edit(fake_update, product_info, query.message)
-            elif query.data == "publish_to_channel_only":
-                # Fluxo simplificado: só canal do Telegram
-                await self._handle_channel_only_flow(query, user_id)
-            elif query.data == "edit_title":
-                await self._start_edit_title(query, user_id)
-            elif query.data == "manage_categories":
-                await self._show_category_management(query, user_id)
-            elif query.data == "add_main_category":
-                await self._show_main_categories(query, user_id)
-            elif query.data == "add_discount_category":
-                await self._show_discount_categories(query, user_id)
-            elif query.data.startswith("main_cat_"):
-                category = query.data.replace("main_cat_", "").replace("_", " ")
-                await self._add_category(query, user_id, category)
-            elif query.data.startswith("disc_cat_"):
-                category = query.data.replace("disc_cat_", "")
-                await self._add_category(query, user_id, category)
-            elif query.data.startswith("remove_cat_"):
-                category = query.data.replace("remove_cat_", "").replace("_", " ")
-                await self._remove_category(query, user_id, category)
-            elif query.data == "back_to_preview":
-                await self._back_to_preview(query, user_id)
-            elif query.data == "back_to_channel_preview":
-                # Voltar especificamente para o preview simplificado de canal
-                product_info = self.pending_products.get(user_id, {})
-                if product_info:
-                    await self._show_channel_only_preview(query, user_id, product_info)
-                else:
-                    await query.edit_message_text("❌ Produto não encontrado.")
-            elif query.data == "edit_prices":
-                await self._start_edit_prices(query, user_id)
-            elif query.data == "edit_description":
-                await self._start_edit_description(query, user_id)
-            elif query.data == "edit_images":
-                await self._start_edit_images(query, user_id)
-            elif query.data == "add_cta":
-                await self._show_cta_menu(query, user_id)
-            elif query.data == "cta_custom":
-                await self._start_edit_custom_cta(query, user_id)
-            elif query.data == "cta_remove":
-                await self._remove_cta(query, user_id)
-            elif query.data.startswith("cta_"):
-                cta_mapping = {
-                    "cta_amazons_choice": "Amazon's Choice 🟧",
-                    "cta_walmart_deals": "Walmart Deals 🟦",
-                    "cta_lowest_30_days": "Lowest price in 30 days 📉",
-                    "cta_limited_time_deal": "Limited time deal ⏰",
-                    "cta_lightning_deal": "Lightning Deal ⚡",
-                    "cta_deal_selling_fast": "Deal selling fast ⚡",
-                    "cta_best_seller": "#1 Best Seller 🏆"
-                }
-                cta_value = cta_mapping.get(query.data, query.data.replace("cta_", "").replace("_", " "))
-                await self._add_cta(query, user_id, cta_value)
-            elif query.data == "publish_as_is":
-                await self._publish_product(query, user_id, context)
-            elif query.data == "confirm_post_channel":
-                await self._confirm_post_channel(query, user_id, context)
-            elif query.data == "edit_channel_text":
-                await self._edit_channel_text(query, user_id)
-            elif query.data == "edit_channel_preview":
-                await self._edit_channel_preview(query, user_id)
-            elif query.data == "cancel_channel_post":
-                await self._cancel_channel_post(query, user_id)
-            elif query.data == "channel_edit_title":
-                await self._start_channel_edit_title(query, user_id)
-            elif query.data == "channel_edit_image":
-                await self._start_channel_edit_image(query, user_id)
-            elif query.data == "channel_edit_price":
-                await self._start_channel_edit_price(query, user_id)
-            elif query.data == "channel_post_direct":
-                await self._post_channel_direct(query, user_id, context)
-            elif query.data == "cancel":
-                await query.edit_message_text("❌ Operação cancelada.")
-                if user_id in self.pending_products:
-                    del self.pending_products[user_id]
+            await self.callback_router.dispatch(query.data, query, user_id, context)
         except Exception as e:
             logger.error(f"Erro ao processar callback {query.data}: {e}")
             try:
@@ -677,6 +1263,7 @@ O que deseja fazer?        """
         
         if user_id not in self.editing_products:
             return
+        self.tracer.resume((self.pending_products.get(user_id) or {}).get('trace_id'))
         
         edit_info = self.editing_products[user_id]
         field = edit_info['field']
@@ -763,79 +1350,9 @@ O que deseja fazer?        """
             return
         elif field == 'affiliate_link':
             # Salvar link de afiliado e executar ação pendente
-            affiliate_link = new_value.strip()
-            self.pending_products[user_id]['affiliate_link'] = affiliate_link
-            
-            action = edit_info.get('action', '')
             del self.editing_products[user_id]
-            
-            if action == 'post_channel_direct':
-                # Postar diretamente no canal
-                from types import SimpleNamespace
-                fake_query = SimpleNamespace()
-                fake_query.edit_message_text = update.message.reply_text
-                fake_query.message = update.message
-                fake_query.from_user = update.effective_user
-                
-                product_info = self.pending_products[user_id]
-                fake_shopify_result = {'url': 'N/A', 'title': product_info.get('title', 'Produto')}
-                
-                await update.message.reply_text("🚀 Postando no canal...")
-                await self._post_to_telegram_channel(product_info, fake_shopify_result, affiliate_link, context)
-                
-                # Gerar texto formatado para preview
-                formatted_text = self._format_channel_text_for_copy(product_info, affiliate_link)
-                success_msg = f"""🎉 PRODUTO POSTADO NO CANAL!
-
-📢 Canal: @hotdealsdailyf4l
-
-━━━━━━━━━━━━━━━━━━━━
-
-{formatted_text}"""
-                await update.message.reply_text(success_msg)
-                del self.pending_products[user_id]
-            elif action == 'confirm_post_channel':
-                # Postar após Shopify
-                product_info = self.pending_products[user_id]
-                shopify_result = product_info.get('shopify_result')
-                
-                # Atualizar metafield do Shopify com link de afiliado
-                if shopify_result:
-                    try:
-                        import shopify
-                        product = shopify.Product.find(shopify_result['id'])
-                        if product:
-                            # Buscar e atualizar metafield
-                            all_metafields = shopify.Metafield.find()
-                            for mf in all_metafields:
-                                if (mf.owner_resource == 'product' and 
-                                    str(mf.owner_id) == str(product.id) and
-                                    mf.namespace == 'custom' and 
-                                    mf.key == 'affiliate_link'):
-                                    mf.value = affiliate_link
-                                    mf.save()
-                                    logger.info(f"✅ Metafield atualizado com link de afiliado: {affiliate_link}")
-                                    break
-                    except Exception as e:
-                        logger.error(f"Erro ao atualizar metafield: {e}")
-                
-                await update.message.reply_text("🚀 Postando no canal...")
-                await self._post_to_telegram_channel(product_info, shopify_result, affiliate_link, context)
-                
-                # Gerar texto formatado para preview
-                formatted_text = self._format_channel_text_for_copy(product_info, affiliate_link)
-                categories = product_info.get('categories', ['Electronics'])
-                categories_text = " | ".join(categories)
-                
-                success_msg = f"""🎉 PRODUTO PUBLICADO COM SUCESSO!
-🛍️ Shopify: {shopify_result['url'] if shopify_result else 'N/A'}
-📢 Canal: Postado em @hotdealsdailyf4l
-
-━━━━━━━━━━━━━━━━━━━━
-
-{formatted_text}"""
-                await update.message.reply_text(success_msg)
-                del self.pending_products[user_id]
+            await self._apply_affiliate_link(user_id, new_value.strip(), edit_info.get('action', ''),
+                                             update.message.reply_text, context)
             return
         elif field == 'channel_price':
             # Editar preço no fluxo simplificado
@@ -1022,41 +1539,9 @@ O que deseja fazer?        """
     
     async def _show_channel_only_preview(self, query, user_id: int, product_info: Dict):
         """Mostra preview simplificado para canal apenas"""
-        title = product_info.get('title', 'Sem título')
-        price_info = product_info.get('price', {})
-        current_price = price_info.get('current', 0)
-        original_price = price_info.get('original', current_price)
-        discount = price_info.get('discount_percent', 0)
-        cta = product_info.get('cta', '')
-        images = product_info.get('images', [])
-        first_image = images[0] if images else 'Nenhuma imagem'
-        
-        preview_text = f"""
-📢 PREVIEW PARA CANAL DO TELEGRAM
-
-📝 Título: {title}
-
-💰 Preço Atual: ${current_price:.2f}
-{f"💰 Preço Original: ${original_price:.2f}" if original_price > current_price else ""}
-{f"💥 Desconto: {discount}% OFF" if discount > 0 else ""}
-{f"🏷️ CTA: {cta}" if cta else ""}
-
-🖼️ Primeira Imagem: {first_image[:50]}{"..." if len(first_image) > 50 else ""}
-
-✏️ Você pode editar antes de postar:
-        """
-        
-        keyboard = [
-            [InlineKeyboardButton("✏️ Editar Título", callback_data="channel_edit_title")],
-            [InlineKeyboardButton("🖼️ Editar Primeira Imagem", callback_data="channel_edit_image")],
-            [InlineKeyboardButton("💰 Editar Preço", callback_data="channel_edit_price")],
-            [InlineKeyboardButton("🏷️ Adicionar CTA", callback_data="add_cta")],
-            [InlineKeyboardButton("✅ Postar no Canal", callback_data="channel_post_direct")],
-            [InlineKeyboardButton("❌ Cancelar", callback_data="cancel")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await query.edit_message_text(preview_text, reply_markup=reply_markup)
+        with trace_stage('preview'):
+            await self.message_editor.edit(query, render_channel_preview(product_info),
+                                           reply_markup=CHANNEL_PREVIEW_KEYBOARD)
     
     async def _start_channel_edit_title(self, query, user_id: int):
         """Inicia edição do título no fluxo simplificado"""
@@ -1133,7 +1618,7 @@ O que deseja fazer?        """
         await query.edit_message_text("🚀 Postando no canal...")
         
         # Postar no canal
-        await self._post_to_telegram_channel(product_info, fake_shopify_result, affiliate_link, context)
+        report = await self._post_to_telegram_channel(product_info, fake_shopify_result, affiliate_link, context)
         
         # Gerar texto formatado para preview
         formatted_text = self._format_channel_text_for_copy(product_info, affiliate_link)
@@ -1141,7 +1626,8 @@ O que deseja fazer?        """
         # Mensagem de sucesso com preview (sem parse_mode para manter asteriscos visíveis)
         success_msg = f"""🎉 PRODUTO POSTADO NO CANAL!
 
-📢 Canal: @hotdealsdailyf4l
+📢 Canais:
+{self._channel_post_summary(report)}
 
 ━━━━━━━━━━━━━━━━━━━━
 
@@ -1152,18 +1638,91 @@ O que deseja fazer?        """
         # Limpar produto pendente
         del self.pending_products[user_id]
     
+    def _enqueue_pending_post(self, user_id: int, shopify_result: Dict) -> str:
+        """Coloca o produto pendente na fila agendada e retorna a mensagem de confirmação"""
+        product_info = self.pending_products[user_id]
+        entry = self.post_queue.enqueue(product_info, shopify_result, product_info['affiliate_link'], user_id)
+        self.tracer.finish(product_info.get('trace_id'), 'scheduled')
+        del self.pending_products[user_id]
+        return (f"🕒 POSTAGEM AGENDADA!\n\n"
+                f"📝 {product_info.get('title', 'Produto')[:80]}\n"
+                f"⏰ Horário: {self.post_queue.format_time(entry['scheduled_at'])}\n"
+                f"📋 Posição na fila: {entry['position']}\n\n"
+                f"Use /fila para ver ou cancelar agendamentos.")
+    
+    async def _schedule_post_channel(self, query, user_id: int):
+        """Agenda a postagem no canal (produto já criado no Shopify)"""
+        product_info = self.pending_products.get(user_id)
+        if not product_info or not product_info.get('shopify_result'):
+            await query.edit_message_text("❌ Produto não encontrado.")
+            return
+        if not product_info.get('affiliate_link'):
+            await self._start_affiliate_link_input(query, user_id, action='schedule_post_channel',
+                                                   shopify_result=product_info['shopify_result'])
+            return
+        await query.edit_message_text(self._enqueue_pending_post(user_id, product_info['shopify_result']))
+    
+    async def _schedule_channel_direct(self, query, user_id: int):
+        """Agenda a postagem do fluxo só canal (sem Shopify)"""
+        product_info = self.pending_products.get(user_id)
+        if not product_info:
+            await query.edit_message_text("❌ Produto não encontrado.")
+            return
+        if not product_info.get('affiliate_link'):
+            await self._start_affiliate_link_input(query, user_id, action='schedule_channel_direct')
+            return
+        fake_shopify_result = {'url': 'N/A', 'title': product_info.get('title', 'Produto')}
+        await query.edit_message_text(self._enqueue_pending_post(user_id, fake_shopify_result))
+    
+    def _render_post_queue(self):
+        """Texto e botões do comando /fila"""
+        items = self.post_queue.queued(limit=20)
+        stats = self.post_queue.stats()
+        lines = [f"🕒 FILA DE POSTAGENS ({stats['queued']} agendadas | {stats['posted_today']} postadas hoje)", ""]
+        for index, item in enumerate(items, 1):
+            lines.append(f"{index}. {self.post_queue.format_time(item['scheduled_at'])} - {item['title'][:50]}")
+        if not items:
+            lines.append("Nenhuma postagem agendada.")
+        keyboard = [[InlineKeyboardButton(f"❌ {index}", callback_data=f"queue_cancel_{item['id']}")
+                     for index, item in enumerate(items[start:start + 5], start + 1)]
+                    for start in range(0, min(len(items), 10), 5)]
+        return "\n".join(lines), InlineKeyboardMarkup(keyboard) if keyboard else None
+    
+    async def post_queue_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Comando /fila - postagens agendadas"""
+        text, reply_markup = self._render_post_queue()
+        await update.message.reply_text(text, reply_markup=reply_markup)
+    
+    async def _cancel_scheduled_post(self, query, item_id: str):
+        if item_id.isdigit() and self.post_queue.cancel(int(item_id)):
+            text, reply_markup = self._render_post_queue()
+            await query.edit_message_text(text, reply_markup=reply_markup)
+        else:
+            await query.edit_message_text("❌ Agendamento não encontrado (já postado ou cancelado).")
+    
     async def _publish_product(self, query, user_id: int, context):
         """Publica o produto no Shopify e canal"""
         if user_id not in self.pending_products:
             await query.edit_message_text("❌ Produto não encontrado.")
             return
         
+        product_info = self.pending_products[user_id]
+        affiliate_link = product_info.get('original_url', '')
+        
+        # Verificar no espelho local se o produto já foi publicado
+        if not product_info.get('force_create'):
+            existing = self.shopify_manager.catalog.lookup(
+                affiliate_link=affiliate_link,
+                url=product_info.get('product_url'),
+                title=product_info.get('title')
+            )
+            if existing:
+                await self._show_already_published(query, user_id, existing)
+                return
+        
         await query.edit_message_text("🚀 Publicando produto no Shopify...")
         
         try:
-            product_info = self.pending_products[user_id]
-            affiliate_link = product_info.get('original_url', '')
-            
             # Debug: verificar dados antes de enviar para Shopify
             logger.info(f"Dados do produto sendo enviados para Shopify: {product_info}")
             logger.info(f"Imagens no produto: {product_info.get('images', [])}")
@@ -1183,6 +1742,58 @@ O que deseja fazer?        """
             logger.error(f"Erro ao publicar: {e}")
             await query.edit_message_text("❌ Erro ao publicar produto. Tente novamente.")
     
+    async def _show_already_published(self, query, user_id: int, existing: Dict):
+        """Avisa que o produto já está na loja e oferece alternativas"""
+        product_info = self.pending_products[user_id]
+        product_info['existing_product'] = existing
+        new_price = product_info.get('price', {}).get('current', 0)
+        
+        msg = f"""⚠️ PRODUTO JÁ PUBLICADO
+
+📝 Título: {existing.get('title', 'N/A')}
+🛍️ Shopify: {existing.get('url', 'N/A')}
+💰 Preço na loja: ${existing.get('price') or 'N/A'}
+💰 Preço extraído: ${new_price:.2f}
+
+🤔 Deseja atualizar o preço em vez de criar outro produto?"""
+        
+        keyboard = [
+            [InlineKeyboardButton("💲 Atualizar preço", callback_data="update_existing_price")],
+            [InlineKeyboardButton("🆕 Criar novo mesmo assim", callback_data="force_create_product")],
+            [InlineKeyboardButton("❌ Cancelar", callback_data="cancel")]
+        ]
+        reply_markup = InlineKeyboardMarkup(keyboard)
+        
+        await query.edit_message_text(msg, reply_markup=reply_markup)
+    
+    async def _update_existing_price(self, query, user_id: int, context):
+        """Atualiza o preço do produto existente em vez de criar outro"""
+        product_info = self.pending_products.get(user_id)
+        if not product_info or not product_info.get('existing_product'):
+            await query.edit_message_text("❌ Produto não encontrado.")
+            return
+        
+        existing = product_info['existing_product']
+        price_info = product_info.get('price', {})
+        current_price = price_info.get('current', 0)
+        original_price = price_info.get('original', current_price)
+        
+        await query.edit_message_text("💲 Atualizando preço no Shopify...")
+        
+        if not await self.shopify_manager.update_product_price(existing, current_price, original_price):
+            await query.edit_message_text("❌ Erro ao atualizar preço no Shopify. Tente novamente.")
+            return
+        
+        # Seguir para o preview do canal usando o produto existente
+        shopify_result = {
+            'id': existing['id'],
+            'handle': existing.get('handle'),
+            'title': existing.get('title'),
+            'url': existing.get('url')
+        }
+        affiliate_link = product_info.get('original_url', '')
+        await self._show_channel_preview_with_confirmation(query, product_info, affiliate_link, context, shopify_result)
+    
     async def _show_channel_preview_with_confirmation(self, query, product_info: Dict, affiliate_link: str, context, shopify_result: Dict):
         """Mostra preview do canal e aguarda confirmação"""
         try:
@@ -1237,16 +1848,18 @@ ${original_price:.2f} → ${current_price:.2f}"""
             keyboard = [
                 [
                     InlineKeyboardButton("✅ Postar no Canal", callback_data="confirm_post_channel"),
-                    InlineKeyboardButton("✏️ Editar Texto", callback_data="edit_channel_text")
+                    InlineKeyboardButton("🕒 Agendar", callback_data="schedule_post_channel")
                 ],
                 [
-                    InlineKeyboardButton("🔄 Editar Produto", callback_data="edit_channel_preview"),
-                    InlineKeyboardButton("❌ Cancelar", callback_data="cancel_channel_post")
-                ]
+                    InlineKeyboardButton("✏️ Editar Texto", callback_data="edit_channel_text"),
+                    InlineKeyboardButton("🔄 Editar Produto", callback_data="edit_channel_preview")
+                ],
+                [InlineKeyboardButton("❌ Cancelar", callback_data="cancel_channel_post")]
             ]
             reply_markup = InlineKeyboardMarkup(keyboard)
             
-            await query.edit_message_text(preview_message, reply_markup=reply_markup)
+            with trace_stage('preview'):
+                await query.edit_message_text(preview_message, reply_markup=reply_markup)
             
         except Exception as e:
             logger.error(f"Erro ao mostrar preview com confirmação: {e}")
@@ -1294,12 +1907,13 @@ ${original_price:.2f} → ${current_price:.2f}"""
             keyboard = [
                 [
                     InlineKeyboardButton("✅ Postar no Canal", callback_data="confirm_post_channel"),
-                    InlineKeyboardButton("✏️ Editar Texto", callback_data="edit_channel_text")
+                    InlineKeyboardButton("🕒 Agendar", callback_data="schedule_post_channel")
                 ],
                 [
-                    InlineKeyboardButton("🔄 Editar Produto", callback_data="edit_channel_preview"),
-                    InlineKeyboardButton("❌ Cancelar", callback_data="cancel_channel_post")
-                ]
+                    InlineKeyboardButton("✏️ Editar Texto", callback_data="edit_channel_text"),
+                    InlineKeyboardButton("🔄 Editar Produto", callback_data="edit_channel_preview")
+                ],
+                [InlineKeyboardButton("❌ Cancelar", callback_data="cancel_channel_post")]
             ]
             reply_markup = InlineKeyboardMarkup(keyboard)
             
@@ -1307,34 +1921,35 @@ ${original_price:.2f} → ${current_price:.2f}"""
             from telegram.ext import Application
             current_app = Application.get_running()
             if current_app:
-                await current_app.bot.edit_message_text(
-                    chat_id=user_id,
-                    message_id=message_id,
-                    text=preview_message,
-                    reply_markup=reply_markup
-                )
+                with trace_stage('preview'):
+                    await current_app.bot.edit_message_text(
+                        chat_id=user_id,
+                        message_id=message_id,
+                        text=preview_message,
+                        reply_markup=reply_markup
+                    )
             else:
                 logger.error("Não foi possível obter a aplicação atual")
             
         except Exception as e:
             logger.error(f"Erro ao mostrar preview do canal por message_id: {e}")
 
+    def _channel_post_summary(self, report) -> str:
+        """Resultado da postagem por canal para as mensagens de sucesso"""
+        if report is None:
+            return f"❌ Falha ao postar em {self.channel_publisher.describe()}"
+        return report.summary()
+    
     def _get_button_text(self, affiliate_link: str) -> str:
         """Detecta a loja e retorna o texto apropriado para o botão"""
-        link_lower = affiliate_link.lower()
-        
-        if 'amazon' in link_lower or 'amzn' in link_lower:
-            return "🛒 Buy on Amazon"
-        elif 'walmart' in link_lower:
-            return "🛒 Buy on Walmart"
-        elif 'target' in link_lower:
-            return "🛒 Buy on Target"
-        elif 'ebay' in link_lower:
-            return "🛒 Buy on eBay"
-        elif 'aliexpress' in link_lower:
-            return "🛒 Buy on AliExpress"
-        else:
-            return "🛒 Get This Promo"
+        labels = {
+            'amazon': "🛒 Buy on Amazon",
+            'walmart': "🛒 Buy on Walmart",
+            'target': "🛒 Buy on Target",
+            'ebay': "🛒 Buy on eBay",
+            'aliexpress': "🛒 Buy on AliExpress",
+        }
+        return labels.get(retailer_of(affiliate_link), "🛒 Get This Promo")
     
     def _convert_to_telegram_markdown(self, text: str) -> str:
         """Converte ~texto~ para <s>texto</s> (formato HTML do Telegram)"""
@@ -1398,13 +2013,13 @@ ${original_price:.2f} → ${current_price:.2f}"""
             return text
 
     async def _post_to_telegram_channel(self, product_info: Dict, shopify_result: Dict, affiliate_link: str, context):
-        """Posta produto no canal do Telegram"""
+        """Posta produto nos canais configurados (retorna o PublishReport ou None se todos falharem)"""
         try:
-            if not Config.TELEGRAM_CHANNEL_ID:
+            if not self.channel_publisher.targets:
                 logger.error("TELEGRAM_CHANNEL_ID não configurado")
-                return
+                return None
             
-            logger.info(f"Postando no canal: {Config.TELEGRAM_CHANNEL_ID}")
+            logger.info(f"Postando em: {self.channel_publisher.describe()}")
             
             # Preparar mensagem
             title = product_info.get('title', 'Produto')
@@ -1444,32 +2059,34 @@ ${original_price:.2f} → ${current_price:.2f}"""
             keyboard = [[InlineKeyboardButton(button_text, url=affiliate_link)]]
             reply_markup = InlineKeyboardMarkup(keyboard)
             
-            # Enviar primeira imagem com a mensagem e botão
+            # Enviar primeira imagem com a mensagem e botão para todos os destinos
             images = product_info.get('images', [])
-            if images:
-                logger.info(f"Enviando com imagem: {images[0]}")
-                result = await context.bot.send_photo(
-                    chat_id=Config.TELEGRAM_CHANNEL_ID,
-                    photo=images[0],
-                    caption=message,
-                    reply_markup=reply_markup,
-                    parse_mode='HTML'
-                )
-                logger.info(f"Postagem no canal enviada com sucesso: {result.message_id}")
-            else:
-                logger.info("Enviando sem imagem")
-                result = await context.bot.send_message(
-                    chat_id=Config.TELEGRAM_CHANNEL_ID,
-                    text=message,
-                    reply_markup=reply_markup,
-                    parse_mode='HTML'
-                )
-                logger.info(f"Postagem no canal enviada com sucesso: {result.message_id}")
+            logger.info(f"Enviando com imagem: {images[0]}" if images else "Enviando sem imagem")
+            # Postagem agendada roda fora do clique: reativa o trace (se ainda aberto)
+            self.tracer.resume(product_info.get('trace_id'))
+            with trace_stage('channel_post'):
+                report = await self.channel_publisher.publish(context.bot, message, image_url=images[0] if images else None,
+                                                              reply_markup=reply_markup, parse_mode='HTML')
+            if report.failed:
+                logger.warning(f"Postagem falhou em: {', '.join(report.failed)}")
+            if report:
+                # Só enfileira; a gravação em disco acontece em segundo plano
+                self.products_log.append(build_log_record(product_info, affiliate_link))
+                self.tracer.finish(product_info.get('trace_id'), 'posted')
+                try:
+                    # Commit no SQLite: fora do loop
+                    await asyncio.to_thread(self.affiliate_links.remember, product_info, affiliate_link)
+                except Exception as e:
+                    logger.warning(f"Erro ao guardar link de afiliado: {e}")
+            
+            # None quando nenhum destino recebeu a postagem
+            return report if report else None
                 
         except Exception as e:
-            logger.error(f"Erro ao postar no canal {Config.TELEGRAM_CHANNEL_ID}: {e}")
+            logger.error(f"Erro ao postar em {self.channel_publisher.describe()}: {e}")
             import traceback
             logger.error(f"Traceback: {traceback.format_exc()}")
+            return None
 
     async def _confirm_post_channel(self, query, user_id: int, context):
         """Confirma e posta no canal"""
@@ -1495,7 +2112,7 @@ ${original_price:.2f} → ${current_price:.2f}"""
             await query.edit_message_text("🚀 Postando no canal...")
             
             # Postar no canal
-            await self._post_to_telegram_channel(product_info, shopify_result, affiliate_link, context)
+            report = await self._post_to_telegram_channel(product_info, shopify_result, affiliate_link, context)
             
             # Gerar texto formatado para preview
             formatted_text = self._format_channel_text_for_copy(product_info, affiliate_link)
@@ -1506,7 +2123,8 @@ ${original_price:.2f} → ${current_price:.2f}"""
             
             success_msg = f"""🎉 PRODUTO PUBLICADO COM SUCESSO!
 🛍️ Shopify: {shopify_result['url']}
-📢 Canal: Postado em @hotdealsdailyf4l
+📢 Canais:
+{self._channel_post_summary(report)}
 
 ━━━━━━━━━━━━━━━━━━━━
 
@@ -1771,46 +2389,80 @@ O produto está disponível no seu Shopify, mas não foi divulgado no canal do T
             await query.edit_message_text("❌ Produto não encontrado.")
             return
         
-        product_info = self.pending_products[user_id]
-        
-        # Mostrar preview simples
-        title = product_info.get('title', 'N/A')
-        price_info = product_info.get('price', {})
-        current_price = price_info.get('current', 0)
-        original_price = price_info.get('original', current_price)
-        discount = price_info.get('discount_percent', 0)
-        description = product_info.get('description', 'N/A')
-        categories = product_info.get('categories', ['Electronics'])
-        categories_text = " | ".join(categories)
+        with trace_stage('preview'):
+            await self.message_editor.edit(query, render_product_preview(self.pending_products[user_id], "📦 PRODUTO ATUALIZADO"),
+                                           reply_markup=PRODUCT_PREVIEW_KEYBOARD)
+    
+    async def _apply_affiliate_link(self, user_id: int, affiliate_link: str, action: str, reply, context):
+        """Salva o link de afiliado e executa a ação pendente (`reply` envia as mensagens ao operador)"""
+        self.pending_products[user_id]['affiliate_link'] = affiliate_link
         
-        preview_text = f"""
-📦 PRODUTO ATUALIZADO
-📝 Título: {title}
+        if action == 'post_channel_direct':
+            # Postar diretamente no canal
+            product_info = self.pending_products[user_id]
+            fake_shopify_result = {'url': 'N/A', 'title': product_info.get('title', 'Produto')}
+            
+            await reply("🚀 Postando no canal...")
+            report = await self._post_to_telegram_channel(product_info, fake_shopify_result, affiliate_link, context)
+            
+            # Gerar texto formatado para preview
+            formatted_text = self._format_channel_text_for_copy(product_info, affiliate_link)
+            success_msg = f"""🎉 PRODUTO POSTADO NO CANAL!
 
-🏷️ Categorias: {categories_text}
+📢 Canais:
+{self._channel_post_summary(report)}
 
-💰 Preços:• Atual: R$ {current_price:.2f}
-{f"• Original: R$ {original_price:.2f}" if original_price > current_price else ""}
-{f"• Desconto: {discount}% OFF" if discount > 0 else ""}
+━━━━━━━━━━━━━━━━━━━━
 
-📸 Imagens: {len(product_info.get('images', []))}
+{formatted_text}"""
+            await reply(success_msg)
+            del self.pending_products[user_id]
+        elif action == 'schedule_post_channel':
+            shopify_result = self.pending_products[user_id].get('shopify_result')
+            await reply(self._enqueue_pending_post(user_id, shopify_result))
+        elif action == 'schedule_channel_direct':
+            fake_shopify_result = {'url': 'N/A', 'title': self.pending_products[user_id].get('title', 'Produto')}
+            await reply(self._enqueue_pending_post(user_id, fake_shopify_result))
+        elif action == 'confirm_post_channel':
+            # Postar após Shopify
+            product_info = self.pending_products[user_id]
+            shopify_result = product_info.get('shopify_result')
+            
+            # Atualizar metafield do Shopify com link de afiliado
+            if shopify_result:
+                await asyncio.to_thread(self.shopify_manager.save_affiliate_metafield,
+                                        shopify_result['id'], affiliate_link)
+            
+            await reply("🚀 Postando no canal...")
+            report = await self._post_to_telegram_channel(product_info, shopify_result, affiliate_link, context)
+            
+            # Gerar texto formatado para preview
+            formatted_text = self._format_channel_text_for_copy(product_info, affiliate_link)
+            categories = product_info.get('categories', ['Electronics'])
+            categories_text = " | ".join(categories)
+            
+            success_msg = f"""🎉 PRODUTO PUBLICADO COM SUCESSO!
+🛍️ Shopify: {shopify_result['url'] if shopify_result else 'N/A'}
+📢 Canais:
+{self._channel_post_summary(report)}
 
-📄 Descrição: {description[:100]}{"..." if len(description) > 100 else ""}
+━━━━━━━━━━━━━━━━━━━━
 
-O que deseja fazer?        """
-        
-        keyboard = [
-            [InlineKeyboardButton("✏️ Editar Título", callback_data="edit_title")],
-            [InlineKeyboardButton("🏷️ Gerenciar Categorias", callback_data="manage_categories")],
-            [InlineKeyboardButton("💰 Editar Preços", callback_data="edit_prices")],
-            [InlineKeyboardButton("📄 Editar Descrição", callback_data="edit_description")],
-            [InlineKeyboardButton("📸 Editar Imagens", callback_data="edit_images")],
-            [InlineKeyboardButton("✅ Publicar Assim", callback_data="publish_as_is")],
-            [InlineKeyboardButton("❌ Cancelar", callback_data="cancel")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        await query.edit_message_text(preview_text, reply_markup=reply_markup)
+{formatted_text}"""
+            await reply(success_msg)
+            del self.pending_products[user_id]
+    
+    async def _use_saved_affiliate_link(self, query, user_id: int, context):
+        """Confirma o link sugerido de uma postagem anterior do mesmo produto"""
+        edit_info = self.editing_products.get(user_id)
+        suggestion = (self.pending_products.get(user_id) or {}).get('affiliate_link_suggestion')
+        if not edit_info or edit_info.get('field') != 'affiliate_link' or not suggestion:
+            await query.edit_message_text("❌ Produto não encontrado.")
+            return
+        del self.editing_products[user_id]
+        await query.edit_message_text(f"✅ Usando link anterior: {suggestion['link']}", disable_web_page_preview=True)
+        await self._apply_affiliate_link(user_id, suggestion['link'], edit_info.get('action', ''),
+                                         query.message.reply_text, context)
     
     async def _start_affiliate_link_input(self, query, user_id: int, action: str, shopify_result: Dict = None):
         """Pede o link de afiliado antes de postar no canal"""
@@ -1821,14 +2473,24 @@ O que deseja fazer?        """
         if shopify_result:
             self.pending_products[user_id]['shopify_result'] = shopify_result
         
-        await query.edit_message_text(
-            "🔗 LINK DE AFILIADO\n\n"
-            "Por favor, envie o link de afiliado para este produto:\n\n"
-            f"Produto: {product_info.get('title', 'Produto')[:50]}\n"
-            f"Link normal: {original_url[:80]}...\n\n"
-            "📝 Envie o link de afiliado (ex: amzn.to/xxxxx ou link com tag de afiliado)\n\n"
-            "⚠️ Este link será usado apenas no botão do Telegram, não na extração."
-        )
+        text = ("🔗 LINK DE AFILIADO\n\n"
+                "Por favor, envie o link de afiliado para este produto:\n\n"
+                f"Produto: {product_info.get('title', 'Produto')[:50]}\n"
+                f"Link normal: {original_url[:80]}...\n\n"
+                "📝 Envie o link de afiliado (ex: amzn.to/xxxxx ou link com tag de afiliado)\n\n"
+                "⚠️ Este link será usado apenas no botão do Telegram, não na extração.")
+        reply_markup = None
+        suggestion = product_info.get('affiliate_link_suggestion')
+        if suggestion:
+            # Link de uma postagem anterior do mesmo produto: só entra se o operador confirmar
+            text += (f"\n\n♻️ Link já usado para este produto em {datetime.fromtimestamp(suggestion['used_at']):%d/%m}:\n"
+                     f"{suggestion['link']}\n"
+                     f"Postagem: {suggestion['title'][:60]}")
+            if not suggestion.get('verified', True):
+                text += "\n⚠️ Postagem antiga sem ASIN (mesma imagem/link): confira se é o mesmo produto"
+            reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton("✅ Usar este link",
+                                                                       callback_data="use_saved_affiliate_link")]])
+        await query.edit_message_text(text, reply_markup=reply_markup, disable_web_page_preview=True)
         
         # Configurar estado para aguardar link de afiliado
         self.editing_products[user_id] = {
@@ -1853,76 +2515,22 @@ O que deseja fazer?        """
             await msg_to_edit.edit_text("❌ Produto não encontrado.")
             return
         
-        product_info = self.pending_products[user_id]
-        
-        # Escapar textos para evitar problemas com Markdown
-        title = product_info.get('title', 'Sem título')
-        price_info = product_info.get('price', {})
-        current_price = price_info.get('current', 0)
-        original_price = price_info.get('original', current_price)
-        discount = price_info.get('discount_percent', 0)
-        description = product_info.get('description', 'Sem descrição')
-        categories = product_info.get('categories', ['Electronics'])
-        categories_text = " | ".join(categories)
-        images = product_info.get('images', [])
-        images_count = len(images)
-        
-        # Mostrar URLs das imagens (simplificado)
-        images_text = ""
-        if images:
-            images_text = f"\nSuas imagens:\n"
-            for i, img in enumerate(images[:3], 1):
-                images_text += f"{i}. {img[:50]}...\n"
-            if len(images) > 3:
-                images_text += f"... e mais {len(images) - 3} imagens\n"
-        
-        affiliate_link = product_info.get('original_url', 'Não informado')
-        
-        # Usar texto simples sem Markdown para evitar erros de parsing
-        preview_text = f"""
-📦 PRODUTO ATUALIZADO
-
-📝 Título: {product_info.get('title', 'Sem título')}
-
-🏷️ Categorias: {categories_text}
-
-💰 Preços:
-• Atual: R$ {current_price:.2f}
-{f"• Original: R$ {original_price:.2f}" if original_price > current_price else ""}
-{f"• Desconto: {discount}% OFF" if discount > 0 else ""}
-
-📸 Imagens: {images_count} encontradas{images_text}
-
-📄 Descrição: {product_info.get('description', 'Sem descrição')[:100]}{"..." if len(product_info.get('description', '')) > 100 else ""}
-
-🔗 Link Afiliado: {affiliate_link}
-
-O que deseja fazer?
-        """
-        
-        keyboard = [
-            [InlineKeyboardButton("✏️ Editar Título", callback_data="edit_title")],
-            [InlineKeyboardButton("🏷️ Gerenciar Categorias", callback_data="manage_categories")],
-            [InlineKeyboardButton("💰 Editar Preços", callback_data="edit_prices")],
-            [InlineKeyboardButton("📄 Editar Descrição", callback_data="edit_description")],
-            [InlineKeyboardButton("📸 Editar Imagens", callback_data="edit_images")],
-            [InlineKeyboardButton("✅ Publicar Assim", callback_data="publish_as_is")],
-            [InlineKeyboardButton("❌ Cancelar", callback_data="cancel")]
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        
-        # Sem parse_mode para evitar problemas com caracteres especiais
-        await msg_to_edit.edit_text(preview_text, reply_markup=reply_markup)
+        with trace_stage('preview'):
+            await self.message_editor.edit(msg_to_edit, render_product_preview(self.pending_products[user_id], "📦 PRODUTO ATUALIZADO"),
+                                           reply_markup=PRODUCT_PREVIEW_KEYBOARD)
     
     async def _show_cta_menu(self, query, user_id: int):
         """Mostra menu de opções de CTA"""
         product_info = self.pending_products.get(user_id, {})
         current_cta = product_info.get('cta', '')
+        # Histórico de preços indica menor preço da janela: destacar a CTA correspondente
+        lowest_price = (product_info.get('price_history') or {}).get('is_lowest', False)
         
         keyboard = [
             [InlineKeyboardButton("Amazon's Choice 🟧", callback_data="cta_amazons_choice")],
             [InlineKeyboardButton("Walmart Deals 🟦", callback_data="cta_walmart_deals")],
-            [InlineKeyboardButton("Lowest price in 30 days 📉", callback_data="cta_lowest_30_days")],
+            [InlineKeyboardButton(("⭐ " if lowest_price else "") + "Lowest price in 30 days 📉",
+                                  callback_data="cta_lowest_30_days")],
             [InlineKeyboardButton("Limited time deal ⏰", callback_data="cta_limited_time_deal")],
             [InlineKeyboardButton("Lightning Deal ⚡", callback_data="cta_lightning_deal")],
             [InlineKeyboardButton("Deal selling fast ⚡", callback_data="cta_deal_selling_fast")],
@@ -1944,7 +2552,8 @@ O que deseja fazer?
         await query.edit_message_text(
             f"🏷️ ADICIONAR CTA\n\n"
             f"CTA atual: {current_cta if current_cta else 'Nenhum'}\n\n"
-            f"Escolha uma opção:",
+            + ("⭐ Sugerida: menor preço da janela segundo o histórico\n\n" if lowest_price else "")
+            + f"Escolha uma opção:",
             reply_markup=reply_markup
         )
     
@@ -2019,23 +2628,46 @@ def main():
         logger.error("TELEGRAM_BOT_TOKEN não configurado!")
         return
     
-    # Criar aplicação
-    application = Application.builder().token(Config.TELEGRAM_BOT_TOKEN).build()
-    
     # Criar instância do bot
     bot = TelegramBotWithEdit()
     
+    # Modo webhook exige URL pública; sem ela, volta para polling
+    use_webhook = Config.BOT_MODE == 'webhook'
+    if use_webhook and not Config.WEBHOOK_URL:
+        logger.warning("BOT_MODE=webhook sem WEBHOOK_URL configurada, usando polling")
+        use_webhook = False
+    
+    # Criar aplicação
+    builder = Application.builder().token(Config.TELEGRAM_BOT_TOKEN).rate_limiter(bot.outbound_scheduler).post_init(bot.post_init).post_shutdown(bot.post_shutdown)
+    update_processor = UserOrderedUpdateProcessor(Config.UPDATE_CONCURRENCY)
+    update_processor.on_update_done.append(bot.release_state)
+    builder = builder.concurrent_updates(update_processor)
+    if use_webhook:
+        builder = builder.updater(None)
+    application = builder.build()
+    
     # Adicionar handlers
     application.add_handler(CommandHandler("start", bot.start))
+    application.add_handler(CommandHandler("metrics", bot.metrics))
+    application.add_handler(CommandHandler("fila", bot.post_queue_command))
+    application.add_handler(CommandHandler("stats", bot.stats_command))
+    application.add_handler(CommandHandler("search", bot.search_command))
+    application.add_handler(CommandHandler("report", bot.report_command))
     application.add_handler(CallbackQueryHandler(bot.handle_callback))
-    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND & filters.Regex(r'^https?://'), bot.handle_url))
+    # Mensagens com uma ou várias linhas começando por link (vários links = importação em lote)
+    application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND & filters.Regex(r'(?m)^\s*https?://'), bot.handle_url))
+    application.add_handler(MessageHandler(filters.Document.FileExtension("txt") | filters.Document.FileExtension("csv"), bot.handle_bulk_file))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, bot.handle_edit_input))
     
     # Iniciar bot
     logger.info("🤖 Bot com Edição iniciado!")
     logger.info("✏️ Funcionalidade de edição ativa")
     
-    application.run_polling()
+    if use_webhook:
+        run_webhook(application)
+    else:
+        # run_polling remove um webhook registrado anteriormente
+        application.run_polling()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,110 @@
+"""
+Importação em lote: vários links numa mensagem ou num arquivo .txt/.csv
+"""
+
+import asyncio
+import csv
+import io
+import logging
+import re
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from product_identity import identity_keys
+
+logger = logging.getLogger(__name__)
+
+URL_PATTERN = re.compile(r'https?://[^\s<>"\']+')
+TRAILING_PUNCTUATION = '.,;:!?)]}'
+
+
+def extract_urls(text: str, limit: Optional[int] = None) -> List[str]:
+    """URLs do texto, na ordem em que aparecem e sem repetições"""
+    urls = []
+    for match in URL_PATTERN.finditer(text or ''):
+        url = match.group(0).rstrip(TRAILING_PUNCTUATION)
+        if url not in urls:
+            urls.append(url)
+            if limit and len(urls) >= limit:
+                break
+    return urls
+
+
+def read_url_file(data: bytes, filename: str, limit: Optional[int] = None) -> List[str]:
+    """URLs de um arquivo enviado (.txt: qualquer posição; .csv: em qualquer coluna)"""
+    text = data.decode('utf-8-sig', errors='replace')
+    if not filename.lower().endswith('.csv'):
+        return extract_urls(text, limit)
+
+    urls = []
+    for row in csv.reader(io.StringIO(text)):
+        for cell in row:
+            for url in extract_urls(cell):
+                if url not in urls:
+                    urls.append(url)
+                    if limit and len(urls) >= limit:
+                        return urls
+    return urls
+
+
+def dedupe_products(products: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """Separa os produtos repetidos no lote (links diferentes para o mesmo produto)
+
+    O ASIN decide quando existe; sem ASIN, vale o link do produto ou o enviado,
+    normalizados. Imagem igual não basta: variações costumam dividir a foto.
+    Retorna (únicos, repetidos), na ordem do lote.
+    """
+    unique, duplicates, seen = [], [], set()
+    for product_info in products:
+        keys = identity_keys(product_info.get('product_url'), None, product_info.get('original_url'))
+        keys = [key for key in keys if key.startswith('asin:')] or keys
+        if seen.intersection(keys):
+            duplicates.append(product_info)
+            continue
+        seen.update(keys)
+        unique.append(product_info)
+    return unique, duplicates
+
+
+async def extract_many(extract: Callable[[str], Awaitable[Dict]], urls: List[str], concurrency: int,
+                       on_progress: Callable[[int, int, int], Awaitable[None]] = None,
+                       progress_interval: float = 2.0) -> List[Dict]:
+    """Extrai vários produtos em paralelo, na ordem dos links
+
+    Retorna um item por URL: {'url', 'product'} ou {'url', 'error'}.
+    `on_progress(concluídos, ok, falhas)` é chamado no máximo a cada
+    `progress_interval` segundos e uma última vez ao final.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results: List[Optional[Dict]] = [None] * len(urls)
+    counters = {'done': 0, 'ok': 0, 'failed': 0}
+    last_report, last_done = 0.0, -1
+
+    async def report(force: bool = False):
+        nonlocal last_report, last_done
+        now = time.monotonic()
+        if on_progress and counters['done'] != last_done and (force or now - last_report >= progress_interval):
+            last_report, last_done = now, counters['done']
+            try:
+                await on_progress(counters['done'], counters['ok'], counters['failed'])
+            except Exception as e:
+                logger.warning(f"Erro ao atualizar progresso do lote: {e}")
+
+    async def worker(index: int, url: str):
+        async with semaphore:
+            try:
+                product = await extract(url)
+            except Exception as e:
+                product = {'error': str(e)}
+        if 'error' in product:
+            results[index] = {'url': url, 'error': product['error']}
+            counters['failed'] += 1
+        else:
+            results[index] = {'url': url, 'product': product}
+            counters['ok'] += 1
+        counters['done'] += 1
+        await report()
+
+    await asyncio.gather(*(worker(index, url) for index, url in enumerate(urls)))
+    await report(force=True)
+    return results
@@ -0,0 +1,109 @@
+"""
+Roteador de callbacks dos botões com medição de latência por ação
+"""
+
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LATENCY_SAMPLES = 500
+
+# handler(query, user_id, context, payload) - payload é o sufixo nas rotas por prefixo
+CallbackHandler = Callable[[Any, int, Any, Optional[str]], Awaitable[Any]]
+
+
+class PrefixTrie:
+    """Trie de prefixos: retorna a rota do prefixo mais longo que casa com o texto"""
+
+    __slots__ = ('children', 'value')
+
+    def __init__(self):
+        self.children = {}
+        self.value = None
+
+    def insert(self, prefix: str, value):
+        node = self
+        for char in prefix:
+            node = node.children.setdefault(char, PrefixTrie())
+        node.value = (prefix, value)
+
+    def longest_match(self, text: str) -> Optional[Tuple[str, Any]]:
+        node, best = self, None
+        for char in text:
+            node = node.children.get(char)
+            if node is None:
+                break
+            if node.value is not None:
+                best = node.value
+        return best
+
+
+class CallbackRouter:
+    """Tabela de rotas: dicionário para ações exatas e trie para prefixos
+
+    Ações exatas têm precedência (ex.: `cta_custom` antes do prefixo `cta_`).
+    """
+
+    def __init__(self):
+        self._exact: Dict[str, CallbackHandler] = {}
+        self._prefixes = PrefixTrie()
+        self._latencies: Dict[str, deque] = {}
+        self._calls: Dict[str, int] = {}
+        self._errors: Dict[str, int] = {}
+
+    def add(self, action: str, handler: CallbackHandler):
+        """Registra uma ação exata"""
+        self._exact[action] = handler
+
+    def add_prefix(self, prefix: str, handler: CallbackHandler):
+        """Registra uma família de ações (o sufixo é passado como payload)"""
+        self._prefixes.insert(prefix, handler)
+
+    def resolve(self, data: str) -> Optional[Tuple[str, CallbackHandler, Optional[str]]]:
+        """Retorna (nome da rota, handler, payload) ou None"""
+        handler = self._exact.get(data)
+        if handler is not None:
+            return data, handler, None
+        match = self._prefixes.longest_match(data)
+        if match is None:
+            return None
+        prefix, handler = match
+        return f"{prefix}*", handler, data[len(prefix):]
+
+    async def dispatch(self, data: str, query, user_id: int, context) -> bool:
+        """Executa a rota do callback; False se não houver rota registrada"""
+        route = self.resolve(data or '')
+        if route is None:
+            logger.warning(f"Callback sem rota: {data}")
+            return False
+
+        name, handler, payload = route
+        started = time.perf_counter()
+        try:
+            await handler(query, user_id, context, payload)
+        except Exception:
+            self._errors[name] = self._errors.get(name, 0) + 1
+            raise
+        finally:
+            samples = self._latencies.get(name)
+            if samples is None:
+                samples = self._latencies[name] = deque(maxlen=LATENCY_SAMPLES)
+            samples.append(time.perf_counter() - started)
+            self._calls[name] = self._calls.get(name, 0) + 1
+        return True
+
+    def metrics(self) -> Dict[str, Dict]:
+        """Latência (p50/p95 em ms), chamadas e erros por rota, da mais lenta para a mais rápida"""
+        result = {}
+        for name, latencies in self._latencies.items():
+            samples = sorted(latencies)
+            result[name] = {
+                'calls': self._calls.get(name, 0),
+                'errors': self._errors.get(name, 0),
+                'p50_ms': samples[len(samples) // 2] * 1000,
+                'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+            }
+        return dict(sorted(result.items(), key=lambda item: item[1]['p95_ms'], reverse=True))
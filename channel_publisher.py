@@ -0,0 +1,104 @@
+"""
+Publicação de um mesmo post em vários canais/grupos do Telegram
+"""
+
+import asyncio
+import logging
+from typing import Dict, List, Optional
+
+from telegram.error import BadRequest
+
+from config import Config
+from telegram_file_cache import FileIdCache
+
+logger = logging.getLogger(__name__)
+
+
+class PublishReport:
+    """Resultado por destino: {'ok', 'message_id', 'error'}"""
+
+    def __init__(self, targets: List[str]):
+        self.targets = targets
+        self.results: Dict[str, Dict] = {}
+
+    def record(self, target: str, message=None, error: Exception = None):
+        if message is not None:
+            self.results[target] = {'ok': True, 'message_id': message.message_id, 'error': None}
+        else:
+            self.results[target] = {'ok': False, 'message_id': None, 'error': str(error)}
+
+    @property
+    def succeeded(self) -> List[str]:
+        return [target for target in self.targets if self.results.get(target, {}).get('ok')]
+
+    @property
+    def failed(self) -> List[str]:
+        return [target for target in self.targets if not self.results.get(target, {}).get('ok')]
+
+    def __bool__(self) -> bool:
+        return bool(self.succeeded)
+
+    def summary(self) -> str:
+        """Uma linha por destino, para as mensagens ao operador"""
+        lines = []
+        for target in self.targets:
+            result = self.results.get(target, {'ok': False, 'error': 'não enviado'})
+            lines.append(f"✅ {target}" if result['ok'] else f"❌ {target}: {result['error']}")
+        return "\n".join(lines)
+
+
+class ChannelPublisher:
+    """Entrega um post a todos os destinos configurados em paralelo
+
+    A foto é enviada pela URL uma única vez; os demais destinos recebem o
+    file_id devolvido pelo Telegram (sem novo download da imagem).
+    """
+
+    def __init__(self, file_id_cache: FileIdCache, targets: List[str] = None):
+        self.file_id_cache = file_id_cache
+        self.targets = targets or Config.TELEGRAM_CHANNEL_IDS
+
+    def describe(self) -> str:
+        return ", ".join(self.targets) or "nenhum canal configurado"
+
+    async def _send_photo(self, bot, chat_id, image_url: str, **kwargs):
+        """Envia foto reaproveitando o file_id do Telegram quando a imagem já foi enviada antes"""
+        file_id = self.file_id_cache.get(image_url)
+        if file_id:
+            try:
+                return await bot.send_photo(chat_id=chat_id, photo=file_id, **kwargs)
+            except BadRequest as e:
+                # file_id expirado/inválido: voltar para a URL
+                logger.warning(f"file_id em cache rejeitado ({e}), reenviando pela URL")
+                self.file_id_cache.discard(image_url)
+
+        result = await bot.send_photo(chat_id=chat_id, photo=image_url, **kwargs)
+        if result.photo:
+            # Maior resolução fica no fim da lista
+            self.file_id_cache.put(image_url, result.photo[-1].file_id)
+        return result
+
+    async def _send(self, bot, target: str, report: PublishReport, text: str,
+                    image_url: Optional[str], **kwargs):
+        try:
+            if image_url:
+                message = await self._send_photo(bot, target, image_url, caption=text, **kwargs)
+            else:
+                message = await bot.send_message(chat_id=target, text=text, **kwargs)
+            report.record(target, message=message)
+            logger.info(f"Postagem enviada para {target}: {message.message_id}")
+        except Exception as e:
+            report.record(target, error=e)
+            logger.error(f"Erro ao postar em {target}: {e}")
+
+    async def publish(self, bot, text: str, image_url: Optional[str] = None, **kwargs) -> PublishReport:
+        """Publica em todos os destinos e retorna o resultado de cada um"""
+        report = PublishReport(list(self.targets))
+        pending = list(self.targets)
+
+        # Sem file_id em cache: enviar pela URL a um destino de cada vez até um dar certo
+        while image_url and pending and not self.file_id_cache.get(image_url):
+            await self._send(bot, pending.pop(0), report, text, image_url, **kwargs)
+
+        await asyncio.gather(*(self._send(bot, target, report, text, image_url, **kwargs) for target in pending))
+        return report
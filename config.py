@@ -2,18 +2,55 @@
 Configurações do bot
 """
 
+import hashlib
 import os
+import re
 from dotenv import load_dotenv
 
 # Carregar variáveis de ambiente
 load_dotenv('config.env')
 
+
+def _webhook_secret(value: str) -> str:
+    """secret_token do Telegram aceita só A-Z, a-z, 0-9, _ e - (até 256)
+
+    Valores fora disso (ex.: o base64 gerado pelo Render) viram o SHA-256 em hex.
+    """
+    value = value.strip()
+    if not value or re.fullmatch(r'[A-Za-z0-9_-]{1,256}', value):
+        return value
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
 class Config:
     """Classe de configuração centralizada"""
     
     # Telegram
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN', '').strip()
     TELEGRAM_CHANNEL_ID = os.getenv('TELEGRAM_CHANNEL_ID', '').strip()
+    # Destinos das postagens (canais/grupos separados por vírgula); padrão: só TELEGRAM_CHANNEL_ID
+    TELEGRAM_CHANNEL_IDS = [target.strip() for target in
+                            os.getenv('TELEGRAM_CHANNEL_IDS', TELEGRAM_CHANNEL_ID).split(',') if target.strip()]
+    TELEGRAM_FILE_CACHE_PATH = os.getenv('TELEGRAM_FILE_CACHE_PATH', 'telegram_file_ids.json')
+    
+    # Limites de envio ao Telegram (fila de saída)
+    OUTBOUND_GLOBAL_RATE = float(os.getenv('OUTBOUND_GLOBAL_RATE', '25'))
+    OUTBOUND_CHAT_RATE = float(os.getenv('OUTBOUND_CHAT_RATE', '1.0'))
+    OUTBOUND_GROUP_RATE_PER_MINUTE = float(os.getenv('OUTBOUND_GROUP_RATE_PER_MINUTE', '20'))
+    OUTBOUND_MAX_RETRIES = int(os.getenv('OUTBOUND_MAX_RETRIES', '3'))
+    
+    # Updates processados em paralelo (os de um mesmo operador seguem em ordem)
+    UPDATE_CONCURRENCY = int(os.getenv('UPDATE_CONCURRENCY', '16'))
+    
+    # Modo de recebimento de updates: 'polling' (padrão) ou 'webhook'
+    BOT_MODE = os.getenv('BOT_MODE', 'polling').strip().lower()
+    WEBHOOK_URL = (os.getenv('WEBHOOK_URL') or os.getenv('RENDER_EXTERNAL_URL') or
+                   (f"https://{os.getenv('RAILWAY_PUBLIC_DOMAIN')}" if os.getenv('RAILWAY_PUBLIC_DOMAIN') else '')).strip()
+    WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/telegram')
+    WEBHOOK_SECRET = _webhook_secret(os.getenv('WEBHOOK_SECRET', ''))
+    WEBHOOK_MAX_PENDING = int(os.getenv('WEBHOOK_MAX_PENDING', '100'))
+    WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+    PORT = int(os.getenv('PORT', '8080'))
     
     # Shopify
     SHOPIFY_SHOP_URL = os.getenv('SHOPIFY_SHOP_URL', '').strip()
@@ -30,6 +67,68 @@ class Config:
     MAX_IMAGES = int(os.getenv('MAX_IMAGES', '4'))
     MAX_DESCRIPTION_LENGTH = int(os.getenv('MAX_DESCRIPTION_LENGTH', '500'))
     REQUEST_TIMEOUT = int(os.getenv('REQUEST_TIMEOUT', '10'))
+    HTTP_MAX_CONNECTIONS = int(os.getenv('HTTP_MAX_CONNECTIONS', '20'))
+    
+    # Importação em lote (vários links por mensagem ou arquivo .txt/.csv)
+    BULK_MAX_URLS = int(os.getenv('BULK_MAX_URLS', '50'))
+    BULK_CONCURRENCY = int(os.getenv('BULK_CONCURRENCY', '5'))
+    BULK_MAX_FILE_BYTES = int(os.getenv('BULK_MAX_FILE_BYTES', str(1024 * 1024)))
+    
+    # Pré-validação de imagens antes do envio ao Shopify
+    IMAGE_PREFLIGHT_ENABLED = os.getenv('IMAGE_PREFLIGHT_ENABLED', 'true').lower() == 'true'
+    IMAGE_PREFLIGHT_BUDGET = float(os.getenv('IMAGE_PREFLIGHT_BUDGET', '3.0'))
+    IMAGE_PREFLIGHT_CONCURRENCY = int(os.getenv('IMAGE_PREFLIGHT_CONCURRENCY', '8'))
+    IMAGE_PREFLIGHT_CACHE_TTL = int(os.getenv('IMAGE_PREFLIGHT_CACHE_TTL', '3600'))
+    
+    # Espelho local do catálogo Shopify (detecção de duplicados)
+    CATALOG_MIRROR_PATH = os.getenv('CATALOG_MIRROR_PATH', 'shopify_catalog.json')
+    CATALOG_SYNC_INTERVAL = int(os.getenv('CATALOG_SYNC_INTERVAL', '900'))
+    CATALOG_RECONCILE_INTERVAL = int(os.getenv('CATALOG_RECONCILE_INTERVAL', '86400'))  # remove excluídos na loja
+    SHOPIFY_MAX_CONCURRENCY = int(os.getenv('SHOPIFY_MAX_CONCURRENCY', '4'))
+    
+    # Estado das conversas (rascunhos sobrevivem a reinícios)
+    STATE_DB_PATH = os.getenv('STATE_DB_PATH', 'bot_state.sqlite3')
+    STATE_TTL_HOURS = float(os.getenv('STATE_TTL_HOURS', '72'))
+    STATE_MAX_IN_MEMORY = int(os.getenv('STATE_MAX_IN_MEMORY', '200'))
+    STATE_FLUSH_INTERVAL = float(os.getenv('STATE_FLUSH_INTERVAL', '5'))
+    # Espera (s) por um lock do SQLite quando outra conexão está gravando no mesmo arquivo
+    SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', '10'))
+    
+    # Fila de postagens agendadas no canal
+    POST_QUEUE_SLOTS = os.getenv('POST_QUEUE_SLOTS', '')  # ex.: "08:00,08:15,08:30" (vazio = janela contínua)
+    POST_ACTIVE_HOURS = os.getenv('POST_ACTIVE_HOURS', '08:00-23:00')
+    POST_MIN_SPACING_MINUTES = float(os.getenv('POST_MIN_SPACING_MINUTES', '8'))
+    POST_DAILY_CAP = int(os.getenv('POST_DAILY_CAP', '100'))
+    POST_TIMEZONE = os.getenv('POST_TIMEZONE', 'America/New_York')
+    
+    # Log de produtos postados
+    PRODUCTS_LOG_PATH = os.getenv('PRODUCTS_LOG_PATH', 'products_log.jsonl')
+    PRODUCTS_LOG_ARCHIVE_DIR = os.getenv('PRODUCTS_LOG_ARCHIVE_DIR', 'products_log_archive')
+    PRODUCTS_LOG_MAX_BYTES = int(os.getenv('PRODUCTS_LOG_MAX_BYTES', str(5 * 1024 * 1024)))
+    PRODUCTS_LOG_FLUSH_INTERVAL = float(os.getenv('PRODUCTS_LOG_FLUSH_INTERVAL', '1.0'))
+    PRODUCTS_LOG_BATCH_SIZE = int(os.getenv('PRODUCTS_LOG_BATCH_SIZE', '50'))
+    PRODUCT_STATS_PATH = os.getenv('PRODUCT_STATS_PATH', 'product_stats.json')
+    PRODUCTS_SNAPSHOT_PATH = os.getenv('PRODUCTS_SNAPSHOT_PATH', 'products_log.snap')
+    
+    # Histórico de preços (CTA "Lowest price in 30 days")
+    PRICE_HISTORY_WINDOW_DAYS = float(os.getenv('PRICE_HISTORY_WINDOW_DAYS', '30'))
+    PRICE_HISTORY_AUTO_CTA = os.getenv('PRICE_HISTORY_AUTO_CTA', 'false').lower() == 'true'
+    
+    # Aviso de produtos quase duplicados (títulos parecidos postados recentemente)
+    NEAR_DUP_WINDOW_DAYS = float(os.getenv('NEAR_DUP_WINDOW_DAYS', '7'))
+    NEAR_DUP_THRESHOLD = float(os.getenv('NEAR_DUP_THRESHOLD', '0.3'))
+    NEAR_DUP_SNAPSHOT_PATH = os.getenv('NEAR_DUP_SNAPSHOT_PATH', 'near_duplicates.npz')
+    
+    # Sugerir o link de afiliado de produtos já postados (ASIN, imagem ou link)
+    AFFILIATE_LINK_REUSE = os.getenv('AFFILIATE_LINK_REUSE', 'true').lower() == 'true'
+    
+    # Relatório diário das postagens (enviado para ADMIN_CHAT_ID às DAILY_REPORT_TIME, no fuso POST_TIMEZONE)
+    ADMIN_CHAT_ID = os.getenv('ADMIN_CHAT_ID', '').strip()
+    DAILY_REPORT_TIME = os.getenv('DAILY_REPORT_TIME', '23:55')
+    
+    # Trace por fluxo de produto (uma linha JSON por fluxo; vazio desativa)
+    TRACE_LOG_PATH = os.getenv('TRACE_LOG_PATH', 'request_traces.jsonl')
+    TRACE_TTL = float(os.getenv('TRACE_TTL', '3600'))  # fluxo parado vira 'abandoned'
     
     # Headers para requests
     USER_AGENT = os.getenv('USER_AGENT', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
@@ -42,8 +141,8 @@ class Config:
         if not cls.TELEGRAM_BOT_TOKEN:
             errors.append("TELEGRAM_BOT_TOKEN é obrigatório")
         
-        if not cls.TELEGRAM_CHANNEL_ID:
-            errors.append("TELEGRAM_CHANNEL_ID é obrigatório")
+        if not cls.TELEGRAM_CHANNEL_IDS:
+            errors.append("TELEGRAM_CHANNEL_ID (ou TELEGRAM_CHANNEL_IDS) é obrigatório")
         
         if not cls.SHOPIFY_SHOP_URL:
             errors.append("SHOPIFY_SHOP_URL é obrigatório")
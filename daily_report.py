@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Relatório diário das postagens, lido em streaming do log de produtos
+
+Os registros passam por um pipeline de geradores (segmentos -> linhas ->
+registros do período) e são somados em contadores de tamanho fixo: a memória
+não cresce com o tamanho do log nem com o número de arquivos compactados.
+
+Uso:
+    python3 daily_report.py                  # hoje
+    python3 daily_report.py --date 2025-12-10
+    python3 daily_report.py --days 7         # últimos 7 dias até a data
+"""
+
+import argparse
+import heapq
+import itertools
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator
+from zoneinfo import ZoneInfo
+
+from config import Config
+from product_identity import CTA_LABELS, cta_code, retailer_of
+from product_stats import discount_bucket
+from products_log import LogSegments
+
+TOP_DISCOUNTS = 5
+
+
+def _hour(record: Dict) -> int:
+    """Hora da postagem a partir do timestamp ISO (YYYY-MM-DDTHH:...)"""
+    try:
+        return int(record['timestamp'][11:13])
+    except (KeyError, TypeError, ValueError):
+        return -1
+
+
+class DailyReport:
+    """Acumulador de tamanho fixo: contadores, 24 horas e as N maiores ofertas"""
+
+    def __init__(self, start: str, end: str, top: int = TOP_DISCOUNTS):
+        self.start = start
+        self.end = end
+        self.top = top
+        self.posts = 0
+        self.discount_total = 0.0
+        self.hours = [0] * 24
+        self.retailers = Counter()
+        self.ctas = Counter()
+        self.discounts = Counter()
+        self._best = []  # heap mínimo com as `top` maiores ofertas
+        self._order = itertools.count()
+
+    def add(self, record: Dict):
+        discount = float(record.get('discount_percent') or 0)
+        self.posts += 1
+        self.discount_total += discount
+        hour = _hour(record)
+        if 0 <= hour < 24:
+            self.hours[hour] += 1
+        self.retailers[retailer_of(record.get('affiliate_link'))] += 1
+        self.ctas[cta_code(record.get('cta'))] += 1
+        self.discounts[discount_bucket(discount)] += 1
+        item = (discount, next(self._order), record.get('title', ''), record.get('price_current') or 0,
+                record.get('affiliate_link', ''))
+        if len(self._best) < self.top:
+            heapq.heappush(self._best, item)
+        elif item > self._best[0]:
+            heapq.heapreplace(self._best, item)
+
+    def consume(self, records: Iterable[Dict]) -> 'DailyReport':
+        for record in records:
+            self.add(record)
+        return self
+
+    def summary(self) -> Dict:
+        best = sorted(self._best, reverse=True)
+        return {
+            'start': self.start, 'end': self.end, 'posts': self.posts,
+            'avg_discount': self.discount_total / self.posts if self.posts else 0.0,
+            'hours': list(self.hours),
+            'retailers': dict(self.retailers.most_common()),
+            'ctas': dict(self.ctas.most_common()),
+            'discounts': dict(sorted(self.discounts.items(), key=lambda item: int(item[0].rstrip('+').split('-')[0]))),
+            'top_discounts': [{'discount': discount, 'title': title, 'price': price, 'link': link}
+                              for discount, _, title, price, link in best],
+        }
+
+
+def records_between(segments: LogSegments, start: str, end: str) -> Iterator[Dict]:
+    """Registros com `date` no intervalo (arquivos fora dele nem são abertos)"""
+    return segments.iter_records(since_date=start, until_date=end)
+
+
+def build_report(day: str = None, days: int = 1, segments: LogSegments = None,
+                 top: int = TOP_DISCOUNTS) -> Dict:
+    """Resumo dos `days` dias terminados em `day` (padrão: hoje, no fuso POST_TIMEZONE)"""
+    end = date.fromisoformat(day) if day else datetime.now(ZoneInfo(Config.POST_TIMEZONE)).date()
+    start = end - timedelta(days=max(days, 1) - 1)
+    report = DailyReport(start.isoformat(), end.isoformat(), top)
+    return report.consume(records_between(segments or LogSegments(), report.start, report.end)).summary()
+
+
+def format_report(summary: Dict) -> str:
+    """Texto do relatório para o Telegram (sem HTML)"""
+    period = summary['end'] if summary['start'] == summary['end'] else f"{summary['start']} a {summary['end']}"
+    if not summary['posts']:
+        return f"📊 RELATÓRIO {period}\n\nNenhuma postagem registrada."
+
+    lines = [f"📊 RELATÓRIO {period}", "",
+             f"📦 Postagens: {summary['posts']}",
+             f"💥 Desconto médio: {summary['avg_discount']:.0f}%",
+             "🏪 Lojas: " + ", ".join(f"{name} {count}" for name, count in summary['retailers'].items()),
+             "", "🔥 Maiores descontos:"]
+    for item in summary['top_discounts']:
+        lines.append(f"• {item['discount']:.0f}% | ${float(item['price']):.2f} | {item['title'][:60]}")
+
+    lines.extend(["", "🕐 Postagens por hora:"])
+    peak = max(summary['hours']) or 1
+    for hour, count in enumerate(summary['hours']):
+        if count:
+            lines.append(f"{hour:02d}h {'█' * max(1, round(count * 10 / peak))} {count}")
+
+    lines.extend(["", "🏷️ CTAs:"])
+    for code, count in summary['ctas'].items():
+        label = CTA_LABELS.get(code, {'none': 'Sem CTA', 'other': 'Outras'}.get(code, code))
+        lines.append(f"• {label}: {count}")
+    lines.extend(["", "📉 Faixas de desconto: " + ", ".join(f"{bucket}% {count}"
+                                                           for bucket, count in summary['discounts'].items())])
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Relatório das postagens a partir do log de produtos")
+    parser.add_argument('--date', help="último dia do relatório (YYYY-MM-DD, padrão: hoje)")
+    parser.add_argument('--days', type=int, default=1, help="quantidade de dias")
+    parser.add_argument('--top', type=int, default=TOP_DISCOUNTS, help="maiores descontos listados")
+    args = parser.parse_args()
+    print(format_report(build_report(args.date, args.days, top=args.top)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Análises do log de produtos com agregações vetorizadas (NumPy)
+
+As colunas vêm do snapshot colunar do log (log_snapshot.py), mapeado em
+memória sem cópia; nenhuma linha JSON é decodificada aqui.
+"""
+
+import logging
+from datetime import date
+from typing import Dict
+
+import numpy as np
+
+from log_snapshot import CTA_CODES, NUMERIC_COLUMNS, RETAILER_CODES, LogSnapshot
+
+logger = logging.getLogger(__name__)
+
+
+def _day_label(day: int) -> str:
+    return date.fromordinal(date(1970, 1, 1).toordinal() + int(day)).isoformat()
+
+
+class DealAnalytics:
+    """Colunas do snapshot + agregações vetorizadas"""
+
+    def __init__(self, snapshot: LogSnapshot = None):
+        self.snapshot = snapshot or LogSnapshot()
+
+    def refresh(self) -> int:
+        """Enxerga as linhas acrescentadas ao snapshot; retorna o total"""
+        return self.snapshot.reload()
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        return {name: self.snapshot.column(name) for name, _ in NUMERIC_COLUMNS}
+
+    def __len__(self) -> int:
+        return self.snapshot.rows
+
+    # Agregações --------------------------------------------------------------
+
+    def window(self, days: int = None) -> Dict[str, np.ndarray]:
+        """Colunas filtradas pelos últimos N dias (todas se None)"""
+        columns = self.columns
+        if not days or not len(self):
+            return columns
+        today = (date.today() - date(1970, 1, 1)).days
+        mask = columns['day'] > today - days
+        return {name: values[mask] for name, values in columns.items()}
+
+    @staticmethod
+    def median_discount_by_day(columns: Dict[str, np.ndarray]) -> Dict[str, float]:
+        days = columns['day']
+        if not len(days):
+            return {}
+        order = np.argsort(days, kind='stable')
+        sorted_days, discounts = days[order], columns['discount_percent'][order]
+        unique_days, starts = np.unique(sorted_days, return_index=True)
+        groups = np.split(discounts, starts[1:])
+        return {_day_label(day): float(np.median(group)) for day, group in zip(unique_days, groups)}
+
+    @staticmethod
+    def share_with_discount(columns: Dict[str, np.ndarray], minimum: float = 50) -> float:
+        discounts = columns['discount_percent']
+        return float(np.mean(discounts >= minimum)) if len(discounts) else 0.0
+
+    @staticmethod
+    def price_distribution_by_cta(columns: Dict[str, np.ndarray]) -> Dict[str, Dict]:
+        """Por CTA: quantidade e quartis do preço atual"""
+        result = {}
+        codes, prices = columns['cta'], columns['price_current']
+        counts = np.bincount(codes, minlength=len(CTA_CODES))
+        for code in np.flatnonzero(counts):
+            p25, p50, p75 = np.percentile(prices[codes == code], [25, 50, 75])
+            result[CTA_CODES[code]] = {'count': int(counts[code]), 'p25': float(p25),
+                                       'p50': float(p50), 'p75': float(p75)}
+        return dict(sorted(result.items(), key=lambda item: -item[1]['count']))
+
+    def summary(self, days: int = None) -> Dict:
+        columns = self.window(days)
+        discounts = columns['discount_percent']
+        retailers = np.bincount(columns['retailer'], minlength=len(RETAILER_CODES))
+        return {
+            'posts': int(len(discounts)),
+            'median_discount': float(np.median(discounts)) if len(discounts) else 0.0,
+            'share_50_plus': self.share_with_discount(columns, 50),
+            'median_discount_by_day': self.median_discount_by_day(columns),
+            'price_by_cta': self.price_distribution_by_cta(columns),
+            'retailers': {RETAILER_CODES[code]: int(retailers[code]) for code in np.flatnonzero(retailers)},
+        }
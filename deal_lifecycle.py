@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Expiração/arquivamento em lote de ofertas antigas no Shopify
+
+Uso:
+    python3 deal_lifecycle.py --older-than 14 --action archive
+    python3 deal_lifecycle.py --category "Electronics" --action delete --dry-run
+    python3 deal_lifecycle.py --missing-from-log 7 --action archive
+
+A seleção é feita no espelho local do catálogo (sem chamadas ao Shopify).
+As alterações são enviadas em lotes de mutations GraphQL (várias por
+requisição, com aliases), com concorrência limitada.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List
+
+import numpy as np
+import shopify
+
+from config import Config
+from log_snapshot import LogSnapshot, SnapshotWriter
+from product_identity import normalize_link, normalize_title
+from shopify_catalog import CatalogMirror
+
+logger = logging.getLogger(__name__)
+
+# Cada mutation custa ~10 pontos; 25 por requisição fica bem abaixo do limite de 1000
+DEFAULT_BATCH_SIZE = 25
+MAX_THROTTLE_RETRIES = 5
+
+MUTATIONS = {
+    'archive': 'p{n}: productUpdate(input: {{id: "gid://shopify/Product/{id}", status: ARCHIVED}}) '
+               '{{ product {{ id }} userErrors {{ message }} }}',
+    'delete': 'p{n}: productDelete(input: {{id: "gid://shopify/Product/{id}"}}) '
+              '{{ deletedProductId userErrors {{ message }} }}',
+}
+
+
+def _parse_date(value: str):
+    """Converte data ISO do Shopify/log em datetime com fuso"""
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def recent_log_keys(days: int, snapshot_path: str = None) -> set:
+    """Links e títulos normalizados postados nos últimos N dias (via snapshot colunar do log)"""
+    SnapshotWriter(snapshot_path).sync()
+    snapshot = LogSnapshot(snapshot_path)
+    cutoff = ((datetime.now() - timedelta(days=days)).date() - date(1970, 1, 1)).days
+    # Só as linhas da janela têm as strings decodificadas
+    recent = np.flatnonzero(snapshot.column('day') >= cutoff)
+    keys = {normalize_link(link) for link in snapshot.strings('affiliate_link', recent)}
+    keys.update(normalize_title(title) for title in snapshot.strings('title', recent))
+    keys.discard('')
+    return keys
+
+
+def select_products(catalog: CatalogMirror, older_than: int = None, category: str = None,
+                    missing_from_log: int = None) -> List[Dict]:
+    """Seleciona produtos ativos do espelho pelos critérios informados (combinados com E)"""
+    now = datetime.now(timezone.utc)
+    log_keys = recent_log_keys(missing_from_log) if missing_from_log else None
+    selected = []
+
+    for record in list(catalog.products.values()):
+        if record.get('status') == 'archived':
+            continue
+        if older_than is not None:
+            created = _parse_date(record.get('created_at') or record.get('updated_at'))
+            if not created or now - created < timedelta(days=older_than):
+                continue
+        if category and (record.get('product_type') or '').lower() != category.lower():
+            continue
+        if log_keys is not None:
+            if (normalize_link(record.get('affiliate_link', '')) in log_keys or
+                    normalize_title(record.get('title', '')) in log_keys):
+                continue
+        selected.append(record)
+    return selected
+
+
+def run_batch(action: str, product_ids: List) -> Dict:
+    """Envia um lote de mutations GraphQL (bloqueante). Retorna {'ok': [...], 'failed': [...]}"""
+    body = ' '.join(MUTATIONS[action].format(n=n, id=pid) for n, pid in enumerate(product_ids))
+    query = f"mutation {{ {body} }}"
+
+    for attempt in range(MAX_THROTTLE_RETRIES):
+        response = json.loads(shopify.GraphQL().execute(query))
+        errors = response.get('errors') or []
+        throttled = any(e.get('extensions', {}).get('code') == 'THROTTLED' for e in errors)
+        if not throttled:
+            break
+        # Esperar o bucket de custo se recuperar antes de tentar de novo
+        time.sleep(2 ** attempt)
+
+    data = response.get('data') or {}
+    result = {'ok': [], 'failed': []}
+    for n, pid in enumerate(product_ids):
+        item = data.get(f"p{n}")
+        if item and not item.get('userErrors'):
+            result['ok'].append(pid)
+        else:
+            messages = item.get('userErrors') if item else errors
+            logger.error(f"Falha ao processar produto {pid}: {messages}")
+            result['failed'].append(pid)
+    return result
+
+
+async def apply_action(catalog: CatalogMirror, action: str, records: List[Dict],
+                       batch_size: int = DEFAULT_BATCH_SIZE, concurrency: int = None) -> Dict:
+    """Arquiva/exclui produtos em lotes com concorrência limitada, reportando progresso"""
+    ids = [record['id'] for record in records]
+    batches = [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+    semaphore = asyncio.Semaphore(concurrency or Config.SHOPIFY_MAX_CONCURRENCY)
+    totals = {'ok': [], 'failed': []}
+    start = time.perf_counter()
+
+    async def process(batch):
+        async with semaphore:
+            try:
+                result = await asyncio.to_thread(run_batch, action, batch)
+            except Exception as e:
+                logger.error(f"Erro no lote de {len(batch)} produtos: {e}")
+                result = {'ok': [], 'failed': list(batch)}
+
+        for pid in result['ok']:
+            if action == 'delete':
+                catalog.remove(pid)
+            else:
+                catalog.set_status(pid, 'archived')
+        totals['ok'].extend(result['ok'])
+        totals['failed'].extend(result['failed'])
+
+        done = len(totals['ok']) + len(totals['failed'])
+        elapsed = time.perf_counter() - start
+        print(f"⏳ {done}/{len(ids)} processados | {done / elapsed:.1f} produtos/s")
+
+    await asyncio.gather(*(process(batch) for batch in batches))
+    await asyncio.to_thread(catalog.save)
+
+    elapsed = time.perf_counter() - start
+    totals['elapsed'] = elapsed
+    totals['throughput'] = len(ids) / elapsed if elapsed else 0.0
+    return totals
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Arquivamento/exclusão em lote de ofertas antigas')
+    parser.add_argument('--older-than', type=int, help='Produtos criados há mais de N dias')
+    parser.add_argument('--category', help='Produtos de uma categoria (product_type)')
+    parser.add_argument('--missing-from-log', type=int, help='Produtos não postados nos últimos N dias')
+    parser.add_argument('--action', choices=sorted(MUTATIONS), default='archive')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--concurrency', type=int, default=None)
+    parser.add_argument('--no-sync', action='store_true', help='Não sincronizar o catálogo antes')
+    parser.add_argument('--dry-run', action='store_true', help='Apenas listar os produtos selecionados')
+    args = parser.parse_args()
+
+    if args.older_than is None and not args.category and args.missing_from_log is None:
+        parser.error('informe pelo menos um critério: --older-than, --category ou --missing-from-log')
+
+    logging.basicConfig(format='%(asctime)s - %(name)s - %(levelname)s - %(message)s', level=logging.INFO)
+
+    shopify.ShopifyResource.set_site(f"https://{Config.SHOPIFY_SHOP_URL}/admin/api/2023-10/")
+    shopify.ShopifyResource.set_headers({"X-Shopify-Access-Token": Config.SHOPIFY_ACCESS_TOKEN})
+
+    catalog = CatalogMirror()
+    if not args.no_sync:
+        await asyncio.to_thread(catalog.sync)
+
+    records = select_products(catalog, args.older_than, args.category, args.missing_from_log)
+    print(f"📋 {len(records)} produtos selecionados para '{args.action}'")
+    if args.dry_run or not records:
+        for record in records[:20]:
+            print(f"  • {record['id']} | {(record.get('created_at') or '')[:10]} | {record.get('title', '')[:60]}")
+        return
+
+    totals = await apply_action(catalog, args.action, records, args.batch_size, args.concurrency)
+    print(f"✅ {len(totals['ok'])} ok | ❌ {len(totals['failed'])} falhas | "
+          f"{totals['elapsed']:.1f}s ({totals['throughput']:.1f} produtos/s)")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,34 @@
+"""
+Cliente HTTP assíncrono compartilhado (aiohttp)
+"""
+
+import asyncio
+import weakref
+
+import aiohttp
+
+from config import Config
+
+# Uma sessão por event loop (scripts e benchmarks podem rodar vários loops)
+_sessions = weakref.WeakKeyDictionary()
+
+
+def get_session() -> aiohttp.ClientSession:
+    """Retorna a sessão compartilhada do loop atual (cria na primeira chamada)"""
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(
+            headers={'User-Agent': Config.USER_AGENT},
+            timeout=aiohttp.ClientTimeout(total=Config.REQUEST_TIMEOUT),
+            connector=aiohttp.TCPConnector(limit=Config.HTTP_MAX_CONNECTIONS, ttl_dns_cache=300),
+        )
+        _sessions[loop] = session
+    return session
+
+
+async def close_session():
+    """Fecha a sessão do loop atual (chamar no desligamento)"""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session and not session.closed:
+        await session.close()
@@ -0,0 +1,144 @@
+"""
+Pré-validação concorrente de imagens antes do envio ao Shopify
+"""
+
+import asyncio
+import logging
+import re
+import time
+from collections import OrderedDict
+from typing import List, Optional
+
+import aiohttp
+
+from config import Config
+from extractors import SiteSpecificExtractor
+from http_client import get_session
+
+logger = logging.getLogger(__name__)
+
+# Imagens menores que isso costumam ser placeholders/miniaturas
+MIN_IMAGE_BYTES = 2048
+CACHE_MAX_ENTRIES = 4096
+
+AMAZON_IMAGE_HOSTS = ('media-amazon.com', 'images-amazon.com', 'ssl-images-amazon.com')
+# .../images/I/71N+9Sb8eyL._AC_SX300_SY300_QL70_.jpg -> base + extensão
+AMAZON_SIZE_TOKEN = re.compile(r'^(?P<base>.+/images/I/[^./]+)(?:\.[^/]*?)?\.(?P<ext>jpe?g|png|webp|gif)$', re.IGNORECASE)
+
+
+def to_hires(url: str) -> str:
+    """Troca o token de tamanho da Amazon pela versão em alta resolução"""
+    if not any(host in url for host in AMAZON_IMAGE_HOSTS):
+        return url
+    match = AMAZON_SIZE_TOKEN.match(url.split('?')[0])
+    if not match:
+        return url
+    return f"{match.group('base')}._AC_SL1500_.{match.group('ext')}"
+
+
+class ImagePreflight:
+    """Valida URLs de imagem em paralelo (HEAD/GET parcial), com cache e orçamento de tempo"""
+
+    def __init__(self, budget: float = None, concurrency: int = None, cache_ttl: int = None):
+        self.enabled = Config.IMAGE_PREFLIGHT_ENABLED
+        # 0 é um valor válido (sem espera / sem cache): só None usa o padrão
+        self.budget = Config.IMAGE_PREFLIGHT_BUDGET if budget is None else budget
+        self.concurrency = concurrency or Config.IMAGE_PREFLIGHT_CONCURRENCY
+        self.cache_ttl = Config.IMAGE_PREFLIGHT_CACHE_TTL if cache_ttl is None else cache_ttl
+        self._cache = OrderedDict()
+        self._heuristics = SiteSpecificExtractor()._is_valid_image_url
+
+    def _cached(self, url: str) -> Optional[bool]:
+        entry = self._cache.get(url)
+        if entry is None:
+            return None
+        ok, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._cache[url]
+            return None
+        self._cache.move_to_end(url)
+        return ok
+
+    def _store(self, url: str, ok: bool):
+        self._cache[url] = (ok, time.monotonic() + self.cache_ttl)
+        self._cache.move_to_end(url)
+        while len(self._cache) > CACHE_MAX_ENTRIES:
+            self._cache.popitem(last=False)
+
+    async def check(self, url: str) -> bool:
+        """Verifica se a URL responde com uma imagem de tamanho razoável"""
+        cached = self._cached(url)
+        if cached is not None:
+            return cached
+
+        session = get_session()
+        ok = False
+        try:
+            async with session.head(url, allow_redirects=True) as response:
+                status = response.status
+                content_type = response.headers.get('Content-Type', '')
+                size = response.headers.get('Content-Length')
+
+            if status in (403, 405) or (status == 200 and size is None):
+                # Alguns CDNs não aceitam HEAD: pedir só o primeiro KB
+                async with session.get(url, headers={'Range': 'bytes=0-1023'}, allow_redirects=True) as response:
+                    status = response.status
+                    content_type = response.headers.get('Content-Type', '')
+                    content_range = response.headers.get('Content-Range', '')
+                    size = content_range.rsplit('/', 1)[-1] if '/' in content_range else response.headers.get('Content-Length')
+
+            ok = (status in (200, 206) and content_type.startswith('image/') and
+                  (size is None or not size.isdigit() or int(size) >= MIN_IMAGE_BYTES))
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            logger.info(f"Imagem inacessível {url[:80]}: {e}")
+
+        self._store(url, ok)
+        return ok
+
+    async def _resolve(self, url: str, semaphore: asyncio.Semaphore) -> Optional[str]:
+        """Retorna a melhor URL válida (alta resolução, senão a original) ou None"""
+        hires = to_hires(url)
+        async with semaphore:
+            if await self.check(hires):
+                return hires
+            if hires != url and await self.check(url):
+                return url
+        return None
+
+    async def run(self, urls: List[str]) -> List[str]:
+        """Filtra e normaliza a lista de imagens dentro do orçamento de tempo
+
+        Imagens cuja verificação não terminar a tempo são mantidas com a URL
+        original (não há prova de que estejam quebradas, nem de que a versão
+        em alta resolução exista); as que falharem são descartadas.
+        """
+        candidates = []
+        for url in urls:
+            url = (url or '').strip()
+            if url.startswith('//'):
+                url = f"https:{url}"
+            if url.startswith('http') and self._heuristics(url) and url not in candidates:
+                candidates.append(url)
+
+        if not self.enabled or not candidates:
+            return candidates
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = [asyncio.ensure_future(self._resolve(url, semaphore)) for url in candidates]
+        done, pending = await asyncio.wait(tasks, timeout=self.budget)
+        for task in pending:
+            task.cancel()
+
+        result = []
+        for url, task in zip(candidates, tasks):
+            if task in pending:
+                result.append(url)
+            elif task.exception() is None and task.result():
+                result.append(task.result())
+            else:
+                logger.warning(f"Imagem descartada na pré-validação: {url[:80]}")
+
+        logger.info(f"Pré-validação de imagens: {len(result)}/{len(urls)} aprovadas "
+                    f"({len(pending)} sem resposta dentro de {self.budget}s)")
+        # Duas variações da mesma imagem podem convergir para a mesma URL
+        return list(OrderedDict.fromkeys(result))
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Snapshot colunar binário do log de produtos, lido via mmap
+
+Formato (little-endian):
+    cabeçalho de 128 bytes: magic, versão, hash das tabelas de códigos, linhas,
+    capacidade, bytes usados/capacidade do heap, checkpoint (seq, offset) do log
+    colunas de largura fixa, cada uma com `capacidade` posições (alinhadas em 8)
+    heap de strings (UTF-8); cada coluna de texto é um par <nome>_offset/<nome>_length
+
+O conversor acrescenta as linhas novas no lugar e só atualiza o cabeçalho no
+fim, então leitores nunca veem linhas pela metade. Quando a capacidade acaba,
+o arquivo é regravado com o dobro e substituído de forma atômica.
+
+Uso:
+    python3 log_snapshot.py            # sincroniza com o log e mostra o resumo
+    python3 log_snapshot.py --rebuild  # regrava a partir do zero
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from datetime import date, datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import Config
+from product_identity import CTA_LABELS, RETAILERS, cta_code, retailer_of
+from products_log import LogSegments
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'PLSNAP01'
+VERSION = 1
+# magic, versão, hash dos códigos, linhas, capacidade, heap usado, capacidade do heap, seq, offset
+HEADER = struct.Struct('<8sIIqqqqqq')
+HEADER_SIZE = 128
+INITIAL_CAPACITY = 4096
+INITIAL_HEAP = 1 << 20
+
+# Tabelas de códigos das colunas categóricas (índice = código gravado)
+CTA_CODES = ['none', 'other'] + list(CTA_LABELS)
+RETAILER_CODES = [retailer for retailer, _ in RETAILERS] + ['other']
+CODES_HASH = zlib.crc32(json.dumps([CTA_CODES, RETAILER_CODES]).encode('utf-8'))
+
+NUMERIC_COLUMNS = [
+    ('timestamp', '<f8'),
+    ('day', '<i4'),  # dias desde 1970-01-01 (campo `date` do log)
+    ('price_current', '<f8'),
+    ('price_original', '<f8'),
+    ('discount_percent', '<f4'),
+    ('cta', 'u1'),
+    ('retailer', 'u1'),
+]
+STRING_COLUMNS = ['title', 'affiliate_link', 'image']
+COLUMNS = NUMERIC_COLUMNS + [column for name in STRING_COLUMNS
+                             for column in ((f'{name}_offset', '<u8'), (f'{name}_length', '<u4'))]
+
+
+def _layout(capacity: int):
+    """Posição de cada coluna e início do heap para uma capacidade"""
+    offsets, position = {}, HEADER_SIZE
+    for name, dtype in COLUMNS:
+        offsets[name] = position
+        position += -(-capacity * np.dtype(dtype).itemsize // 8) * 8
+    return offsets, position
+
+
+def _parse(record: Dict):
+    """Valores numéricos e strings (bytes) de uma linha do log"""
+    try:
+        timestamp = datetime.fromisoformat(record['timestamp']).timestamp()
+    except (KeyError, TypeError, ValueError):
+        timestamp = 0.0
+    try:
+        day = (date.fromisoformat(record['date']) - date(1970, 1, 1)).days
+    except (KeyError, TypeError, ValueError):
+        day = int(timestamp // 86400)
+    current = float(record.get('price_current') or 0)
+    numeric = (timestamp, day, current, float(record.get('price_original') or current),
+               float(record.get('discount_percent') or 0),
+               CTA_CODES.index(cta_code(record.get('cta'))),
+               RETAILER_CODES.index(retailer_of(record.get('affiliate_link'))))
+    strings = [str(record.get(name) or '').encode('utf-8') for name in STRING_COLUMNS]
+    return numeric, strings
+
+
+class _Mapped:
+    """Cabeçalho + acesso às colunas de um mmap"""
+
+    def _read_header(self, mm) -> Optional[Dict]:
+        if len(mm) < HEADER_SIZE:
+            return None
+        magic, version, codes_hash, rows, capacity, heap_used, heap_capacity, seq, offset = HEADER.unpack_from(mm, 0)
+        if magic != MAGIC or version != VERSION:
+            return None
+        offsets, heap_start = _layout(capacity)
+        return {'codes_hash': codes_hash, 'rows': rows, 'capacity': capacity, 'heap_used': heap_used,
+                'heap_capacity': heap_capacity, 'seq': seq, 'offset': offset,
+                'offsets': offsets, 'heap_start': heap_start}
+
+    @staticmethod
+    def _column(mm, header: Dict, name: str, count: int = None) -> np.ndarray:
+        dtype = dict(COLUMNS)[name]
+        count = header['rows'] if count is None else count
+        return np.frombuffer(mm, dtype=dtype, count=count, offset=header['offsets'][name])
+
+
+class LogSnapshot(_Mapped):
+    """Leitor somente leitura; `reload` enxerga linhas novas (e arquivo regravado)"""
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.PRODUCTS_SNAPSHOT_PATH
+        self._mm = None
+        self._identity = None
+        self.header = None
+        self.reload()
+
+    @property
+    def rows(self) -> int:
+        return self.header['rows'] if self.header else 0
+
+    def reload(self) -> int:
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._mm, self.header = None, None
+            return 0
+        identity = (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+        if self._mm is None or identity[:2] != self._identity[:2]:
+            with open(self.path, 'rb') as f:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._identity = identity
+        self.header = self._read_header(self._mm)
+        if self.header and self.header['codes_hash'] != CODES_HASH:
+            self.header = None
+        return self.rows
+
+    def column(self, name: str) -> np.ndarray:
+        """Coluna de largura fixa sem cópia (válida até o próximo reload)"""
+        if not self.header:
+            return np.empty(0, dtype=dict(COLUMNS)[name])
+        return self._column(self._mm, self.header, name)
+
+    def string(self, name: str, index: int) -> str:
+        start = int(self.column(f'{name}_offset')[index])
+        length = int(self.column(f'{name}_length')[index])
+        position = self.header['heap_start'] + start
+        return self._mm[position:position + length].decode('utf-8')
+
+    def strings(self, name: str, indices=None) -> List[str]:
+        if not self.header:
+            return []
+        offsets, lengths = self.column(f'{name}_offset'), self.column(f'{name}_length')
+        heap_start = self.header['heap_start']
+        indices = range(self.rows) if indices is None else indices
+        return [self._mm[heap_start + int(offsets[i]):heap_start + int(offsets[i]) + int(lengths[i])].decode('utf-8')
+                for i in indices]
+
+
+class SnapshotWriter(_Mapped):
+    """Mantém o snapshot em dia com o log (só linhas novas)"""
+
+    def __init__(self, path: str = None, segments: LogSegments = None):
+        self.path = path or Config.PRODUCTS_SNAPSHOT_PATH
+        self.segments = segments or LogSegments()
+        self._lock = threading.Lock()
+        self._mm = None
+        self.header = None
+
+    def _open(self):
+        try:
+            with open(self.path, 'r+b') as f:
+                self._mm = mmap.mmap(f.fileno(), 0)
+        except FileNotFoundError:
+            self._mm, self.header = None, None
+            return
+        self.header = self._read_header(self._mm)
+        if self.header and self.header['codes_hash'] != CODES_HASH:
+            logger.info("Códigos do snapshot do log mudaram, reconstruindo")
+            self.header = None
+
+    def _write_header(self, mm, header: Dict):
+        HEADER.pack_into(mm, 0, MAGIC, VERSION, CODES_HASH, header['rows'], header['capacity'],
+                         header['heap_used'], header['heap_capacity'], header['seq'], header['offset'])
+
+    def _grow(self, rows: int, heap_bytes: int):
+        """Regrava o arquivo com capacidade para `rows` linhas e `heap_bytes` de texto"""
+        old, old_mm = self.header, self._mm
+        capacity, heap_capacity = INITIAL_CAPACITY, INITIAL_HEAP
+        while capacity < rows:
+            capacity *= 2
+        while heap_capacity < heap_bytes:
+            heap_capacity *= 2
+        offsets, heap_start = _layout(capacity)
+        header = {'rows': 0, 'capacity': capacity, 'heap_used': 0, 'heap_capacity': heap_capacity,
+                  'seq': 0, 'offset': 0, 'offsets': offsets, 'heap_start': heap_start}
+        if old:
+            header.update(rows=old['rows'], heap_used=old['heap_used'], seq=old['seq'], offset=old['offset'])
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w+b') as f:
+            f.truncate(heap_start + heap_capacity)
+            mm = mmap.mmap(f.fileno(), 0)
+            if old:
+                for name, _ in COLUMNS:
+                    self._column(mm, header, name, old['rows'])[:] = self._column(old_mm, old, name)
+                mm[heap_start:heap_start + old['heap_used']] = \
+                    old_mm[old['heap_start']:old['heap_start'] + old['heap_used']]
+            self._write_header(mm, header)
+            mm.flush()
+            mm.close()
+        os.replace(tmp_path, self.path)
+        self._open()
+
+    def sync(self) -> int:
+        """Acrescenta as linhas novas do log; retorna quantas entraram"""
+        with self._lock:
+            if self._mm is None:
+                self._open()
+            if self.header and self.segments.checkpoint_ahead(self.header['seq'], self.header['offset']):
+                logger.warning("Checkpoint do snapshot à frente do log, reconstruindo")
+                self.header = None
+            start = (self.header['seq'], self.header['offset']) if self.header else (0, 0)
+
+            rows, seq, offset = [], *start
+            for seq, offset, line in self.segments.iter_lines(*start):
+                try:
+                    rows.append(_parse(json.loads(line)))
+                except ValueError:
+                    continue
+            if self.header and (seq, offset) == start:
+                return 0
+
+            heap_needed = sum(len(value) for _, strings in rows for value in strings)
+            current_rows = self.header['rows'] if self.header else 0
+            current_heap = self.header['heap_used'] if self.header else 0
+            if (not self.header or current_rows + len(rows) > self.header['capacity'] or
+                    current_heap + heap_needed > self.header['heap_capacity']):
+                self._grow(current_rows + len(rows), current_heap + heap_needed)
+
+            header, mm = self.header, self._mm
+            end = header['rows'] + len(rows)
+            if rows:
+                numeric = list(zip(*(values for values, _ in rows)))
+                for index, (name, _) in enumerate(NUMERIC_COLUMNS):
+                    self._column(mm, header, name, end)[header['rows']:] = numeric[index]
+                position = header['heap_used']
+                for column_index, name in enumerate(STRING_COLUMNS):
+                    offsets = self._column(mm, header, f'{name}_offset', end)
+                    lengths = self._column(mm, header, f'{name}_length', end)
+                    for row_index, (_, strings) in enumerate(rows, start=header['rows']):
+                        value = strings[column_index]
+                        start_at = header['heap_start'] + position
+                        mm[start_at:start_at + len(value)] = value
+                        offsets[row_index], lengths[row_index] = position, len(value)
+                        position += len(value)
+                header['heap_used'] = position
+            mm.flush()
+            # Cabeçalho por último: as linhas só "existem" depois que estão gravadas
+            header.update(rows=end, seq=seq, offset=offset)
+            self._write_header(mm, header)
+            mm.flush()
+            return len(rows)
+
+    def rebuild(self) -> int:
+        with self._lock:
+            self.header = None
+            if os.path.exists(self.path):
+                os.remove(self.path)
+            self._mm = None
+        return self.sync()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sincroniza o snapshot colunar do log de produtos")
+    parser.add_argument('--rebuild', action='store_true', help="regrava o snapshot do zero")
+    args = parser.parse_args()
+
+    writer = SnapshotWriter()
+    started = time.perf_counter()
+    count = writer.rebuild() if args.rebuild else writer.sync()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    started = time.perf_counter()
+    snapshot = LogSnapshot()
+    open_ms = (time.perf_counter() - started) * 1000
+    size_kb = os.path.getsize(snapshot.path) / 1024
+    print(f"{count} linhas novas em {elapsed_ms:.1f}ms | {snapshot.rows} linhas no snapshot "
+          f"({size_kb:.0f} KB) | abertura em {open_ms:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Detecção de produtos quase duplicados (MinHash + LSH sobre os títulos)
+
+Mantém em memória as assinaturas dos produtos postados nos últimos
+NEAR_DUP_WINDOW_DAYS dias, alimentadas pelo log de produtos. O índice é
+salvo em NEAR_DUP_SNAPSHOT_PATH (.npz) para a próxima inicialização só ler
+as linhas novas do log.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+
+from config import Config
+from product_identity import normalize_title
+from products_log import LogSegments
+
+logger = logging.getLogger(__name__)
+
+NUM_PERM = 64
+# 32 bandas de 2 linhas: pares com Jaccard >= 0.3 viram candidatos com ~95% de chance
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SNAPSHOT_INTERVAL = 300
+# Palavras que não ajudam a distinguir produtos
+STOPWORDS = {'a', 'and', 'for', 'in', 'new', 'of', 'on', 'pack', 'set', 'the', 'to', 'with', 'x'}
+
+_MERSENNE = (1 << 31) - 1
+# Semente fixa: as permutações precisam ser as mesmas entre execuções (snapshot)
+_rng = np.random.default_rng(20251210)
+_A = _rng.integers(1, _MERSENNE, NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, _MERSENNE, NUM_PERM, dtype=np.uint64)
+
+
+def title_shingles(title: str) -> set:
+    return {word for word in normalize_title(title).split() if word not in STOPWORDS}
+
+
+def minhash(title: str) -> np.ndarray:
+    """Assinatura MinHash (NUM_PERM valores) das palavras do título"""
+    shingles = title_shingles(title)
+    if not shingles:
+        return np.full(NUM_PERM, _MERSENNE, dtype=np.uint32)
+    hashes = np.fromiter((zlib.crc32(word.encode('utf-8')) for word in shingles),
+                         dtype=np.uint64, count=len(shingles))
+    return ((np.outer(_A, hashes) + _B[:, None]) % _MERSENNE).min(axis=1).astype(np.uint32)
+
+
+def _band_keys(signature: np.ndarray) -> List[bytes]:
+    return [bytes([band]) + signature[band * ROWS:(band + 1) * ROWS].tobytes() for band in range(BANDS)]
+
+
+class NearDuplicateIndex:
+    """Assinaturas da janela + tabelas LSH por banda"""
+
+    def __init__(self, path: str = None, segments: LogSegments = None, window_days: float = None,
+                 threshold: float = None):
+        self.path = path or Config.NEAR_DUP_SNAPSHOT_PATH
+        self.segments = segments or LogSegments()
+        self.window = (window_days or Config.NEAR_DUP_WINDOW_DAYS) * 86400
+        self.threshold = threshold or Config.NEAR_DUP_THRESHOLD
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._reset()
+        self._saved_at = 0.0
+        self._load()
+
+    def _reset(self):
+        self.entries: List[Dict] = []
+        self.signatures: List[np.ndarray] = []
+        self.buckets = defaultdict(list)
+        self.checkpoint = (0, 0)
+
+    def _insert(self, entry: Dict, signature: np.ndarray):
+        index = len(self.entries)
+        self.entries.append(entry)
+        self.signatures.append(signature)
+        for key in _band_keys(signature):
+            self.buckets[key].append(index)
+
+    def _prune(self):
+        """Descarta o que saiu da janela e refaz as tabelas"""
+        cutoff = time.time() - self.window
+        kept = [(entry, signature) for entry, signature in zip(self.entries, self.signatures)
+                if entry['timestamp'] >= cutoff]
+        checkpoint = self.checkpoint
+        self._reset()
+        self.checkpoint = checkpoint
+        for entry, signature in kept:
+            self._insert(entry, signature)
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as snapshot:
+                # Janela maior que a do snapshot: faltam entradas antigas, reconstruir do log
+                if float(snapshot['window']) < self.window:
+                    return
+                for timestamp, title, date, link, signature in zip(
+                        snapshot['timestamps'], snapshot['titles'], snapshot['dates'],
+                        snapshot['links'], snapshot['signatures']):
+                    self._insert({'timestamp': float(timestamp), 'title': str(title), 'date': str(date),
+                                  'link': str(link)}, signature)
+                self.checkpoint = tuple(int(value) for value in snapshot['checkpoint'])
+            self._prune()
+        except Exception as e:
+            logger.warning(f"Snapshot de duplicados inválido ({e}), reconstruindo")
+            self._reset()
+
+    def save(self):
+        # Copia sob o lock e grava fora dele: similar() não espera o disco
+        with self._lock:
+            self._prune()
+            checkpoint = self.checkpoint
+            entries = list(self.entries)
+            signatures = list(self.signatures)
+        with self._save_lock:
+            tmp_path = self.path + '.tmp.npz'
+            np.savez(tmp_path, checkpoint=np.array(checkpoint, dtype=np.int64), window=self.window,
+                     timestamps=np.array([entry['timestamp'] for entry in entries], dtype=np.float64),
+                     titles=np.array([entry['title'] for entry in entries], dtype=str),
+                     dates=np.array([entry['date'] for entry in entries], dtype=str),
+                     links=np.array([entry['link'] for entry in entries], dtype=str),
+                     signatures=np.array(signatures, dtype=np.uint32).reshape(-1, NUM_PERM))
+            os.replace(tmp_path, self.path)
+            self._saved_at = time.time()
+
+    def refresh(self) -> int:
+        """Adiciona as postagens novas do log (só as que ainda estão na janela)"""
+        cutoff = time.time() - self.window
+        start = self.checkpoint
+        reset = self.segments.checkpoint_ahead(*start)
+        checkpoint = (0, 0) if reset else start
+        # Lê o log e calcula as assinaturas fora do lock; só a troca final é protegida
+        new = []
+        for seq, offset, line in self.segments.iter_lines(*checkpoint):
+            checkpoint = (seq, offset)
+            try:
+                record = json.loads(line)
+                timestamp = datetime.fromisoformat(record['timestamp']).timestamp()
+            except (KeyError, TypeError, ValueError):
+                continue
+            if timestamp < cutoff or not record.get('title'):
+                continue
+            new.append(({'timestamp': timestamp, 'title': record['title'], 'date': record.get('date', ''),
+                         'link': record.get('affiliate_link', '')}, minhash(record['title'])))
+        with self._lock:
+            if reset:
+                self._reset()
+            for entry, signature in new:
+                self._insert(entry, signature)
+            self.checkpoint = checkpoint
+        if checkpoint != start and time.time() - self._saved_at >= SNAPSHOT_INTERVAL:
+            self.save()
+        return len(new)
+
+    def similar(self, title: str, limit: int = 3) -> List[Dict]:
+        """Postagens da janela com título parecido: [{'title', 'date', 'link', 'similarity'}]"""
+        signature = minhash(title)
+        cutoff = time.time() - self.window
+        with self._lock:
+            candidates = {index for key in _band_keys(signature) for index in self.buckets.get(key, ())}
+            candidates = [index for index in candidates if self.entries[index]['timestamp'] >= cutoff]
+            if not candidates:
+                return []
+            scores = (np.array([self.signatures[index] for index in candidates]) == signature).mean(axis=1)
+            matches = sorted(((float(score), index) for score, index in zip(scores, candidates)
+                              if score >= self.threshold), reverse=True)[:limit]
+            return [dict(self.entries[index], similarity=score) for score, index in matches]
+
+    def stats(self) -> Dict:
+        return {'entries': len(self.entries), 'buckets': len(self.buckets)}
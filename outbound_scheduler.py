@@ -0,0 +1,277 @@
+"""
+Agendador de envios ao Telegram com prioridades e limites de taxa
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+from collections import deque
+from typing import Any, Callable, Coroutine, Dict, Optional, Union
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+# Prioridades (menor = sai primeiro)
+PRIORITY_INTERACTIVE = 0   # respostas a botões
+PRIORITY_OPERATOR = 1      # mensagens/edições na conversa com o operador
+PRIORITY_CHANNEL = 2       # postagens em canais e grupos
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: 'callbacks', PRIORITY_OPERATOR: 'operador', PRIORITY_CHANNEL: 'canal'}
+
+# Endpoints que não passam pela fila (não enviam nada para chats)
+PASSTHROUGH_PREFIXES = ('get', 'set', 'deleteWebhook', 'close', 'logOut')
+
+LATENCY_SAMPLES = 500
+
+
+class TokenBucket:
+    """Balde de fichas: `rate` fichas por segundo, até `capacity` acumuladas"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Segundos até haver uma ficha disponível"""
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+
+class _Job:
+    __slots__ = ('priority', 'chat_key', 'callback', 'args', 'kwargs', 'future', 'enqueued_at', 'attempts',
+                 'endpoint', 'data')
+
+    def __init__(self, priority, chat_key, callback, args, kwargs, future, endpoint, data):
+        self.endpoint = endpoint
+        self.data = data
+        self.priority = priority
+        self.chat_key = chat_key
+        self.callback = callback
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class OutboundScheduler(BaseRateLimiter):
+    """Fila de saída com prioridade, limites global/por chat e tratamento de RetryAfter
+
+    Usado como rate_limiter da Application: todo envio do bot (send_photo,
+    send_message, edit_message_text, respostas de callback...) passa por aqui.
+    Edições na conversa com o operador saem antes das postagens em canal.
+    Um RetryAfter pausa só o chat que o recebeu; os demais seguem saindo.
+
+    `rate_limit_args` aceita a prioridade (int) ou um dict com 'priority' e/ou
+    'chat_id'. Respostas de callback não trazem chat_id: sem ele no dict, cada
+    resposta tem chave própria (nunca pausam todas juntas).
+    """
+
+    def __init__(self, global_rate: float = None, chat_rate: float = None,
+                 group_rate_per_minute: float = None, max_retries: int = None):
+        self.global_bucket = TokenBucket(global_rate or Config.OUTBOUND_GLOBAL_RATE,
+                                         global_rate or Config.OUTBOUND_GLOBAL_RATE)
+        self.chat_rate = chat_rate or Config.OUTBOUND_CHAT_RATE
+        self.group_rate = (group_rate_per_minute or Config.OUTBOUND_GROUP_RATE_PER_MINUTE) / 60
+        self.max_retries = max_retries if max_retries is not None else Config.OUTBOUND_MAX_RETRIES
+        self._chat_buckets = {}
+        self._queues = {priority: deque() for priority in PRIORITY_NAMES}
+        self._wakeup = None
+        self._dispatcher = None
+        # Envios em andamento (referência forte: o loop só guarda referência fraca às tasks)
+        self._tasks = set()
+        # Chave do chat (None = envios sem chat) -> instante em que volta a enviar
+        self._paused_until: Dict[Optional[str], float] = {}
+        self._latencies = {priority: deque(maxlen=LATENCY_SAMPLES) for priority in PRIORITY_NAMES}
+        self._sent = dict.fromkeys(PRIORITY_NAMES, 0)
+        self._retry_after_hits = 0
+        # Chamados com (endpoint, data) após cada envio bem-sucedido
+        self.observers = []
+
+    async def initialize(self) -> None:
+        """Inicia o despachante (chamado pela Application)"""
+        if self._dispatcher is None:
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+
+    async def shutdown(self) -> None:
+        """Para o despachante"""
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._dispatcher
+            self._dispatcher = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    # Classificação ---------------------------------------------------------
+
+    @staticmethod
+    def _is_group(chat_id) -> bool:
+        """Canais/grupos: id negativo ou @username"""
+        if isinstance(chat_id, str):
+            with contextlib.suppress(ValueError):
+                return int(chat_id) < 0
+            return True
+        return isinstance(chat_id, int) and chat_id < 0
+
+    def _classify(self, endpoint: str, data: Dict, rate_limit_args):
+        """Retorna (prioridade, chave do chat) para a requisição"""
+        options = rate_limit_args if isinstance(rate_limit_args, dict) else {'priority': rate_limit_args}
+        chat_id = data.get('chat_id', options.get('chat_id'))
+        if options.get('priority') in PRIORITY_NAMES:
+            priority = options['priority']
+        elif endpoint == 'answerCallbackQuery':
+            priority = PRIORITY_INTERACTIVE
+        elif self._is_group(chat_id):
+            priority = PRIORITY_CHANNEL
+        else:
+            priority = PRIORITY_OPERATOR
+        if chat_id is None and endpoint == 'answerCallbackQuery':
+            return priority, f"callback:{data.get('callback_query_id')}"
+        return priority, (str(chat_id) if chat_id is not None else None)
+
+    def _bucket_key(self, job: _Job) -> Optional[str]:
+        """Chat cujo limite de taxa o envio consome (respostas de callback não contam)"""
+        return None if job.endpoint == 'answerCallbackQuery' else job.chat_key
+
+    def _bucket_for(self, chat_key: str) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_key)
+        if bucket is None:
+            if self._is_group(chat_key):
+                bucket = TokenBucket(self.group_rate, 3)
+            else:
+                bucket = TokenBucket(self.chat_rate, 5)
+            self._chat_buckets[chat_key] = bucket
+        return bucket
+
+    # Envio -----------------------------------------------------------------
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Any]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Union[int, Dict[str, Any]]],
+    ):
+        if self._dispatcher is None or endpoint.startswith(PASSTHROUGH_PREFIXES):
+            result = await callback(*args, **kwargs)
+            self._notify(endpoint, data)
+            return result
+
+        priority, chat_key = self._classify(endpoint, data, rate_limit_args)
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].append(_Job(priority, chat_key, callback, args, kwargs, future, endpoint, data))
+        self._wakeup.set()
+        return await future
+
+    def _next_ready(self):
+        """Próximo envio liberado pelos limites, ou (None, segundos de espera)"""
+        now = time.monotonic()
+        for chat_key in [key for key, until in self._paused_until.items() if until <= now]:
+            del self._paused_until[chat_key]
+        global_delay = self.global_bucket.delay(now)
+        if global_delay > 0:
+            return None, global_delay
+
+        wait = None
+        for priority in sorted(self._queues):
+            queue = self._queues[priority]
+            for job in queue:
+                if job.chat_key in self._paused_until:
+                    delay = self._paused_until[job.chat_key] - now
+                else:
+                    bucket_key = self._bucket_key(job)
+                    delay = self._bucket_for(bucket_key).delay(now) if bucket_key else 0.0
+                if delay <= 0:
+                    queue.remove(job)
+                    return job, 0.0
+                wait = delay if wait is None else min(wait, delay)
+        return None, wait
+
+    async def _dispatch_loop(self):
+        while True:
+            job, wait = self._next_ready()
+            if job is None:
+                self._wakeup.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                continue
+
+            now = time.monotonic()
+            self.global_bucket.take(now)
+            bucket_key = self._bucket_key(job)
+            if bucket_key:
+                self._bucket_for(bucket_key).take(now)
+            if job.attempts == 0:
+                self._latencies[job.priority].append(now - job.enqueued_at)
+            task = asyncio.create_task(self._execute(job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, job: _Job):
+        if job.future.done():
+            return
+        job.attempts += 1
+        try:
+            result = await job.callback(*job.args, **job.kwargs)
+        except RetryAfter as e:
+            self._retry_after_hits += 1
+            retry_after = float(e.retry_after)
+            if job.attempts > self.max_retries:
+                logger.error(f"Limite do Telegram atingido após {self.max_retries} tentativas")
+                job.future.set_exception(e)
+                return
+            # Pausar só o chat do envio pelo tempo pedido e recolocar o envio na frente
+            logger.warning(f"RetryAfter do Telegram no chat {job.chat_key}: aguardando {retry_after}s")
+            until = time.monotonic() + retry_after + 0.1
+            self._paused_until[job.chat_key] = max(self._paused_until.get(job.chat_key, 0.0), until)
+            self._queues[job.priority].appendleft(job)
+            self._wakeup.set()
+            return
+        except Exception as e:
+            if not job.future.done():
+                job.future.set_exception(e)
+            return
+        self._sent[job.priority] += 1
+        self._notify(job.endpoint, job.data)
+        if not job.future.done():
+            job.future.set_result(result)
+
+    def _notify(self, endpoint: str, data: Dict):
+        for observer in self.observers:
+            try:
+                observer(endpoint, data)
+            except Exception as e:
+                logger.error(f"Erro em observador da fila de envio: {e}")
+
+    # Métricas --------------------------------------------------------------
+
+    def metrics(self) -> Dict:
+        """Latência de fila (p50/p95 em ms), pendentes e enviados por prioridade"""
+        result = {'retry_after_hits': self._retry_after_hits, 'queues': {}}
+        for priority, name in PRIORITY_NAMES.items():
+            samples = sorted(self._latencies[priority])
+            result['queues'][name] = {
+                'pending': len(self._queues[priority]),
+                'sent': self._sent[priority],
+                'p50_ms': samples[len(samples) // 2] * 1000 if samples else 0.0,
+                'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000 if samples else 0.0,
+            }
+        return result
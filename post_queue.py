@@ -0,0 +1,232 @@
+"""
+Fila persistente de postagens agendadas no canal (horários, espaçamento e limite diário)
+"""
+
+import asyncio
+import contextlib
+import logging
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional
+from zoneinfo import ZoneInfo
+
+from config import Config
+from state_store import StateBackend
+
+logger = logging.getLogger(__name__)
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 60
+# Postagens atrasadas até este limite saem imediatamente; além disso, são reagendadas
+OVERDUE_GRACE = 120
+
+
+def _parse_hhmm(value: str):
+    hours, minutes = value.strip().split(':')
+    return int(hours), int(minutes)
+
+
+class PostingSchedule:
+    """Regras de agendamento: horários fixos (opcional), janela ativa, espaçamento e limite diário"""
+
+    def __init__(self, slots: str = None, min_spacing_minutes: float = None, daily_cap: int = None,
+                 active_hours: str = None, timezone: str = None):
+        slots = Config.POST_QUEUE_SLOTS if slots is None else slots
+        self.slots = sorted(_parse_hhmm(slot) for slot in slots.split(',') if slot.strip())
+        self.spacing = (min_spacing_minutes or Config.POST_MIN_SPACING_MINUTES) * 60
+        self.daily_cap = daily_cap or Config.POST_DAILY_CAP
+        start, end = (active_hours or Config.POST_ACTIVE_HOURS).split('-')
+        self.window = (_parse_hhmm(start), _parse_hhmm(end))
+        self.tz = ZoneInfo(timezone or Config.POST_TIMEZONE)
+
+    def _at(self, day: datetime, hour_minute) -> datetime:
+        return day.replace(hour=hour_minute[0], minute=hour_minute[1], second=0, microsecond=0)
+
+    def _align(self, moment: datetime) -> datetime:
+        """Próximo instante permitido a partir de `moment` (horário fixo ou janela ativa)"""
+        if self.slots:
+            for slot in self.slots:
+                candidate = self._at(moment, slot)
+                if candidate >= moment:
+                    return candidate
+            return self._at(moment + timedelta(days=1), self.slots[0])
+
+        start, end = self._at(moment, self.window[0]), self._at(moment, self.window[1])
+        if moment < start:
+            return start
+        if moment >= end:
+            return self._at(moment + timedelta(days=1), self.window[0])
+        return moment
+
+    def day_key(self, timestamp: float) -> str:
+        return datetime.fromtimestamp(timestamp, self.tz).strftime('%Y-%m-%d')
+
+    def next_time(self, earliest: float, booked: List[float]) -> float:
+        """Primeiro horário livre >= earliest respeitando espaçamento e limite diário"""
+        per_day = {}
+        for timestamp in booked:
+            key = self.day_key(timestamp)
+            per_day[key] = per_day.get(key, 0) + 1
+
+        moment = datetime.fromtimestamp(earliest, self.tz)
+        for _ in range(10000):
+            moment = self._align(moment)
+            candidate = moment.timestamp()
+            if per_day.get(self.day_key(candidate), 0) >= self.daily_cap:
+                # Dia cheio: começar do início do dia seguinte
+                moment = (moment + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+                continue
+            # Tolerância de 1ms evita ficar preso por arredondamento de ponto flutuante
+            conflicts = [timestamp for timestamp in booked if abs(timestamp - candidate) < self.spacing - 0.001]
+            if conflicts:
+                moment = datetime.fromtimestamp(max(conflicts) + self.spacing, self.tz)
+                continue
+            return candidate
+        raise RuntimeError("Não foi possível encontrar horário livre na agenda de postagens")
+
+
+class PostQueue:
+    """Fila de postagens gravada no SQLite; o despachante sobrevive a reinícios"""
+
+    def __init__(self, path: str = None, schedule: PostingSchedule = None):
+        self.path = path or Config.STATE_DB_PATH
+        self.schedule = schedule or PostingSchedule()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=Config.SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS post_queue ('
+            ' id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER, title TEXT, payload BLOB NOT NULL,'
+            ' status TEXT NOT NULL DEFAULT \'queued\', scheduled_at REAL NOT NULL, created_at REAL NOT NULL,'
+            ' posted_at REAL, attempts INTEGER NOT NULL DEFAULT 0, error TEXT)'
+        )
+        self._conn.execute('CREATE INDEX IF NOT EXISTS post_queue_status ON post_queue (status, scheduled_at)')
+        self._conn.commit()
+        self._wakeup = None
+
+    def _booked(self, exclude_id: int = None) -> List[float]:
+        """Horários ocupados: postagens na fila e já feitas nos últimos dias"""
+        since = time.time() - 2 * 86400
+        rows = self._conn.execute(
+            "SELECT id, scheduled_at, posted_at, status FROM post_queue "
+            "WHERE status = 'queued' OR (status = 'posted' AND posted_at >= ?)", (since,)
+        ).fetchall()
+        return [posted_at if status == 'posted' else scheduled_at
+                for item_id, scheduled_at, posted_at, status in rows if item_id != exclude_id]
+
+    def enqueue(self, product_info: Dict, shopify_result: Dict, affiliate_link: str, user_id: int = None) -> Dict:
+        """Agenda uma postagem no próximo horário livre e retorna {'id', 'scheduled_at', 'position'}"""
+        payload = StateBackend.encode({'product_info': product_info, 'shopify_result': shopify_result,
+                                       'affiliate_link': affiliate_link})
+        with self._lock:
+            now = time.time()
+            scheduled_at = self.schedule.next_time(now, self._booked())
+            with self._conn:
+                cursor = self._conn.execute(
+                    'INSERT INTO post_queue (user_id, title, payload, scheduled_at, created_at) VALUES (?, ?, ?, ?, ?)',
+                    (user_id, product_info.get('title', 'Produto')[:200], payload, scheduled_at, now)
+                )
+            position = self._conn.execute(
+                "SELECT COUNT(*) FROM post_queue WHERE status = 'queued' AND scheduled_at <= ?", (scheduled_at,)
+            ).fetchone()[0]
+        if self._wakeup:
+            self._wakeup.set()
+        return {'id': cursor.lastrowid, 'scheduled_at': scheduled_at, 'position': position}
+
+    def cancel(self, item_id: int) -> bool:
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "UPDATE post_queue SET status = 'cancelled' WHERE id = ? AND status = 'queued'", (item_id,))
+        return cursor.rowcount > 0
+
+    def queued(self, limit: int = 50) -> List[Dict]:
+        """Próximas postagens na fila (sem o conteúdo)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, title, scheduled_at FROM post_queue WHERE status = 'queued' "
+                "ORDER BY scheduled_at LIMIT ?", (limit,)
+            ).fetchall()
+        return [{'id': item_id, 'title': title, 'scheduled_at': scheduled_at} for item_id, title, scheduled_at in rows]
+
+    def stats(self) -> Dict:
+        today = self.schedule.day_key(time.time())
+        with self._lock:
+            queued = self._conn.execute("SELECT COUNT(*) FROM post_queue WHERE status = 'queued'").fetchone()[0]
+            posted = self._conn.execute(
+                "SELECT posted_at FROM post_queue WHERE status = 'posted' AND posted_at >= ?",
+                (time.time() - 86400,)
+            ).fetchall()
+        return {'queued': queued,
+                'posted_today': sum(1 for (posted_at,) in posted if self.schedule.day_key(posted_at) == today)}
+
+    def format_time(self, timestamp: float) -> str:
+        return datetime.fromtimestamp(timestamp, self.schedule.tz).strftime('%d/%m %H:%M')
+
+    # Despachante ------------------------------------------------------------
+
+    def reschedule_overdue(self) -> int:
+        """Realoca postagens que perderam o horário (bot parado), mantendo a ordem"""
+        now = time.time()
+        with self._lock:
+            overdue = self._conn.execute(
+                "SELECT id FROM post_queue WHERE status = 'queued' AND scheduled_at < ? ORDER BY scheduled_at",
+                (now - OVERDUE_GRACE,)
+            ).fetchall()
+            for (item_id,) in overdue:
+                scheduled_at = self.schedule.next_time(now, self._booked(exclude_id=item_id))
+                with self._conn:
+                    self._conn.execute('UPDATE post_queue SET scheduled_at = ? WHERE id = ?', (scheduled_at, item_id))
+        if overdue:
+            logger.info(f"Fila de postagens: {len(overdue)} postagens atrasadas reagendadas")
+        return len(overdue)
+
+    def _next_due(self):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, payload, scheduled_at, attempts FROM post_queue WHERE status = 'queued' "
+                "ORDER BY scheduled_at LIMIT 1"
+            ).fetchone()
+
+    def _finish(self, item_id: int, posted: bool, attempts: int, error: str = None):
+        with self._lock, self._conn:
+            if posted:
+                self._conn.execute("UPDATE post_queue SET status = 'posted', posted_at = ?, attempts = ? WHERE id = ?",
+                                   (time.time(), attempts, item_id))
+            elif attempts >= MAX_ATTEMPTS:
+                self._conn.execute("UPDATE post_queue SET status = 'failed', attempts = ?, error = ? WHERE id = ?",
+                                   (attempts, error, item_id))
+            else:
+                self._conn.execute('UPDATE post_queue SET scheduled_at = ?, attempts = ?, error = ? WHERE id = ?',
+                                   (time.time() + RETRY_DELAY, attempts, error, item_id))
+
+    async def run(self, post: Callable[[Dict, Dict, str], Awaitable[Optional[object]]]):
+        """Loop do despachante: posta cada item no horário agendado via `post`"""
+        self._wakeup = asyncio.Event()
+        self.reschedule_overdue()
+        while True:
+            row = self._next_due()
+            wait = 3600 if row is None else row[2] - time.time()
+            if wait > 0:
+                self._wakeup.clear()
+                with contextlib.suppress(asyncio.TimeoutError):
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+                continue
+
+            item_id, payload, _, attempts = row
+            data = StateBackend.decode(payload)
+            error = None
+            try:
+                result = await post(data['product_info'], data['shopify_result'], data['affiliate_link'])
+            except Exception as e:
+                result, error = None, str(e)
+            if result is None:
+                logger.error(f"Falha na postagem agendada {item_id}: {error or 'sem resposta do Telegram'}")
+            else:
+                logger.info(f"Postagem agendada {item_id} enviada")
+            self._finish(item_id, result is not None, attempts + 1, error)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,180 @@
+"""
+Renderização única dos previews e editor de mensagens que evita edições sem mudança
+"""
+
+import hashlib
+import json
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
+
+logger = logging.getLogger(__name__)
+
+MAX_TRACKED_MESSAGES = 2000
+EDIT_ENDPOINTS = ('editMessageText', 'editMessageCaption', 'editMessageReplyMarkup', 'editMessageMedia')
+
+# Teclados fixos (montados uma vez)
+PRODUCT_PREVIEW_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✏️ Editar Título", callback_data="edit_title")],
+    [InlineKeyboardButton("🏷️ Gerenciar Categorias", callback_data="manage_categories")],
+    [InlineKeyboardButton("💰 Editar Preços", callback_data="edit_prices")],
+    [InlineKeyboardButton("📄 Editar Descrição", callback_data="edit_description")],
+    [InlineKeyboardButton("📸 Editar Imagens", callback_data="edit_images")],
+    [InlineKeyboardButton("🏷️ Adicionar CTA", callback_data="add_cta")],
+    [InlineKeyboardButton("✅ Publicar Assim", callback_data="publish_as_is")],
+    [InlineKeyboardButton("❌ Cancelar", callback_data="cancel")]
+])
+
+CHANNEL_PREVIEW_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("✏️ Editar Título", callback_data="channel_edit_title")],
+    [InlineKeyboardButton("🖼️ Editar Primeira Imagem", callback_data="channel_edit_image")],
+    [InlineKeyboardButton("💰 Editar Preço", callback_data="channel_edit_price")],
+    [InlineKeyboardButton("🏷️ Adicionar CTA", callback_data="add_cta")],
+    [InlineKeyboardButton("✅ Postar no Canal", callback_data="channel_post_direct")],
+    [InlineKeyboardButton("🕒 Agendar no Canal", callback_data="channel_schedule_direct")],
+    [InlineKeyboardButton("❌ Cancelar", callback_data="cancel")]
+])
+
+
+def render_product_preview(product_info: Dict, header: str = "📦 PRODUTO EXTRAÍDO") -> str:
+    """Preview completo (fluxo Shopify) usado na extração e após cada edição
+
+    Texto puro, enviado sem parse_mode: títulos trazem caracteres especiais.
+    """
+    title = product_info.get('title', 'Sem título')
+    price_info = product_info.get('price', {})
+    current_price = price_info.get('current', 0)
+    original_price = price_info.get('original', current_price)
+    discount = price_info.get('discount_percent', 0)
+    description = product_info.get('description') or 'Sem descrição'
+    images = product_info.get('images', [])
+    categories_text = " | ".join(product_info.get('categories', ['Electronics']))
+    cta = product_info.get('cta', '')
+    affiliate_link = product_info.get('original_url', 'Não informado')
+
+    images_text = ""
+    if images:
+        images_text = "\nURLs das imagens:\n"
+        for i, img in enumerate(images[:3], 1):
+            images_text += f"{i}. {img}\n"
+        if len(images) > 3:
+            images_text += f"... e mais {len(images) - 3} imagens\n"
+
+    return f"""
+{header}
+📝 Título: {title}
+
+🏷️ Categorias: {categories_text}
+
+💰 Preços:
+• Atual: R$ {current_price:.2f}
+{f"• Original: R$ {original_price:.2f}" if original_price > current_price else ""}
+{f"• Desconto: {discount}% OFF" if discount > 0 else ""}
+{f"🏷️ CTA: {cta}" if cta else ""}
+
+📸 Imagens: {len(images)} encontradas{images_text}
+
+📄 Descrição: {description[:100]}{"..." if len(description) > 100 else ""}
+
+🔗 Link Afiliado: {affiliate_link}
+
+O que deseja fazer?"""
+
+
+def render_channel_preview(product_info: Dict) -> str:
+    """Preview simplificado (fluxo só canal)"""
+    title = product_info.get('title', 'Sem título')
+    price_info = product_info.get('price', {})
+    current_price = price_info.get('current', 0)
+    original_price = price_info.get('original', current_price)
+    discount = price_info.get('discount_percent', 0)
+    cta = product_info.get('cta', '')
+    images = product_info.get('images', [])
+    first_image = images[0] if images else 'Nenhuma imagem'
+
+    return f"""
+📢 PREVIEW PARA CANAL DO TELEGRAM
+
+📝 Título: {title}
+
+💰 Preço Atual: ${current_price:.2f}
+{f"💰 Preço Original: ${original_price:.2f}" if original_price > current_price else ""}
+{f"💥 Desconto: {discount}% OFF" if discount > 0 else ""}
+{f"🏷️ CTA: {cta}" if cta else ""}
+
+🖼️ Primeira Imagem: {first_image[:50]}{"..." if len(first_image) > 50 else ""}
+
+✏️ Você pode editar antes de postar:"""
+
+
+def content_digest(text: str, reply_markup=None, parse_mode: Optional[str] = None) -> str:
+    """Hash do conteúdo como o Telegram o compara (texto, teclado e formatação)"""
+    if hasattr(reply_markup, 'to_dict'):
+        reply_markup = reply_markup.to_dict()
+    # O Telegram ignora espaços nas pontas do texto
+    payload = json.dumps([(text or '').strip(), reply_markup, parse_mode], sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+class MessageEditor:
+    """Guarda o hash do último conteúdo de cada mensagem e pula edições idênticas
+
+    Toda edição enviada pelo bot (por aqui ou não) é informada via `observe`,
+    chamado pelo OutboundScheduler, então o hash sempre reflete o que está na tela.
+    """
+
+    def __init__(self):
+        self._digests = OrderedDict()
+        self.edits = 0
+        self.skipped = 0
+
+    def _remember(self, key, digest: Optional[str]):
+        if digest is None:
+            self._digests.pop(key, None)
+            return
+        self._digests[key] = digest
+        self._digests.move_to_end(key)
+        while len(self._digests) > MAX_TRACKED_MESSAGES:
+            self._digests.popitem(last=False)
+
+    def observe(self, endpoint: str, data: Dict):
+        """Registra uma edição enviada com sucesso ao Telegram"""
+        if endpoint not in EDIT_ENDPOINTS or 'message_id' not in data:
+            return
+        key = (str(data.get('chat_id')), data['message_id'])
+        if endpoint == 'editMessageText':
+            self._remember(key, content_digest(data.get('text'), data.get('reply_markup'), data.get('parse_mode')))
+        else:
+            # Legenda/teclado/mídia: conteúdo de texto desconhecido a partir daqui
+            self._remember(key, None)
+
+    async def edit(self, target, text: str, reply_markup=None, **kwargs) -> bool:
+        """Edita a mensagem (Message ou CallbackQuery); False se não havia nada a mudar"""
+        if hasattr(target, 'edit_message_text'):
+            edit, message = target.edit_message_text, getattr(target, 'message', None)
+        else:
+            edit, message = target.edit_text, target
+
+        key = (str(message.chat_id), message.message_id) if message is not None else None
+        digest = content_digest(text, reply_markup, kwargs.get('parse_mode'))
+        if key is not None and self._digests.get(key) == digest:
+            self.skipped += 1
+            return False
+
+        try:
+            await edit(text, reply_markup=reply_markup, **kwargs)
+        except BadRequest as e:
+            if 'not modified' not in str(e).lower():
+                raise
+            self.skipped += 1
+            if key is not None:
+                self._remember(key, digest)
+            return False
+        self.edits += 1
+        return True
+
+    def stats(self) -> Dict:
+        return {'edits': self.edits, 'skipped': self.skipped}
@@ -0,0 +1,243 @@
+"""
+Histórico de preços por produto (ASIN, imagem ou link) com mínimo/máximo da janela
+
+Cada série é append-only em arrays; o mínimo e o máximo dos últimos
+PRICE_HISTORY_WINDOW_DAYS dias saem de filas monotônicas (O(1) amortizado),
+sem nova consulta à loja. Os pontos vêm só do log de produtos (um por
+postagem, com ASIN e link do produto); a extração apenas consulta a série.
+Registros antigos do log, sem ASIN nem link do produto, ficam em séries
+próprias (url:/img:) e não entram na janela do ASIN.
+
+O ASIN manda: séries de ASINs diferentes nunca são unidas. Links (url:) só
+viram apelido de um ASIN se ainda não pertencem a outro; a imagem (img:) não
+une séries, porque variações (50"/55", King/Queen) dividem a mesma foto.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import Config
+from product_identity import identity_keys
+from products_log import LogSegments
+
+# Linhas do log por transação na importação (não segura o banco durante todo o histórico)
+BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+
+class PriceSeries:
+    """Pontos (tempo, preço) em ordem de tempo + filas monotônicas da janela"""
+
+    __slots__ = ('times', 'prices', 'window', '_min', '_max')
+
+    def __init__(self, window: float):
+        self.times = array('d')
+        self.prices = array('d')
+        self.window = window
+        self._min = deque()  # índices com preços crescentes
+        self._max = deque()  # índices com preços decrescentes
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def _push(self, index: int):
+        price = self.prices[index]
+        while self._min and self.prices[self._min[-1]] >= price:
+            self._min.pop()
+        self._min.append(index)
+        while self._max and self.prices[self._max[-1]] <= price:
+            self._max.pop()
+        self._max.append(index)
+
+    def append(self, timestamp: float, price: float):
+        if self.times and timestamp < self.times[-1]:
+            # Fora de ordem (histórico antigo chegando depois): inserir e refazer as filas
+            position = bisect_right(self.times, timestamp)
+            self.times.insert(position, timestamp)
+            self.prices.insert(position, price)
+            self._min.clear()
+            self._max.clear()
+            for index in range(bisect_right(self.times, self.times[-1] - self.window), len(self.times)):
+                self._push(index)
+            return
+        self.times.append(timestamp)
+        self.prices.append(price)
+        self._push(len(self.times) - 1)
+
+    def _evict(self, queue: deque, now: float):
+        cutoff = now - self.window
+        while queue and self.times[queue[0]] < cutoff:
+            queue.popleft()
+
+    def window_min(self, now: float) -> Optional[float]:
+        self._evict(self._min, now)
+        return self.prices[self._min[0]] if self._min else None
+
+    def window_max(self, now: float) -> Optional[float]:
+        self._evict(self._max, now)
+        return self.prices[self._max[0]] if self._max else None
+
+    def window_count(self, now: float) -> int:
+        return len(self.times) - bisect_right(self.times, now - self.window - 1e-9)
+
+
+class PriceHistory:
+    """Séries por produto em memória, gravadas no SQLite (tabelas price_points/price_aliases)"""
+
+    def __init__(self, path: str = None, segments: LogSegments = None, window_days: float = None):
+        self.path = path or Config.STATE_DB_PATH
+        self.segments = segments or LogSegments()
+        self.window = (window_days or Config.PRICE_HISTORY_WINDOW_DAYS) * 86400
+        self._lock = threading.Lock()
+        self._series: Dict[str, PriceSeries] = {}
+        self._aliases: Dict[str, str] = {}
+        self._conn = sqlite3.connect(self.path, timeout=Config.SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(
+            'CREATE TABLE IF NOT EXISTS price_points (key TEXT NOT NULL, ts REAL NOT NULL, price REAL NOT NULL);'
+            'CREATE INDEX IF NOT EXISTS price_points_key ON price_points (key);'
+            'CREATE TABLE IF NOT EXISTS price_aliases (alias TEXT PRIMARY KEY, key TEXT NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS log_checkpoints (name TEXT PRIMARY KEY, seq INTEGER, offset INTEGER);'
+        )
+        self._conn.commit()
+        self._aliases = dict(self._conn.execute('SELECT alias, key FROM price_aliases'))
+        for key, timestamp, price in self._conn.execute('SELECT key, ts, price FROM price_points ORDER BY ts'):
+            self._get(key).append(timestamp, price)
+
+    def _get(self, key: str) -> PriceSeries:
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = PriceSeries(self.window)
+        return series
+
+    def _merge(self, source: str, canonical: str):
+        """Move a série `source` (e seus apelidos) para `canonical`"""
+        other = self._series.pop(source)
+        target = self._get(canonical)
+        for timestamp, price in zip(other.times, other.prices):
+            target.append(timestamp, price)
+        self._conn.execute('UPDATE price_points SET key = ? WHERE key = ?', (canonical, source))
+        self._conn.execute('UPDATE price_aliases SET key = ? WHERE key = ?', (canonical, source))
+        for alias, target_key in list(self._aliases.items()):
+            if target_key == source:
+                self._aliases[alias] = canonical
+
+    def _resolve(self, keys: List[str]) -> str:
+        """Chave canônica do produto: o ASIN; sem ASIN, o link; a imagem só sem nenhum dos dois"""
+        asin_key = next((key for key in keys if key.startswith('asin:')), None)
+        links = [key for key in keys if key.startswith('url:')]
+        if not asin_key:
+            # Link que já virou apelido de um ASIN leva ao produto certo; imagem sozinha só sem link
+            resolved = [self._aliases.get(key, key) for key in links]
+            canonical = next((key for key in resolved if key in self._series), resolved[0] if resolved else keys[0])
+        else:
+            canonical = asin_key
+        for key in links:
+            current = self._aliases.get(key, key)
+            if current == canonical:
+                continue
+            if current.startswith('asin:'):
+                # Link já pertence a outro ASIN: não une nem muda o dono
+                continue
+            if current in self._series:
+                self._merge(current, canonical)
+            self._aliases[key] = canonical
+            self._conn.execute('INSERT OR REPLACE INTO price_aliases (alias, key) VALUES (?, ?)', (key, canonical))
+        return canonical
+
+    def _add(self, keys: List[str], timestamp: float, price: float):
+        """Grava o ponto na série canônica do produto"""
+        canonical = self._resolve(keys)
+        self._get(canonical).append(timestamp, price)
+        self._conn.execute('INSERT INTO price_points (key, ts, price) VALUES (?, ?, ?)', (canonical, timestamp, price))
+
+    def _lookup(self, keys: List[str]) -> Optional[str]:
+        """Série já existente do produto, sem criar apelidos (mesma regra de _resolve)"""
+        asin_key = next((key for key in keys if key.startswith('asin:')), None)
+        if asin_key:
+            return asin_key
+        links = [key for key in keys if key.startswith('url:')]
+        for key in links or keys[:1]:
+            resolved = self._aliases.get(key, key)
+            if resolved in self._series:
+                return resolved
+        return None
+
+    def summarize(self, product_info: Dict, timestamp: float = None) -> Optional[Dict]:
+        """Mínimo/máximo da janela para o preço extraído e se ele é o menor (não grava)
+
+        O ponto só entra no histórico quando o produto é postado (via log).
+        `is_lowest` exige histórico na janela com algum preço maior (não vale
+        para o mesmo preço repetido).
+        """
+        price = (product_info.get('price') or {}).get('current')
+        images = product_info.get('images') or []
+        keys = identity_keys(product_info.get('product_url'), images[0] if images else None,
+                             product_info.get('original_url'))
+        if not price or not keys:
+            return None
+        timestamp = timestamp or time.time()
+        with self._lock:
+            key = self._lookup(keys)
+            series = self._series.get(key) if key else None
+            if series is None:
+                summary = {'min': None, 'max': None, 'points': 0}
+            else:
+                summary = {'min': series.window_min(timestamp), 'max': series.window_max(timestamp),
+                           'points': series.window_count(timestamp)}
+        summary['is_lowest'] = bool(summary['points'] and price <= summary['min'] and price < summary['max'])
+        return summary
+
+    def refresh(self) -> int:
+        """Importa os preços das postagens novas do log (todo o histórico na primeira vez)"""
+        count = 0
+        with self._lock:
+            row = self._conn.execute("SELECT seq, offset FROM log_checkpoints WHERE name = 'price_history'").fetchone()
+            checkpoint = tuple(row) if row else (0, 0)
+            if self.segments.checkpoint_ahead(*checkpoint):
+                # Log substituído: os pontos já importados continuam valendo; só recomeça a leitura
+                checkpoint = (0, 0)
+            # Leitura do log fora da transação; cada lote é gravado de uma vez, com o checkpoint
+            rows = []
+            for seq, offset, line in self.segments.iter_lines(*checkpoint):
+                checkpoint = (seq, offset)
+                try:
+                    record = json.loads(line)
+                    timestamp = datetime.fromisoformat(record['timestamp']).timestamp()
+                except (KeyError, TypeError, ValueError):
+                    continue
+                keys = identity_keys(record.get('product_url'), record.get('image'), record.get('affiliate_link'))
+                if keys and record.get('price_current'):
+                    rows.append((keys, timestamp, float(record['price_current'])))
+                if len(rows) >= BATCH_SIZE:
+                    self._import(rows, checkpoint)
+                    count, rows = count + len(rows), []
+            self._import(rows, checkpoint)
+            count += len(rows)
+        if count:
+            logger.info(f"Histórico de preços: {count} preços importados do log")
+        return count
+
+    def _import(self, rows: List[tuple], checkpoint):
+        """Um lote de preços do log + checkpoint na mesma transação"""
+        with self._conn:
+            for keys, timestamp, price in rows:
+                self._add(keys, timestamp, price)
+            self._conn.execute("INSERT OR REPLACE INTO log_checkpoints (name, seq, offset) "
+                               "VALUES ('price_history', ?, ?)", checkpoint)
+
+    def stats(self) -> Dict:
+        return {'products': len(self._series), 'points': sum(len(series) for series in self._series.values())}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
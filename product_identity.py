@@ -0,0 +1,106 @@
+"""
+Identificação de produtos (ASIN, links e títulos normalizados, imagens, loja e CTA)
+"""
+
+import re
+import unicodedata
+from typing import List, Optional
+from urllib.parse import urlparse
+
+# ASIN aparece no path: /dp/B0XXXXXXX, /gp/product/B0XXXXXXX, /gp/aw/d/B0XXXXXXX
+ASIN_PATTERN = re.compile(r'/(?:dp|gp/product|gp/aw/d|product)/([A-Z0-9]{10})(?:[/?#]|$)', re.IGNORECASE)
+
+# Loja -> trechos do link que a identificam (amzn.to é o encurtador da Amazon)
+RETAILERS = (
+    ('amazon', ('amazon', 'amzn')),
+    ('walmart', ('walmart',)),
+    ('target', ('target',)),
+    ('ebay', ('ebay',)),
+    ('aliexpress', ('aliexpress',)),
+)
+
+# Rótulos das CTAs pré-definidas (callback cta_<chave>)
+CTA_LABELS = {
+    "amazons_choice": "Amazon's Choice 🟧",
+    "walmart_deals": "Walmart Deals 🟦",
+    "lowest_30_days": "Lowest price in 30 days 📉",
+    "limited_time_deal": "Limited time deal ⏰",
+    "lightning_deal": "Lightning Deal ⚡",
+    "deal_selling_fast": "Deal selling fast ⚡",
+    "best_seller": "#1 Best Seller 🏆"
+}
+_CTA_CODES = {label: code for code, label in CTA_LABELS.items()}
+
+
+def extract_asin(url: str) -> Optional[str]:
+    """Extrai o ASIN de uma URL da Amazon (None se não encontrar)"""
+    if not url or 'amazon' not in url.lower():
+        return None
+    match = ASIN_PATTERN.search(urlparse(url).path + '/')
+    return match.group(1).upper() if match else None
+
+
+def normalize_title(title: str) -> str:
+    """Normaliza título para comparação (minúsculas, sem acentos e pontuação)"""
+    if not title:
+        return ''
+    text = unicodedata.normalize('NFKD', title)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    text = re.sub(r'[^a-z0-9]+', ' ', text.lower())
+    return ' '.join(text.split())
+
+
+def normalize_link(url: str) -> str:
+    """Normaliza link (sem esquema, www, parâmetros e barra final)"""
+    if not url:
+        return ''
+    parsed = urlparse(url.strip() if '://' in url else f"https://{url.strip()}")
+    host = parsed.netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return f"{host}{parsed.path.rstrip('/')}"
+
+
+def retailer_of(url: str) -> str:
+    """Loja do link ('other' se não reconhecida)"""
+    link = (url or '').lower()
+    for retailer, needles in RETAILERS:
+        if any(needle in link for needle in needles):
+            return retailer
+    return 'other'
+
+
+def cta_code(cta: str) -> str:
+    """Código do CTA ('none' sem CTA; 'other' para textos personalizados)"""
+    cta = (cta or '').strip()
+    if not cta:
+        return 'none'
+    return _CTA_CODES.get(cta, 'other')
+
+
+def image_asset_id(url: str) -> Optional[str]:
+    """Id do arquivo da imagem, sem variações de tamanho (ex.: 71N+9Sb8eyL em .../I/71N+9Sb8eyL._AC_SL1500_.jpg)"""
+    if not url:
+        return None
+    name = urlparse(url).path.rsplit('/', 1)[-1]
+    asset = name.split('.', 1)[0]
+    return asset if len(asset) >= 6 else None
+
+
+def identity_keys(product_url: str = None, image_url: str = None, link: str = None) -> List[str]:
+    """Chaves que identificam o produto, da mais forte para a mais fraca
+
+    'asin:<ASIN>' (URL do produto ou link), 'img:<id da imagem>' e 'url:<link normalizado>'.
+    """
+    keys = []
+    asin = extract_asin(product_url or '') or extract_asin(link or '')
+    if asin:
+        keys.append(f"asin:{asin}")
+    asset = image_asset_id(image_url)
+    if asset:
+        keys.append(f"img:{asset}")
+    for url in (product_url, link):
+        normalized = normalize_link(url or '')
+        if normalized and f"url:{normalized}" not in keys:
+            keys.append(f"url:{normalized}")
+    return keys
@@ -0,0 +1,122 @@
+"""
+Índice SQLite (com busca full-text) dos produtos postados no canal
+
+Alimentado a partir do log de produtos pelo mesmo checkpoint (seq, offset):
+na primeira execução indexa todo o histórico; depois, só as linhas novas.
+"""
+
+import json
+import logging
+import re
+import sqlite3
+import threading
+from typing import Dict, List
+
+from config import Config
+from product_identity import normalize_link
+from products_log import LogSegments
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+# Palavras da busca (o resto vira separador para não quebrar a sintaxe do FTS)
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+
+class ProductIndex:
+    """Tabela posted_products + índice FTS5 sobre os títulos"""
+
+    def __init__(self, path: str = None, segments: LogSegments = None):
+        self.path = path or Config.STATE_DB_PATH
+        self.segments = segments or LogSegments()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=Config.SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(
+            'CREATE TABLE IF NOT EXISTS posted_products ('
+            ' id INTEGER PRIMARY KEY, timestamp TEXT, date TEXT, title TEXT, price_current REAL,'
+            ' price_original REAL, discount_percent REAL, affiliate_link TEXT, link_key TEXT, image TEXT, cta TEXT);'
+            'CREATE INDEX IF NOT EXISTS posted_products_link ON posted_products (link_key);'
+            'CREATE INDEX IF NOT EXISTS posted_products_date ON posted_products (date);'
+            'CREATE VIRTUAL TABLE IF NOT EXISTS posted_products_fts USING fts5('
+            ' title, content=posted_products, content_rowid=id, tokenize="unicode61 remove_diacritics 2");'
+            'CREATE TABLE IF NOT EXISTS log_checkpoints (name TEXT PRIMARY KEY, seq INTEGER, offset INTEGER);'
+        )
+        self._conn.commit()
+
+    def _checkpoint(self):
+        row = self._conn.execute("SELECT seq, offset FROM log_checkpoints WHERE name = 'product_index'").fetchone()
+        return tuple(row) if row else (0, 0)
+
+    def _insert(self, rows: List[tuple], seq: int, offset: int):
+        """Um lote de linhas + checkpoint na mesma transação"""
+        with self._conn:
+            for row in rows:
+                cursor = self._conn.execute(
+                    'INSERT INTO posted_products (timestamp, date, title, price_current, price_original,'
+                    ' discount_percent, affiliate_link, link_key, image, cta) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)', row)
+                self._conn.execute('INSERT INTO posted_products_fts (rowid, title) VALUES (?, ?)',
+                                   (cursor.lastrowid, row[2]))
+            self._conn.execute("INSERT OR REPLACE INTO log_checkpoints (name, seq, offset) VALUES ('product_index', ?, ?)",
+                               (seq, offset))
+
+    def refresh(self) -> int:
+        """Indexa as linhas novas do log (todo o histórico na primeira vez)"""
+        with self._lock:
+            checkpoint = self._checkpoint()
+            if self.segments.checkpoint_ahead(*checkpoint):
+                logger.warning("Checkpoint do índice de produtos à frente do log, reindexando")
+                with self._conn:
+                    self._conn.execute('DELETE FROM posted_products')
+                    self._conn.execute("INSERT INTO posted_products_fts (posted_products_fts) VALUES ('delete-all')")
+                checkpoint = (0, 0)
+
+            rows, count = [], 0
+            for seq, offset, line in self.segments.iter_lines(*checkpoint):
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                link = record.get('affiliate_link', '')
+                rows.append((record.get('timestamp'), record.get('date'), record.get('title', ''),
+                             record.get('price_current'), record.get('price_original'),
+                             record.get('discount_percent'), link, normalize_link(link),
+                             record.get('image', ''), record.get('cta', '')))
+                if len(rows) >= BATCH_SIZE:
+                    self._insert(rows, seq, offset)
+                    count, rows = count + len(rows), []
+            if rows:
+                self._insert(rows, seq, offset)
+                count += len(rows)
+        if count:
+            logger.info(f"Índice de produtos: {count} postagens indexadas")
+        return count
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        """Busca por link (exato, normalizado) ou por palavras do título (prefixo, todas obrigatórias)"""
+        query = (query or '').strip()
+        columns = 'p.date, p.title, p.price_current, p.discount_percent, p.affiliate_link, p.image, p.cta'
+        with self._lock:
+            if '://' in query or query.startswith(('amzn.', 'www.')):
+                rows = self._conn.execute(
+                    f'SELECT {columns} FROM posted_products p WHERE p.link_key = ? ORDER BY p.id DESC LIMIT ?',
+                    (normalize_link(query), limit)).fetchall()
+            else:
+                tokens = TOKEN_PATTERN.findall(query)
+                if not tokens:
+                    return []
+                match = ' '.join(f'"{token}"*' for token in tokens)
+                rows = self._conn.execute(
+                    f'SELECT {columns} FROM posted_products_fts f JOIN posted_products p ON p.id = f.rowid '
+                    'WHERE posted_products_fts MATCH ? ORDER BY bm25(posted_products_fts), p.id DESC LIMIT ?',
+                    (match, limit)).fetchall()
+        keys = ('date', 'title', 'price_current', 'discount_percent', 'affiliate_link', 'image', 'cta')
+        return [dict(zip(keys, row)) for row in rows]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM posted_products').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
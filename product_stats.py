@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Estatísticas de postagens (product_stats.json) atualizadas de forma incremental
+
+O arquivo guarda um checkpoint (seq, offset) no log de produtos; cada
+atualização lê só as linhas novas a partir dali e soma nos contadores por
+dia, loja, CTA e faixa de desconto.
+
+Uso:
+    python3 product_stats.py            # atualiza e mostra o resumo
+    python3 product_stats.py --rebuild  # recalcula tudo a partir do log
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Dict
+
+from config import Config
+from product_identity import cta_code, retailer_of
+from products_log import LogSegments
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = ('days', 'retailers', 'ctas', 'discounts')
+
+
+def discount_bucket(discount) -> str:
+    """Faixa de 10 pontos: '0-9', '10-19', ..., '90+'"""
+    try:
+        value = max(0, int(discount or 0))
+    except (TypeError, ValueError):
+        value = 0
+    start = min(value // 10, 9) * 10
+    return '90+' if start == 90 else f"{start}-{start + 9}"
+
+
+def _empty(legacy_days: Dict = None) -> Dict:
+    stats = {'checkpoint': {'seq': 0, 'offset': 0}, 'total': 0, 'updated_at': None,
+             'legacy_days': legacy_days or {}}
+    stats.update({name: {} for name in COUNTERS})
+    return stats
+
+
+class StatsAggregator:
+    """Mantém product_stats.json em dia lendo apenas o que entrou no log desde a última vez"""
+
+    def __init__(self, path: str = None, segments: LogSegments = None):
+        self.path = path or Config.PRODUCT_STATS_PATH
+        self.segments = segments or LogSegments()
+        self._lock = threading.Lock()
+        self.stats = self._load()
+
+    def _load(self) -> Dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return _empty()
+        except ValueError as e:
+            logger.warning(f"product_stats.json inválido ({e}), recalculando")
+            return _empty()
+
+        if 'checkpoint' in data:
+            return data
+        # Formato antigo ({data: contagem}): recalcula do log; as contagens antigas
+        # valem para os dias anteriores ao log (ou só parcialmente registrados nele)
+        return _empty({day: count for day, count in data.items() if isinstance(count, int)})
+
+    def _save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.stats, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def _fold(self, record: Dict):
+        stats = self.stats
+        stats['total'] += 1
+        for name, key in (('days', record.get('date') or 'unknown'),
+                          ('retailers', retailer_of(record.get('affiliate_link'))),
+                          ('ctas', cta_code(record.get('cta'))),
+                          ('discounts', discount_bucket(record.get('discount_percent')))):
+            stats[name][key] = stats[name].get(key, 0) + 1
+
+    def refresh(self) -> int:
+        """Soma as linhas novas do log; retorna quantas foram lidas"""
+        with self._lock:
+            if self.segments.checkpoint_ahead(**self.stats['checkpoint']):
+                logger.warning("Checkpoint das estatísticas à frente do log, recalculando")
+                self.stats = _empty(self.stats.get('legacy_days'))
+
+            checkpoint = self.stats['checkpoint']
+            seq, offset, count = checkpoint['seq'], checkpoint['offset'], 0
+            for seq, offset, line in self.segments.iter_lines(checkpoint['seq'], checkpoint['offset']):
+                count += 1
+                try:
+                    self._fold(json.loads(line))
+                except ValueError:
+                    continue
+
+            first_run = self.stats['updated_at'] is None
+            for day, day_count in self.stats.get('legacy_days', {}).items():
+                self.stats['days'][day] = max(self.stats['days'].get(day, 0), day_count)
+            if count or first_run:
+                self.stats['checkpoint'] = {'seq': seq, 'offset': offset}
+                self.stats['updated_at'] = datetime.now().isoformat()
+                self._save()
+            return count
+
+    def rebuild(self) -> int:
+        with self._lock:
+            self.stats = _empty(self.stats.get('legacy_days'))
+        return self.refresh()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Atualiza product_stats.json a partir do log de produtos")
+    parser.add_argument('--rebuild', action='store_true', help="recalcula tudo desde o início do log")
+    args = parser.parse_args()
+
+    aggregator = StatsAggregator()
+    started = time.perf_counter()
+    count = aggregator.rebuild() if args.rebuild else aggregator.refresh()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    stats = aggregator.stats
+    print(f"{count} linhas novas em {elapsed_ms:.1f}ms | total {stats['total']} postagens")
+    recent_days = sorted(stats['days'].items())[-10:]
+    print("days: " + ", ".join(f"{day}={value}" for day, value in recent_days))
+    for name in COUNTERS[1:]:
+        ranked = sorted(stats[name].items(), key=lambda item: -item[1])
+        print(f"{name}: " + ", ".join(f"{key}={value}" for key, value in ranked))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+"""
+Log de produtos postados (products_log.jsonl) com escrita em lote e rotação
+
+O arquivo ativo continua em PRODUCTS_LOG_PATH; ao mudar o dia (ou passar de
+PRODUCTS_LOG_MAX_BYTES) ele é compactado em PRODUCTS_LOG_ARCHIVE_DIR e
+registrado no manifest.json. Cada segmento tem um número de sequência, então
+(seq, offset) identifica qualquer posição do fluxo lógico (arquivos + ativo).
+"""
+
+import asyncio
+import contextlib
+import gzip
+import json
+import logging
+import os
+import shutil
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from config import Config
+from product_identity import extract_asin
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def build_log_record(product_info: Dict, affiliate_link: str) -> Dict:
+    """Linha do log para um produto postado (mesmos campos do histórico)"""
+    now = datetime.now()
+    price_info = product_info.get('price', {})
+    current_price = price_info.get('current', 0)
+    images = product_info.get('images', [])
+    product_url = product_info.get('product_url', '')
+    return {
+        'timestamp': now.isoformat(),
+        # Dia no fuso do operador (o mesmo da fila e do relatório diário)
+        'date': now.astimezone(ZoneInfo(Config.POST_TIMEZONE)).date().isoformat(),
+        'title': product_info.get('title', ''),
+        'price_current': current_price,
+        'price_original': price_info.get('original', current_price),
+        'discount_percent': price_info.get('discount_percent', 0),
+        'affiliate_link': affiliate_link,
+        'product_url': product_url,
+        'asin': extract_asin(product_url) or extract_asin(affiliate_link) or '',
+        'image': images[0] if images else '',
+        'cta': product_info.get('cta', ''),
+        'custom_channel_text': product_info.get('custom_channel_text', ''),
+    }
+
+
+def _first_date(path: str) -> Optional[str]:
+    """Data da primeira linha válida de um arquivo JSONL"""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            with contextlib.suppress(ValueError):
+                return json.loads(line).get('date')
+    return None
+
+
+class LogSegments:
+    """Manifest dos segmentos do log (somente leitura); usado pelos leitores"""
+
+    def __init__(self, path: str = None, archive_dir: str = None):
+        self.path = path or Config.PRODUCTS_LOG_PATH
+        self.archive_dir = archive_dir or Config.PRODUCTS_LOG_ARCHIVE_DIR
+        self.manifest_path = os.path.join(self.archive_dir, MANIFEST_NAME)
+
+    def load_manifest(self) -> Dict:
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'archives': [], 'active': {'seq': 1, 'date': None}}
+
+    def segments(self) -> List[Dict]:
+        """Segmentos em ordem: arquivos compactados e, por último, o arquivo ativo"""
+        manifest = self.load_manifest()
+        segments = [dict(entry, path=os.path.join(self.archive_dir, entry['file']), compressed=True)
+                    for entry in manifest['archives']]
+        active = manifest['active']
+        segments.append({'seq': active['seq'], 'path': self.path, 'compressed': False,
+                         'first_date': active.get('date'), 'last_date': None})
+        return segments
+
+    def checkpoint_ahead(self, seq: int, offset: int) -> bool:
+        """Posição salva além do fim do log (arquivo ativo truncado/substituído à mão)"""
+        active = self.segments()[-1]
+        if seq != active['seq']:
+            return seq > active['seq']
+        size = os.path.getsize(active['path']) if os.path.exists(active['path']) else 0
+        return offset > size
+
+    @staticmethod
+    def open_segment(segment: Dict):
+        if segment['compressed']:
+            return gzip.open(segment['path'], 'rb')
+        return open(segment['path'], 'rb')
+
+    def iter_lines(self, seq: int = 0, offset: int = 0, since_date: str = None,
+                   until_date: str = None) -> Iterator[Tuple[int, int, bytes]]:
+        """Linhas completas a partir de (seq, offset): gera (seq, offset_final, linha)
+
+        Segmentos anteriores a `seq` são pulados; `since_date`/`until_date` pulam
+        arquivos compactados inteiramente fora do intervalo. Uma linha ainda sem
+        '\\n' (escrita em andamento) não é devolvida.
+        """
+        for segment in self.segments():
+            if segment['seq'] < seq:
+                continue
+            if since_date and segment.get('last_date') and segment['last_date'] < since_date:
+                continue
+            if until_date and segment.get('first_date') and segment['first_date'] > until_date:
+                continue
+            start = offset if segment['seq'] == seq else 0
+            try:
+                f = self.open_segment(segment)
+            except FileNotFoundError:
+                continue
+            with f:
+                if start:
+                    f.seek(start)
+                position = start
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    position += len(line)
+                    yield segment['seq'], position, line
+
+    def iter_records(self, since_date: str = None, until_date: str = None) -> Iterator[Dict]:
+        """Registros do fluxo lógico completo (arquivos + ativo), em ordem"""
+        for _, _, line in self.iter_lines(since_date=since_date, until_date=until_date):
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if since_date and record.get('date', '') < since_date:
+                continue
+            if until_date and record.get('date', '') > until_date:
+                continue
+            yield record
+
+
+class ProductLog(LogSegments):
+    """Escrita do log fora do event loop: `append` só enfileira; um flush por lote (um fsync)"""
+
+    def __init__(self, path: str = None, archive_dir: str = None, max_bytes: int = None,
+                 flush_interval: float = None, batch_size: int = None):
+        super().__init__(path, archive_dir)
+        self.max_bytes = max_bytes or Config.PRODUCTS_LOG_MAX_BYTES
+        self.flush_interval = flush_interval or Config.PRODUCTS_LOG_FLUSH_INTERVAL
+        self.batch_size = batch_size or Config.PRODUCTS_LOG_BATCH_SIZE
+        self._buffer: List[Dict] = []
+        self._io_lock = threading.Lock()
+        self._wakeup = None
+        # Chamados na thread de gravação, logo após cada lote (ex.: agregador de estatísticas)
+        self.listeners = []
+        self.written = 0
+        self.flushes = 0
+        os.makedirs(self.archive_dir, exist_ok=True)
+        self._manifest = self.load_manifest()
+        self._recover()
+
+    # Manifest / rotação (sempre em thread) ---------------------------------
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f, ensure_ascii=False, indent=1)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.manifest_path)
+
+    def _recover(self):
+        """Conclui uma rotação interrompida e preenche a data do arquivo ativo (log antigo)"""
+        rotating = self.path + '.rotating'
+        if os.path.exists(rotating):
+            logger.warning("Log de produtos: concluindo rotação interrompida")
+            self._archive(rotating)
+        active = self._manifest['active']
+        if not active.get('date') and os.path.exists(self.path):
+            active['date'] = _first_date(self.path)
+            self._save_manifest()
+
+    def _archive(self, source: str):
+        """Compacta o segmento ativo (já renomeado para `source`) e avança a sequência"""
+        active = self._manifest['active']
+        seq = active['seq']
+        if not any(entry['seq'] == seq for entry in self._manifest['archives']):
+            last_date, lines, size = active.get('date'), 0, 0
+            with open(source, 'rb') as f:
+                for line in f:
+                    lines += 1
+                    size += len(line)
+                    with contextlib.suppress(ValueError):
+                        last_date = json.loads(line).get('date') or last_date
+            name = f"products_log-{active.get('date') or 'unknown'}-{seq:05d}.jsonl.gz"
+            target = os.path.join(self.archive_dir, name)
+            with open(source, 'rb') as src, gzip.open(target + '.tmp', 'wb') as dst:
+                shutil.copyfileobj(src, dst)
+            os.replace(target + '.tmp', target)
+            self._manifest['archives'].append({'seq': seq, 'file': name, 'first_date': active.get('date'),
+                                               'last_date': last_date, 'lines': lines, 'bytes': size})
+        self._manifest['active'] = {'seq': seq + 1, 'date': None}
+        self._save_manifest()
+        os.remove(source)
+        logger.info(f"Log de produtos: segmento {seq} arquivado")
+
+    def _rotate_if_needed(self, date: str):
+        active = self._manifest['active']
+        if not os.path.exists(self.path) or os.path.getsize(self.path) == 0:
+            return
+        if active.get('date') == date and os.path.getsize(self.path) < self.max_bytes:
+            return
+        rotating = self.path + '.rotating'
+        os.replace(self.path, rotating)
+        self._archive(rotating)
+
+    def _write_batch(self, records: List[Dict]):
+        """Grava o lote agrupado por dia; um fsync por arquivo tocado"""
+        with self._io_lock:
+            index = 0
+            while index < len(records):
+                date = records[index].get('date')
+                self._rotate_if_needed(date)
+                chunk = []
+                while index < len(records) and records[index].get('date') == date:
+                    chunk.append(json.dumps(records[index], ensure_ascii=False) + '\n')
+                    index += 1
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.writelines(chunk)
+                    f.flush()
+                    os.fsync(f.fileno())
+                if not self._manifest['active'].get('date'):
+                    self._manifest['active']['date'] = date
+                    self._save_manifest()
+            self._notify_listeners()
+
+    def _notify_listeners(self):
+        for listener in self.listeners:
+            try:
+                listener()
+            except Exception as e:
+                logger.warning(f"Erro em ouvinte do log de produtos: {e}")
+
+    def run_listeners(self):
+        """Chama os ouvintes um após o outro, sem concorrer com um lote (importação inicial do histórico)"""
+        with self._io_lock:
+            self._notify_listeners()
+
+    # API assíncrona ---------------------------------------------------------
+
+    def append(self, record: Dict):
+        """Enfileira um registro (não bloqueia; gravado no próximo flush)"""
+        self._buffer.append(record)
+        if self._wakeup and len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+
+    async def flush(self):
+        if not self._buffer:
+            return
+        records, self._buffer = self._buffer, []
+        try:
+            await asyncio.to_thread(self._write_batch, records)
+        except Exception as e:
+            # Mantém os registros para a próxima tentativa
+            logger.error(f"Erro ao gravar log de produtos: {e}")
+            self._buffer[:0] = records
+            return
+        self.written += len(records)
+        self.flushes += 1
+
+    async def run(self):
+        """Loop de gravação: a cada `flush_interval` ou quando o lote enche"""
+        self._wakeup = asyncio.Event()
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    async def close(self):
+        await self.flush()
+
+    def stats(self) -> Dict:
+        return {'pending': len(self._buffer), 'written': self.written, 'flushes': self.flushes,
+                'archives': len(self._manifest['archives']), 'active_seq': self._manifest['active']['seq']}
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Reprecificação em lote de produtos já publicados no Shopify
+
+Uso:
+    python3 reprice.py precos.csv
+    python3 reprice.py precos.jsonl --dry-run
+
+Cada linha identifica o produto por asin, affiliate_link ou title e traz
+price_current / price_original (mesmos nomes do products_log.jsonl).
+Os produtos são localizados no espelho local do catálogo e apenas a
+variante é atualizada (um PUT por produto, sem recriar nada).
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import time
+
+from bot_with_edit import ShopifyManager
+
+
+def read_rows(path: str):
+    """Lê linhas de um CSV (com cabeçalho) ou JSONL"""
+    with open(path, 'r', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def _same_price(stored, value) -> bool:
+    """Preço do espelho (texto ou None) igual ao novo (None = sem preço)"""
+    if not stored or not value:
+        return not stored and not value
+    return abs(float(stored) - value) < 0.005
+
+
+def build_updates(manager: ShopifyManager, rows):
+    """Resolve cada linha no espelho local e descarta preços inalterados ou inválidos"""
+    updates, missing, invalid, unchanged = [], [], [], 0
+    for row in rows:
+        label = row.get('asin') or row.get('affiliate_link') or row.get('title')
+        try:
+            price = float(row['price_current'])
+            original = float(row.get('price_original') or 0)
+        except (KeyError, TypeError, ValueError):
+            invalid.append(label)
+            continue
+
+        existing = manager.catalog.lookup(
+            affiliate_link=row.get('affiliate_link'),
+            url=f"https://www.amazon.com/dp/{row['asin']}" if row.get('asin') else None,
+            title=row.get('title')
+        )
+        if not existing:
+            missing.append(label)
+            continue
+
+        # Mesma regra do update_prices: compare_at só quando maior que o preço
+        compare_at = original if original > price else None
+        if (existing.get('price') and _same_price(existing['price'], price)
+                and _same_price(existing.get('compare_at_price'), compare_at)):
+            unchanged += 1
+            continue
+
+        updates.append({
+            'product_id': existing['id'],
+            'variant_id': existing.get('variant_id'),
+            'price': price,
+            'compare_at_price': original,
+        })
+    return updates, missing, invalid, unchanged
+
+
+async def main():
+    parser = argparse.ArgumentParser(description='Reprecificação em lote no Shopify')
+    parser.add_argument('arquivo', help='CSV ou JSONL com os novos preços')
+    parser.add_argument('--concurrency', type=int, default=None, help='Chamadas simultâneas ao Shopify')
+    parser.add_argument('--sync', action='store_true', help='Sincronizar o catálogo antes de reprecificar')
+    parser.add_argument('--dry-run', action='store_true', help='Apenas mostrar o que seria atualizado')
+    args = parser.parse_args()
+
+    manager = ShopifyManager()
+    if args.sync:
+        await manager.sync_catalog()
+
+    updates, missing, invalid, unchanged = build_updates(manager, read_rows(args.arquivo))
+    without_variant = [u for u in updates if not u['variant_id']]
+    updates = [u for u in updates if u['variant_id']]
+
+    print(f"📋 {len(updates)} para atualizar | {unchanged} sem alteração | {len(missing)} não encontrados")
+    if invalid:
+        print(f"⚠️ {len(invalid)} linhas sem price_current válido (ignoradas): {', '.join(map(str, invalid[:10]))}")
+    if without_variant:
+        print(f"⚠️ {len(without_variant)} produtos sem variante no espelho (rode com --sync)")
+    if args.dry_run or not updates:
+        return
+
+    start = time.perf_counter()
+    results = await manager.update_prices(updates, concurrency=args.concurrency)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {len(results['updated'])} atualizados | ❌ {len(results['failed'])} falhas | {elapsed:.1f}s")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
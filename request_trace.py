@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Trace estruturado por fluxo de produto (id da requisição + tempos por etapa)
+
+Cada link enviado abre um trace com id próprio; as etapas (expand, fetch,
+parse, extract, preview, shopify.*, channel_post) são medidas com
+time.monotonic() e o fluxo inteiro vira uma única linha JSON em
+TRACE_LOG_PATH quando é postado, agendado, cancelado ou expira.
+
+O trace ativo fica num ContextVar: o código medido só chama `stage(nome)`,
+sem receber o trace por parâmetro (vale também dentro de asyncio.to_thread).
+
+Uso:
+    python3 request_trace.py                     # p50/p95 por etapa
+    python3 request_trace.py --since 2025-12-10  # só fluxos a partir da data
+"""
+
+import argparse
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional['Trace']] = ContextVar('request_trace', default=None)
+
+
+class Trace:
+    """Etapas de um fluxo, em ms relativos ao início (relógio monotônico)"""
+
+    __slots__ = ('request_id', 'user_id', 'url', 'started', 'started_at', 'last_active', 'stages')
+
+    def __init__(self, user_id: int = None, url: str = None):
+        self.request_id = uuid.uuid4().hex[:12]
+        self.user_id = user_id
+        self.url = url
+        self.started = time.monotonic()
+        # Última atividade (retomada ou etapa): base da expiração
+        self.last_active = self.started
+        self.started_at = datetime.now().isoformat(timespec='seconds')
+        self.stages: List[Dict] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.monotonic()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            entry = {'stage': name, 'at_ms': round((start - self.started) * 1000, 1),
+                     'ms': round((time.monotonic() - start) * 1000, 1)}
+            if failed:
+                entry['error'] = True
+            self.stages.append(entry)
+            self.last_active = time.monotonic()
+
+    def to_record(self, outcome: str) -> Dict:
+        return {'request_id': self.request_id, 'user_id': self.user_id, 'url': self.url,
+                'started_at': self.started_at, 'outcome': outcome,
+                'total_ms': round((time.monotonic() - self.started) * 1000, 1), 'stages': self.stages}
+
+
+@contextmanager
+def stage(name: str):
+    """Mede a etapa no trace ativo (sem trace ativo, não faz nada)"""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    with trace.stage(name):
+        yield
+
+
+class RequestTracer:
+    """Traces abertos por id; grava uma linha JSON por fluxo encerrado"""
+
+    def __init__(self, path: str = None, ttl: float = None):
+        self.path = Config.TRACE_LOG_PATH if path is None else path
+        self.ttl = ttl or Config.TRACE_TTL
+        self._open: Dict[str, Trace] = {}
+        self._lock = threading.Lock()
+        self.written = 0
+
+    def start(self, user_id: int = None, url: str = None) -> Optional[Trace]:
+        """Abre um trace e o torna o ativo do contexto atual"""
+        if not self.path:
+            return None
+        trace = Trace(user_id, url)
+        self._open[trace.request_id] = trace
+        _current.set(trace)
+        return trace
+
+    def resume(self, request_id: str) -> Optional[Trace]:
+        """Reativa o trace de um fluxo em andamento (ex.: clique em botão)"""
+        trace = self._open.get(request_id) if request_id else None
+        if trace:
+            trace.last_active = time.monotonic()
+        _current.set(trace)
+        return trace
+
+    def finish(self, request_id: str, outcome: str):
+        trace = self._open.pop(request_id, None) if request_id else None
+        if trace:
+            self._write([trace.to_record(outcome)])
+
+    def expire(self) -> int:
+        """Grava como 'abandoned' os fluxos sem atividade há mais de `ttl` segundos"""
+        cutoff = time.monotonic() - self.ttl
+        expired = [request_id for request_id, trace in self._open.items() if trace.last_active < cutoff]
+        self._write([self._open.pop(request_id).to_record('abandoned') for request_id in expired])
+        return len(expired)
+
+    def close(self):
+        self._write([trace.to_record('shutdown') for trace in self._open.values()])
+        self._open.clear()
+
+    def _write(self, records: List[Dict]):
+        # Poucas linhas curtas por fluxo: append direto, sem fsync
+        if not records:
+            return
+        try:
+            with self._lock, open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(json.dumps(record, ensure_ascii=False) + '\n' for record in records)
+            self.written += len(records)
+        except OSError as e:
+            logger.warning(f"Erro ao gravar trace: {e}")
+
+    def stats(self) -> Dict:
+        return {'open': len(self._open), 'written': self.written}
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Percentil por posição mais próxima (valores já ordenados)"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(pct / 100 * len(values)) - 1))]
+
+
+def aggregate(path: str, since: str = None) -> Dict:
+    """Durações por etapa e contagem por desfecho dos fluxos do arquivo"""
+    durations = defaultdict(list)
+    errors = Counter()
+    outcomes = Counter()
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if since and record.get('started_at', '') < since:
+                continue
+            outcomes[record.get('outcome')] += 1
+            for entry in record.get('stages', []):
+                durations[entry['stage']].append(entry['ms'])
+                if entry.get('error'):
+                    errors[entry['stage']] += 1
+    stages = {}
+    for name, values in durations.items():
+        values.sort()
+        stages[name] = {'count': len(values), 'p50': percentile(values, 50), 'p95': percentile(values, 95),
+                        'max': values[-1], 'errors': errors[name]}
+    return {'flows': sum(outcomes.values()), 'outcomes': dict(outcomes), 'stages': stages}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="p50/p95 por etapa a partir do log de traces")
+    parser.add_argument('--path', default=Config.TRACE_LOG_PATH, help="arquivo JSONL de traces")
+    parser.add_argument('--since', help="só fluxos iniciados a partir desta data (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    try:
+        result = aggregate(args.path, args.since)
+    except FileNotFoundError:
+        print(f"Arquivo de traces não encontrado: {args.path}")
+        return
+    outcomes = ", ".join(f"{name} {count}" for name, count in sorted(result['outcomes'].items()))
+    print(f"{result['flows']} fluxos ({outcomes})\n")
+    print(f"{'etapa':<24} {'n':>6} {'p50':>9} {'p95':>9} {'máx':>9} {'erros':>6}")
+    for name, values in sorted(result['stages'].items(), key=lambda item: -item[1]['p95']):
+        print(f"{name:<24} {values['count']:>6} {values['p50']:>7.0f}ms {values['p95']:>7.0f}ms "
+              f"{values['max']:>7.0f}ms {values['errors']:>6}")
+
+
+if __name__ == '__main__':
+    main()
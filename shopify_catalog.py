@@ -0,0 +1,249 @@
+"""
+Espelho local do catálogo Shopify para detecção de duplicados
+"""
+
+import contextlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+import shopify
+
+from config import Config
+from product_identity import extract_asin, normalize_link, normalize_title
+
+logger = logging.getLogger(__name__)
+
+# Campos mínimos buscados no Shopify durante a sincronização
+SYNC_FIELDS = 'id,title,handle,status,tags,product_type,created_at,updated_at,variants'
+SYNC_PAGE_SIZE = 250
+# Ids conferidos por chamada na reconciliação (limite do filtro `ids` da API)
+RECONCILE_CHUNK = 250
+
+
+class CatalogMirror:
+    """Cópia local dos produtos da loja, indexada por link de afiliado, ASIN e título"""
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.CATALOG_MIRROR_PATH
+        self.products = {}
+        self.by_link = {}
+        self.by_asin = {}
+        self.by_title = {}
+        self.last_updated_at = None
+        self.last_reconciled_at = 0.0
+        self._lock = threading.RLock()
+        # Uma gravação por vez: a mais recente nunca é sobrescrita por uma cópia antiga
+        self._save_lock = threading.Lock()
+        self.load()
+
+    def load(self):
+        """Carrega o espelho do disco (se existir)"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            with self._lock:
+                self.last_updated_at = data.get('last_updated_at')
+                self.last_reconciled_at = data.get('last_reconciled_at') or 0.0
+                for record in data.get('products', []):
+                    self._index(record)
+            logger.info(f"Espelho do catálogo carregado: {len(self.products)} produtos")
+        except Exception as e:
+            logger.error(f"Erro ao carregar espelho do catálogo: {e}")
+
+    def save(self):
+        """Grava o espelho no disco (escrita atômica, bloqueante: no bot, via asyncio.to_thread)"""
+        with self._save_lock:
+            with self._lock:
+                data = {
+                    'last_updated_at': self.last_updated_at,
+                    'last_reconciled_at': self.last_reconciled_at,
+                    'products': [dict(record) for record in self.products.values()]
+                }
+            # Arquivo temporário próprio: gravações de threads diferentes não disputam o mesmo .tmp
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path) + '.',
+                                            dir=os.path.dirname(os.path.abspath(self.path)))
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(tmp_path, self.path)
+            except Exception as e:
+                logger.error(f"Erro ao salvar espelho do catálogo: {e}")
+                with contextlib.suppress(OSError):
+                    os.remove(tmp_path)
+
+    def _index(self, record: Dict):
+        """Adiciona/atualiza registro nos índices"""
+        product_id = str(record['id'])
+        previous = self.products.get(product_id)
+        if previous:
+            self._unindex(previous)
+            # Link de afiliado só é conhecido localmente (fica no metafield)
+            if not record.get('affiliate_link') and previous.get('affiliate_link'):
+                record['affiliate_link'] = previous['affiliate_link']
+            if not record.get('asin') and previous.get('asin'):
+                record['asin'] = previous['asin']
+
+        self.products[product_id] = record
+        link_key = normalize_link(record.get('affiliate_link', ''))
+        if link_key:
+            self.by_link[link_key] = product_id
+        if record.get('asin'):
+            self.by_asin[record['asin']] = product_id
+        title_key = normalize_title(record.get('title', ''))
+        if title_key:
+            self.by_title[title_key] = product_id
+
+    def _unindex(self, record: Dict):
+        """Remove registro dos índices"""
+        product_id = str(record['id'])
+        for index, key in ((self.by_link, normalize_link(record.get('affiliate_link', ''))),
+                           (self.by_asin, record.get('asin')),
+                           (self.by_title, normalize_title(record.get('title', '')))):
+            if key and index.get(key) == product_id:
+                del index[key]
+
+    def remove(self, product_id):
+        """Remove produto do espelho (ex.: após exclusão na loja)"""
+        with self._lock:
+            record = self.products.pop(str(product_id), None)
+            if record:
+                self._unindex(record)
+
+    def set_status(self, product_id, status: str):
+        """Atualiza o status registrado de um produto (ex.: 'archived' após arquivar na loja)"""
+        with self._lock:
+            record = self.products.get(str(product_id))
+            if record:
+                record['status'] = status
+
+    def lookup(self, affiliate_link: str = None, url: str = None, title: str = None) -> Optional[Dict]:
+        """Procura produto já publicado (sem chamar o Shopify)"""
+        with self._lock:
+            candidates = []
+            asin = extract_asin(url) or extract_asin(affiliate_link)
+            if asin:
+                candidates.append(self.by_asin.get(asin))
+            for link in (affiliate_link, url):
+                link_key = normalize_link(link or '')
+                if link_key:
+                    candidates.append(self.by_link.get(link_key))
+            title_key = normalize_title(title or '')
+            if title_key:
+                candidates.append(self.by_title.get(title_key))
+
+            for product_id in candidates:
+                record = self.products.get(product_id) if product_id else None
+                # Produtos arquivados não contam como publicados
+                if record and record.get('status') != 'archived':
+                    return dict(record)
+        return None
+
+    def update_price(self, product_id, price: float, compare_at_price: Optional[float]):
+        """Atualiza o preço registrado de um produto (após PATCH na loja)"""
+        with self._lock:
+            record = self.products.get(str(product_id))
+            if record:
+                record['price'] = f"{price:.2f}"
+                record['compare_at_price'] = f"{compare_at_price:.2f}" if compare_at_price else None
+
+    def record_created(self, shopify_result: Dict, product_data: Dict, affiliate_link: str, variant: Dict = None):
+        """Registra produto recém-criado pelo bot"""
+        price_info = product_data.get('price', {})
+        record = {
+            'id': shopify_result['id'],
+            'handle': shopify_result.get('handle'),
+            'title': shopify_result.get('title') or product_data.get('title', ''),
+            'status': 'active',
+            'product_type': (product_data.get('categories') or [''])[0],
+            'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'variant_id': (variant or {}).get('id'),
+            'price': (variant or {}).get('price', price_info.get('current')),
+            'compare_at_price': (variant or {}).get('compare_at_price'),
+            'asin': extract_asin(product_data.get('product_url', '')) or extract_asin(affiliate_link),
+            'affiliate_link': affiliate_link,
+            'url': shopify_result.get('url'),
+        }
+        with self._lock:
+            self._index(record)
+        self.save()
+
+    def _record_from_product(self, product) -> Dict:
+        """Converte produto da API em registro compacto"""
+        variants = getattr(product, 'variants', None) or []
+        variant = variants[0] if variants else None
+        tags = [t.strip() for t in (getattr(product, 'tags', '') or '').split(',')]
+        asin = next((t[5:].upper() for t in tags if t.lower().startswith('asin:')), None)
+        return {
+            'id': product.id,
+            'handle': product.handle,
+            'title': product.title,
+            'status': getattr(product, 'status', 'active'),
+            'product_type': getattr(product, 'product_type', ''),
+            'created_at': getattr(product, 'created_at', None),
+            'updated_at': product.updated_at,
+            'variant_id': variant.id if variant else None,
+            'price': getattr(variant, 'price', None) if variant else None,
+            'compare_at_price': getattr(variant, 'compare_at_price', None) if variant else None,
+            'asin': asin,
+            'url': f"https://{Config.SHOPIFY_SHOP_URL}/products/{product.handle}",
+        }
+
+    def reconcile(self) -> int:
+        """Remove do espelho os produtos excluídos na loja (o updated_at_min não os traz). Bloqueante."""
+        # Só os ids conhecidos antes da consulta: um produto criado enquanto ela roda não é removido
+        with self._lock:
+            known = list(self.products)
+        found = set()
+        for start in range(0, len(known), RECONCILE_CHUNK):
+            chunk = known[start:start + RECONCILE_CHUNK]
+            page = shopify.Product.find(ids=','.join(chunk), fields='id', limit=RECONCILE_CHUNK)
+            found.update(str(product.id) for product in page)
+        missing = [product_id for product_id in known if product_id not in found]
+        for product_id in missing:
+            self.remove(product_id)
+        with self._lock:
+            self.last_reconciled_at = time.time()
+        if missing:
+            logger.info(f"Catálogo reconciliado: {len(missing)} produtos excluídos na loja removidos do espelho")
+        return len(missing)
+
+    def sync(self) -> int:
+        """Sincroniza incrementalmente com a loja (updated_at_min + paginação). Bloqueante.
+
+        A cada CATALOG_RECONCILE_INTERVAL segundos também confere quais ids ainda existem.
+        """
+        params = {'limit': SYNC_PAGE_SIZE, 'fields': SYNC_FIELDS}
+        if self.last_updated_at:
+            params['updated_at_min'] = self.last_updated_at
+
+        count = 0
+        newest = self.last_updated_at
+        page = shopify.Product.find(**params)
+        while True:
+            with self._lock:
+                for product in page:
+                    self._index(self._record_from_product(product))
+                    if not newest or product.updated_at > newest:
+                        newest = product.updated_at
+                    count += 1
+            if not page.has_next_page():
+                break
+            page = page.next_page()
+
+        with self._lock:
+            self.last_updated_at = newest
+        removed = 0
+        if time.time() - self.last_reconciled_at >= Config.CATALOG_RECONCILE_INTERVAL:
+            removed = self.reconcile()
+        if count or removed:
+            self.save()
+        logger.info(f"Catálogo sincronizado: {count} produtos alterados desde {params.get('updated_at_min', 'o início')}")
+        return count
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Servidor local que imita a API do Shopify usada pelo ShopifyManager
+
+Endpoints REST: products, variants, metafields, custom_collections, collects
+e o endpoint GraphQL (productUpdate/productDelete usados pelo deal_lifecycle).
+
+Uso:
+    python3 shopify_stub_server.py --port 8787 --latency-ms 80 --error-rate 0.02
+
+O bench_shopify_publish.py sobe este servidor sozinho e aponta o
+ShopifyManager para http://127.0.0.1:<porta>/admin/api/2023-10/.
+Estatísticas de chamadas ficam em GET /_stats.
+"""
+
+import argparse
+import asyncio
+import itertools
+import random
+import re
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import urlencode
+
+from aiohttp import web
+
+API_PREFIX = '/admin/api/2023-10'
+
+
+class LeakyBucket:
+    """Balde do limite de chamadas REST do Shopify (40 de capacidade, vaza 2/s)"""
+
+    def __init__(self, size: int, leak_rate: float):
+        self.size = size
+        self.leak_rate = leak_rate
+        self.level = 0.0
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.level = max(0.0, self.level - (now - self.updated) * self.leak_rate)
+        self.updated = now
+        if self.level + 1 > self.size:
+            return False
+        self.level += 1
+        return True
+
+
+class ShopifyStub:
+    """Estado em memória e roteamento dos endpoints simulados"""
+
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0.0,
+                 bucket_size: int = 40, leak_rate: float = 0, seed: int = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        # leak_rate=0 desativa o limite de chamadas
+        self.bucket = LeakyBucket(bucket_size, leak_rate) if leak_rate else None
+        self.random = random.Random(seed)
+        self.ids = itertools.count(1000)
+        self.products = {}
+        self.variants = {}
+        self.metafields = {}
+        self.collections = {}
+        self.collects = {}
+        self.calls = Counter()
+        self.status_codes = Counter()
+        self.routes = [
+            ('products.list', 'GET', r'/products\.json', self.list_products),
+            ('products.create', 'POST', r'/products\.json', self.create_product),
+            ('products.get', 'GET', r'/products/(\d+)\.json', self.get_product),
+            ('products.update', 'PUT', r'/products/(\d+)\.json', self.update_product),
+            ('products.delete', 'DELETE', r'/products/(\d+)\.json', self.delete_product),
+            ('variants.update', 'PUT', r'/(?:products/\d+/)?variants/(\d+)\.json', self.update_variant),
+            ('metafields.list', 'GET', r'/(?:products/(\d+)/)?metafields\.json', self.list_metafields),
+            ('metafields.create', 'POST', r'/(?:products/(\d+)/)?metafields\.json', self.create_metafield),
+            ('metafields.update', 'PUT', r'/(?:products/\d+/)?metafields/(\d+)\.json', self.update_metafield),
+            ('custom_collections.list', 'GET', r'/custom_collections\.json', self.list_collections),
+            ('custom_collections.create', 'POST', r'/custom_collections\.json', self.create_collection),
+            ('collects.create', 'POST', r'/collects\.json', self.create_collect),
+            ('graphql', 'POST', r'/graphql\.json', self.graphql),
+        ]
+
+    # Infraestrutura -------------------------------------------------------
+
+    def _now(self) -> str:
+        return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+    async def dispatch(self, request: web.Request) -> web.Response:
+        """Roteia a requisição (tolerando barras duplicadas no path)"""
+        path = re.sub(r'/+', '/', request.path)
+        if path == '/_stats':
+            return web.json_response(self.stats())
+        if not path.startswith(API_PREFIX):
+            return web.json_response({'errors': 'Not Found'}, status=404)
+        path = path[len(API_PREFIX):]
+
+        for name, method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, path)
+            if method == request.method and match:
+                self.calls[name] += 1
+                response = await self._simulate(request, handler, match.groups())
+                self.status_codes[response.status] += 1
+                return response
+        return web.json_response({'errors': 'Not Found'}, status=404)
+
+    async def _simulate(self, request, handler, groups) -> web.Response:
+        """Aplica latência, limite de chamadas e injeção de erros"""
+        if self.latency_ms or self.jitter_ms:
+            delay = self.latency_ms + self.random.uniform(0, self.jitter_ms)
+            await asyncio.sleep(delay / 1000)
+
+        headers = {}
+        if self.bucket:
+            if not self.bucket.take():
+                return web.json_response({'errors': 'Exceeded 2 calls per second for api client.'},
+                                         status=429, headers={'Retry-After': '1.0'})
+            headers['X-Shopify-Shop-Api-Call-Limit'] = f"{int(self.bucket.level)}/{self.bucket.size}"
+
+        if self.error_rate and self.random.random() < self.error_rate:
+            return web.json_response({'errors': 'Internal Server Error (injetado)'}, status=500)
+
+        body = await request.json() if request.can_read_body else {}
+        status, payload, extra_headers = await handler(request, body, *groups)
+        headers.update(extra_headers or {})
+        return web.json_response(payload, status=status, headers=headers)
+
+    def stats(self) -> dict:
+        return {
+            'calls': dict(self.calls),
+            'total_calls': sum(self.calls.values()),
+            'status_codes': {str(k): v for k, v in self.status_codes.items()},
+            'products': len(self.products),
+            'metafields': len(self.metafields),
+        }
+
+    # Products -------------------------------------------------------------
+
+    async def list_products(self, request, body):
+        since = request.query.get('updated_at_min')
+        ids = set(filter(None, request.query.get('ids', '').split(',')))
+        limit = int(request.query.get('limit', 50))
+        offset = int(request.query.get('page_info', 0) or 0)
+        items = [p for p in self.products.values()
+                 if (not since or p['updated_at'] >= since) and (not ids or str(p['id']) in ids)]
+        page = items[offset:offset + limit]
+        headers = {}
+        if offset + limit < len(items):
+            # page_info aqui é só o offset (o filtro viaja junto, como no cursor real)
+            query = {'limit': limit, 'page_info': offset + limit}
+            if since:
+                query['updated_at_min'] = since
+            url = f"{request.scheme}://{request.host}{request.path}?{urlencode(query)}"
+            headers['Link'] = f'<{url}>; rel="next"'
+        return 200, {'products': page}, headers
+
+    async def create_product(self, request, body):
+        data = body.get('product', {})
+        if not data.get('title'):
+            return 422, {'errors': {'title': ["can't be blank"]}}, None
+        product_id = next(self.ids)
+        now = self._now()
+        variants = []
+        for variant in data.get('variants') or [{}]:
+            variant = dict(variant, id=next(self.ids), product_id=product_id)
+            self.variants[variant['id']] = variant
+            variants.append(variant)
+        product = dict(data, id=product_id, handle=f"produto-{product_id}", created_at=now,
+                       updated_at=now, status=data.get('status', 'active'), variants=variants,
+                       images=[dict(img, id=next(self.ids)) for img in data.get('images', [])])
+        self.products[product_id] = product
+        return 201, {'product': product}, None
+
+    async def get_product(self, request, body, product_id):
+        product = self.products.get(int(product_id))
+        if not product:
+            return 404, {'errors': 'Not Found'}, None
+        return 200, {'product': product}, None
+
+    async def update_product(self, request, body, product_id):
+        product = self.products.get(int(product_id))
+        if not product:
+            return 404, {'errors': 'Not Found'}, None
+        product.update({k: v for k, v in body.get('product', {}).items() if k != 'id'})
+        product['updated_at'] = self._now()
+        return 200, {'product': product}, None
+
+    async def delete_product(self, request, body, product_id):
+        if not self.products.pop(int(product_id), None):
+            return 404, {'errors': 'Not Found'}, None
+        return 200, {}, None
+
+    async def update_variant(self, request, body, variant_id):
+        variant = self.variants.get(int(variant_id))
+        if not variant:
+            return 404, {'errors': 'Not Found'}, None
+        variant.update({k: v for k, v in body.get('variant', {}).items() if k != 'id'})
+        self.products[variant['product_id']]['updated_at'] = self._now()
+        return 200, {'variant': variant}, None
+
+    # Metafields -----------------------------------------------------------
+
+    async def list_metafields(self, request, body, product_id=None):
+        items = [m for m in self.metafields.values()
+                 if not product_id or str(m['owner_id']) == product_id]
+        return 200, {'metafields': items}, None
+
+    async def create_metafield(self, request, body, product_id=None):
+        data = body.get('metafield', {})
+        metafield = dict(data, id=next(self.ids))
+        if product_id:
+            metafield.update(owner_id=int(product_id), owner_resource='product')
+        self.metafields[metafield['id']] = metafield
+        return 201, {'metafield': metafield}, None
+
+    async def update_metafield(self, request, body, metafield_id):
+        metafield = self.metafields.get(int(metafield_id))
+        if not metafield:
+            return 404, {'errors': 'Not Found'}, None
+        metafield.update({k: v for k, v in body.get('metafield', {}).items() if k != 'id'})
+        return 200, {'metafield': metafield}, None
+
+    # Collections ----------------------------------------------------------
+
+    async def list_collections(self, request, body):
+        return 200, {'custom_collections': list(self.collections.values())}, None
+
+    async def create_collection(self, request, body):
+        data = body.get('custom_collection', {})
+        collection = dict(data, id=next(self.ids))
+        self.collections[collection['id']] = collection
+        return 201, {'custom_collection': collection}, None
+
+    async def create_collect(self, request, body):
+        data = body.get('collect', {})
+        collect = dict(data, id=next(self.ids))
+        self.collects[collect['id']] = collect
+        return 201, {'collect': collect}, None
+
+    # GraphQL --------------------------------------------------------------
+
+    async def graphql(self, request, body):
+        """Suporta os aliases productUpdate(status: ARCHIVED)/productDelete do deal_lifecycle"""
+        data = {}
+        pattern = r'(\w+): (productUpdate|productDelete)\(input: \{id: "gid://shopify/Product/(\d+)"'
+        for alias, mutation, product_id in re.findall(pattern, body.get('query', '')):
+            product = self.products.get(int(product_id))
+            if not product:
+                errors = [{'message': 'Product does not exist'}]
+                data[alias] = {'userErrors': errors}
+            elif mutation == 'productDelete':
+                del self.products[int(product_id)]
+                data[alias] = {'deletedProductId': f"gid://shopify/Product/{product_id}", 'userErrors': []}
+            else:
+                product.update(status='archived', updated_at=self._now())
+                data[alias] = {'product': {'id': f"gid://shopify/Product/{product_id}"}, 'userErrors': []}
+        return 200, {'data': data}, None
+
+
+def create_app(stub: ShopifyStub) -> web.Application:
+    app = web.Application()
+    app['stub'] = stub
+    app.router.add_route('*', '/{tail:.*}', stub.dispatch)
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Servidor local que imita a API do Shopify')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8787)
+    parser.add_argument('--latency-ms', type=float, default=0, help='Latência fixa por chamada')
+    parser.add_argument('--jitter-ms', type=float, default=0, help='Latência aleatória adicional')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fração de respostas 500')
+    parser.add_argument('--bucket-size', type=int, default=40, help='Capacidade do limite de chamadas')
+    parser.add_argument('--leak-rate', type=float, default=0, help='Chamadas/s liberadas (0 = sem limite)')
+    args = parser.parse_args()
+
+    stub = ShopifyStub(args.latency_ms, args.jitter_ms, args.error_rate, args.bucket_size, args.leak_rate)
+    web.run_app(create_app(stub), host=args.host, port=args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,260 @@
+"""
+Armazenamento persistente do estado das conversas (rascunhos e edições)
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from typing import Dict
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class StateBackend:
+    """SQLite compartilhado pelos stores (uma tabela, um namespace por store)"""
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.STATE_DB_PATH
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, timeout=Config.SQLITE_BUSY_TIMEOUT, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS drafts ('
+            ' namespace TEXT NOT NULL, key INTEGER NOT NULL, data BLOB NOT NULL, touched_at REAL NOT NULL,'
+            ' PRIMARY KEY (namespace, key))'
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def encode(value) -> bytes:
+        """Registro compacto: JSON sem espaços comprimido com zlib"""
+        return zlib.compress(json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8'))
+
+    @staticmethod
+    def decode(blob: bytes):
+        return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+    def keys(self, namespace: str, min_touched_at: float) -> Dict[int, float]:
+        """Chaves gravadas (sem carregar os registros), descartando as expiradas"""
+        with self._lock:
+            self._conn.execute('DELETE FROM drafts WHERE namespace = ? AND touched_at < ?', (namespace, min_touched_at))
+            self._conn.commit()
+            rows = self._conn.execute('SELECT key, touched_at FROM drafts WHERE namespace = ?', (namespace,)).fetchall()
+        return dict(rows)
+
+    def load(self, namespace: str, key: int):
+        with self._lock:
+            row = self._conn.execute('SELECT data FROM drafts WHERE namespace = ? AND key = ?', (namespace, key)).fetchone()
+        return self.decode(row[0]) if row else None
+
+    def write(self, namespace: str, upserts: Dict[int, tuple], deletes):
+        """Aplica um lote de gravações/remoções numa única transação"""
+        with self._lock:
+            with self._conn:
+                if upserts:
+                    self._conn.executemany(
+                        'INSERT OR REPLACE INTO drafts (namespace, key, data, touched_at) VALUES (?, ?, ?, ?)',
+                        [(namespace, key, blob, touched_at) for key, (blob, touched_at) in upserts.items()]
+                    )
+                if deletes:
+                    self._conn.executemany('DELETE FROM drafts WHERE namespace = ? AND key = ?',
+                                           [(namespace, key) for key in deletes])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class StateStore(MutableMapping):
+    """Dicionário user_id -> estado com TTL, LRU em memória e gravação diferida
+
+    Usado no lugar dos dicts `pending_products`/`editing_products`. Os valores
+    são dicts mutáveis alterados in-place pelo bot: toda entrada entregue fica
+    presa na memória até `release()` (fim do update do operador), que compara
+    o conteúdo com o último gravado e só então a marca como suja. Leitura sem
+    alteração não gera gravação; `touch()` marca uma entrada explicitamente.
+    Entradas menos usadas e soltas saem da memória (continuam no SQLite e são
+    recarregadas sob demanda); entradas sem acesso há mais de `ttl` segundos
+    são descartadas.
+    """
+
+    def __init__(self, namespace: str, backend: StateBackend, ttl: float = None, max_in_memory: int = None):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl or Config.STATE_TTL_HOURS * 3600
+        self.max_in_memory = max_in_memory or Config.STATE_MAX_IN_MEMORY
+        self._memory = OrderedDict()        # key -> valor
+        self._touched = {}                  # key -> último acesso (memória e disco)
+        self._saved = {}                    # key -> crc32 do último registro gravado
+        self._pinned = set()                # entregues no update em andamento
+        self._evicted = {}                  # key -> (blob, touched_at) sujos fora da memória, até o flush
+        self._dirty = set()
+        self._deleted = set()
+        self._touched.update(backend.keys(namespace, time.time() - self.ttl))
+
+    def _expired(self, key) -> bool:
+        touched_at = self._touched.get(key)
+        return touched_at is not None and touched_at < time.time() - self.ttl
+
+    def _load(self, key):
+        """Valor da chave (da memória, da fila de gravação ou do disco) ou None"""
+        if self._expired(key):
+            del self[key]
+            return None
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return self._memory[key]
+        if key not in self._touched:
+            return None
+        if key in self._evicted:
+            blob = self._evicted[key][0]
+            value = self.backend.decode(blob)
+        else:
+            value = self.backend.load(self.namespace, key)
+            if value is None:
+                self._touched.pop(key, None)
+                return None
+            blob = self.backend.encode(value)
+        self._saved[key] = zlib.crc32(blob)
+        self._memory[key] = value
+        # Presa antes de liberar espaço: a entrada recém-carregada não pode sair
+        self._pinned.add(key)
+        self._evict()
+        return value
+
+    def _evict(self):
+        """Tira da memória as entradas menos usadas e soltas (as sujas vão para a fila do flush)"""
+        excess = len(self._memory) - self.max_in_memory
+        if excess <= 0:
+            return
+        victims = [key for key in self._memory if key not in self._pinned][:excess]
+        for key in victims:
+            value = self._memory.pop(key)
+            if key in self._dirty:
+                self._dirty.discard(key)
+                self._evicted[key] = (self.backend.encode(value), self._touched[key])
+            self._saved.pop(key, None)
+
+    # Interface de dicionário -------------------------------------------------
+
+    def __getitem__(self, key):
+        value = self._load(key)
+        if value is None:
+            raise KeyError(key)
+        # O chamador pode alterar o dict retornado: fica na memória até o release
+        self._touched[key] = time.time()
+        self._pinned.add(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        self._touched[key] = time.time()
+        self._pinned.add(key)
+        self._dirty.add(key)
+        self._deleted.discard(key)
+        self._evict()
+
+    def __delitem__(self, key):
+        if key not in self._touched and key not in self._memory:
+            raise KeyError(key)
+        self._memory.pop(key, None)
+        self._touched.pop(key, None)
+        self._saved.pop(key, None)
+        self._evicted.pop(key, None)
+        self._pinned.discard(key)
+        self._dirty.discard(key)
+        self._deleted.add(key)
+
+    def __contains__(self, key) -> bool:
+        return key in self._touched and not self._expired(key)
+
+    def __iter__(self):
+        return iter([key for key in list(self._touched) if not self._expired(key)])
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    # Alterações in-place -----------------------------------------------------
+
+    def touch(self, key):
+        """Marca a entrada como alterada (para mudanças feitas fora de um update)"""
+        if key in self._memory:
+            self._touched[key] = time.time()
+            self._dirty.add(key)
+
+    def release(self, key):
+        """Fim do update: grava a entrada no próximo flush só se o conteúdo mudou"""
+        if key not in self._pinned:
+            return
+        self._pinned.discard(key)
+        if key in self._memory and key not in self._dirty:
+            if zlib.crc32(self.backend.encode(self._memory[key])) != self._saved.get(key):
+                self._dirty.add(key)
+        self._evict()
+
+    def release_all(self):
+        for key in list(self._pinned):
+            self.release(key)
+
+    # Persistência -----------------------------------------------------------
+
+    def purge_expired(self) -> int:
+        """Remove entradas sem acesso há mais que o TTL"""
+        expired = [key for key in list(self._touched) if self._expired(key)]
+        for key in expired:
+            del self[key]
+        return len(expired)
+
+    def _take_changes(self):
+        """Codifica as alterações pendentes (no loop, onde os dicts são alterados)"""
+        upserts = dict(self._evicted)
+        for key in self._dirty:
+            if key in self._memory:
+                blob = self.backend.encode(self._memory[key])
+                self._saved[key] = zlib.crc32(blob)
+                upserts[key] = (blob, self._touched[key])
+        deletes = set(self._deleted)
+        self._evicted.clear()
+        self._dirty.clear()
+        self._deleted.clear()
+        return upserts, deletes
+
+    def _write(self, upserts: Dict[int, tuple], deletes):
+        try:
+            self.backend.write(self.namespace, upserts, deletes)
+        except Exception as e:
+            logger.error(f"Erro ao gravar estado '{self.namespace}': {e}")
+            # Próximo flush tenta de novo (sem ressuscitar o que foi alterado/removido depois)
+            for key, record in upserts.items():
+                if key in self._touched and key not in self._memory:
+                    self._evicted.setdefault(key, record)
+                elif key in self._memory:
+                    self._saved.pop(key, None)
+                    self._dirty.add(key)
+            self._deleted.update(key for key in deletes if key not in self._touched)
+
+    def flush(self):
+        """Grava no SQLite as entradas alteradas desde o último flush"""
+        upserts, deletes = self._take_changes()
+        if upserts or deletes:
+            self._write(upserts, deletes)
+
+    async def flush_async(self):
+        """Como flush(), com a escrita no SQLite fora do loop"""
+        upserts, deletes = self._take_changes()
+        if upserts or deletes:
+            await asyncio.to_thread(self._write, upserts, deletes)
+
+    def stats(self) -> Dict:
+        return {'total': len(self), 'in_memory': len(self._memory), 'dirty': len(self._dirty) + len(self._evicted),
+                'pinned': len(self._pinned)}
@@ -0,0 +1,82 @@
+"""
+Cache persistente de file_id do Telegram para fotos de produtos
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MAX_ENTRIES = 5000
+
+
+class FileIdCache:
+    """Mapeia URL da imagem -> file_id do Telegram (reenvio sem novo download)"""
+
+    def __init__(self, path: str = None):
+        self.path = path or Config.TELEGRAM_FILE_CACHE_PATH
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.load()
+
+    @staticmethod
+    def _key(url: str) -> str:
+        return (url or '').strip()
+
+    def load(self):
+        """Carrega o cache do disco (se existir)"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = OrderedDict(json.load(f))
+            logger.info(f"Cache de file_id carregado: {len(self._entries)} imagens")
+        except Exception as e:
+            logger.error(f"Erro ao carregar cache de file_id: {e}")
+
+    def save(self):
+        """Grava o cache no disco (escrita atômica)"""
+        with self._lock:
+            data = dict(self._entries)
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.error(f"Erro ao salvar cache de file_id: {e}")
+
+    def get(self, url: str) -> Optional[str]:
+        """Retorna o file_id já enviado para esta imagem (ou None)"""
+        with self._lock:
+            file_id = self._entries.get(self._key(url))
+            if file_id:
+                self._entries.move_to_end(self._key(url))
+            return file_id
+
+    def put(self, url: str, file_id: str):
+        """Registra o file_id após o primeiro envio bem-sucedido"""
+        key = self._key(url)
+        if not key or not file_id:
+            return
+        with self._lock:
+            if self._entries.get(key) == file_id:
+                return
+            self._entries[key] = file_id
+            self._entries.move_to_end(key)
+            while len(self._entries) > MAX_ENTRIES:
+                self._entries.popitem(last=False)
+        self.save()
+
+    def discard(self, url: str):
+        """Remove file_id inválido (ex.: rejeitado pelo Telegram)"""
+        with self._lock:
+            removed = self._entries.pop(self._key(url), None)
+        if removed:
+            self.save()
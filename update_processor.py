@@ -0,0 +1,98 @@
+"""
+Processamento concorrente de updates preservando a ordem por usuário
+"""
+
+import asyncio
+import logging
+import sys
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class UserOrderedUpdateProcessor(BaseUpdateProcessor):
+    """Updates de operadores diferentes rodam em paralelo; os do mesmo operador, em ordem
+
+    A Application cria uma task por update na ordem de chegada; cada task
+    espera o lock do seu usuário, e como os locks do asyncio atendem em ordem
+    FIFO, os updates de um mesmo operador nunca se sobrepõem nem se invertem.
+
+    O limite de concorrência só é aplicado depois do lock do usuário: o
+    semáforo da classe base é adquirido antes de do_process_update, então uma
+    rajada de um operador atrás de uma extração lenta ocuparia todas as vagas
+    esperando a vez e travaria os demais. Por isso a base fica sem limite.
+
+    Só ajuda se os handlers não bloquearem o loop: chamadas síncronas
+    (requests, BeautifulSoup, API do Shopify) precisam de asyncio.to_thread.
+
+    `on_update_done` recebe a chave de cada update concluído (ex.: para soltar
+    o estado do operador, que nenhum outro update dele está usando).
+    """
+
+    def __init__(self, max_concurrent_updates: int):
+        if max_concurrent_updates < 1:
+            raise ValueError("`max_concurrent_updates` must be a positive integer!")
+        super().__init__(sys.maxsize)
+        self.limit = max_concurrent_updates
+        self._slots: Optional[asyncio.BoundedSemaphore] = None
+        self._locks: Dict[Any, asyncio.Lock] = {}
+        self._waiting: Dict[Any, int] = {}
+        self.on_update_done: List[Callable[[Any], None]] = []
+        self.processed = 0
+
+    @staticmethod
+    def _key(update: object) -> Optional[Any]:
+        """Chave de ordenação: usuário, senão chat (ex.: posts de canal)"""
+        user = getattr(update, 'effective_user', None)
+        if user is not None:
+            return ('user', user.id)
+        chat = getattr(update, 'effective_chat', None)
+        if chat is not None:
+            return ('chat', chat.id)
+        return None
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        if self._slots is None:
+            # Criado no loop em que os updates rodam
+            self._slots = asyncio.BoundedSemaphore(self.limit)
+        key = self._key(update)
+        if key is None:
+            try:
+                async with self._slots:
+                    await coroutine
+            finally:
+                self.processed += 1
+            return
+
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        try:
+            # Vaga de processamento só quando chega a vez do update na fila do usuário
+            async with lock, self._slots:
+                await coroutine
+        finally:
+            self.processed += 1
+            for callback in self.on_update_done:
+                try:
+                    callback(key)
+                except Exception as e:
+                    logger.error(f"Erro ao finalizar update de {key}: {e}")
+            # Sem updates pendentes do usuário: descartar o lock (memória estável)
+            self._waiting[key] -= 1
+            if not self._waiting[key]:
+                del self._waiting[key]
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        """Nada a inicializar"""
+
+    async def shutdown(self) -> None:
+        """Nada a liberar"""
+
+    @property
+    def active_users(self) -> int:
+        return len(self._locks)
@@ -0,0 +1,119 @@
+"""
+Modo webhook: servidor aiohttp embutido que recebe updates do Telegram
+"""
+
+import asyncio
+import contextlib
+import logging
+import signal
+import time
+
+from aiohttp import web
+from telegram import Update
+from telegram.ext import Application
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebhookServer:
+    """Recebe updates via HTTP, serve health check e aplica back-pressure na fila"""
+
+    def __init__(self, application: Application):
+        self.application = application
+        self.started_at = time.monotonic()
+        self.received = 0
+        self.rejected = 0
+
+    def create_app(self) -> web.Application:
+        app = web.Application(client_max_size=1024 * 1024)
+        app.router.add_post(Config.WEBHOOK_PATH, self.handle_update)
+        app.router.add_get('/', self.health)
+        app.router.add_get('/health', self.health)
+        return app
+
+    @property
+    def backlog(self) -> int:
+        """Updates recebidos e ainda não concluídos (fila + em processamento)"""
+        processed = getattr(self.application.update_processor, 'processed', None)
+        if processed is None:
+            return self.application.update_queue.qsize()
+        return max(0, self.received - processed)
+
+    async def health(self, request: web.Request) -> web.Response:
+        """Health check (usado pelo Render/Railway)"""
+        return web.json_response({
+            'status': 'ok' if self.application.running else 'starting',
+            'mode': 'webhook',
+            'uptime_s': round(time.monotonic() - self.started_at),
+            'pending_updates': self.backlog,
+            'received': self.received,
+            'rejected': self.rejected,
+        })
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        """Recebe um update e coloca na fila da Application"""
+        if Config.WEBHOOK_SECRET and request.headers.get(SECRET_HEADER) != Config.WEBHOOK_SECRET:
+            return web.Response(status=403)
+
+        # Fila cheia: responder 503 faz o Telegram reenviar o update mais tarde
+        if self.backlog >= Config.WEBHOOK_MAX_PENDING:
+            self.rejected += 1
+            logger.warning("Fila de updates cheia, pedindo reenvio ao Telegram")
+            return web.Response(status=503, headers={'Retry-After': '1'})
+
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+
+        update = Update.de_json(data, self.application.bot)
+        await self.application.update_queue.put(update)
+        self.received += 1
+        return web.Response(status=200)
+
+    async def run(self):
+        """Inicializa a Application, registra o webhook e serve até receber sinal de parada"""
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError):
+                loop.add_signal_handler(sig, stop_event.set)
+
+        webhook_url = f"{Config.WEBHOOK_URL.rstrip('/')}{Config.WEBHOOK_PATH}"
+        runner = web.AppRunner(self.create_app(), access_log=None)
+
+        await self.application.initialize()
+        if self.application.post_init:
+            await self.application.post_init(self.application)
+        try:
+            await self.application.bot.set_webhook(
+                url=webhook_url,
+                secret_token=Config.WEBHOOK_SECRET or None,
+                allowed_updates=Update.ALL_TYPES,
+                max_connections=Config.WEBHOOK_MAX_CONNECTIONS,
+            )
+            await self.application.start()
+            await runner.setup()
+            await web.TCPSite(runner, '0.0.0.0', Config.PORT).start()
+            logger.info(f"🌐 Webhook ativo em {webhook_url} (porta {Config.PORT})")
+
+            await stop_event.wait()
+        finally:
+            logger.info("Encerrando servidor de webhook...")
+            await runner.cleanup()
+            if self.application.running:
+                await self.application.stop()
+            if self.application.post_stop:
+                await self.application.post_stop(self.application)
+            await self.application.shutdown()
+            if self.application.post_shutdown:
+                await self.application.post_shutdown(self.application)
+
+
+def run_webhook(application: Application):
+    """Roda o bot em modo webhook (bloqueante)"""
+    asyncio.run(WebhookServer(application).run())